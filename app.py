@@ -1,56 +1,379 @@
+import atexit
 import logging.config
 import traceback
 import sys
+import threading
+import time
 
-import yaml
-import pandas as pd
-from flask import Flask, render_template, request, redirect, url_for
+from flask import (Flask, Response, current_app, g, render_template, request, redirect, url_for,
+                   jsonify)
 
 # For setting up the Flask-SQLAlchemy database session
-from config.flaskconfig import HOTEL_TYPE, YAML_PATH
-from src.add_bookings import BookingManager, Bookings
-from src.predict import predict
-
-# Initialize the Flask application
-app = Flask(__name__, template_folder='app/templates',
-            static_folder='app/static')
-
-# Configure flask app from flask_config.py
-app.config.from_pyfile('config/flaskconfig.py')
-
-# Define LOGGING_CONFIG in flask_config.py - path to config file for setting
-# up the logger (e.g. config/logging/local.conf)
-logging.config.fileConfig(app.config['LOGGING_CONFIG'])
-logger = logging.getLogger(app.config['APP_NAME'])
-logger.debug(
-    'Web app should be viewable at %s:%s if docker run command maps local '
-    'port to the same port as configured for the Docker container '
-    'in config/flaskconfig.py (e.g. `-p 5000:5000`). Otherwise, go to the '
-    'port defined on the left side of the port mapping '
-    '(`i.e. -p THISPORT:5000`). If you are running from a Windows machine, '
-    'go to 127.0.0.1 instead of 0.0.0.0.', app.config['HOST'], app.config['PORT'])
-
-# Initialize the database session
-booking_manager = BookingManager(app)
-
-# Reading yaml file
-logger.info('Reading configuration file')
-try:
-    with open(YAML_PATH, 'r') as ymlfile:
-        cfg = yaml.load(ymlfile, Loader=yaml.FullLoader)
-except FileNotFoundError:
-    logger.error('Configuration file not found')
-    sys.exit(1)
-except TypeError:
-    logger.error('Please check the type of the object')
-    sys.exit(1)
-except AttributeError:
-    logger.error('Please check the attribute of the object')
-    sys.exit(1)
-logger.info('Configuration file read')
-
-
-@app.route('/', methods=['GET', 'POST'])
+from config.flaskconfig import APP_NAME, HOTEL_TYPE, YAML_PATH
+from src.add_bookings import BookingManager, QueryStats
+from src.app_config import config_manager
+from src.booking_writer import BookingWriter
+from src.metrics import MetricsRegistry
+from src.micro_batch import MicroBatcher
+from src.predict import (CANCELLED_LABEL, MissingFeaturesError, ModelServerClient,
+                         booking_to_row, load_compiled_tree,
+                         predict_batch, predict_row, predict_rows)
+from src.model_registry import registry
+from src.prediction_cache import PredictionCache
+from src.shadow import ShadowScorer
+
+logger = logging.getLogger(APP_NAME)
+
+# Form field holding each model feature on the index page
+FORM_FIELDS = {
+    'hotel': 'hotel_type',
+    'arrival_date_day_of_month': 'arrival_day_of_month',
+    'arrival_date_week_number': 'arrival_week_number',
+    'day': 'reservation_day',
+    'month': 'reservation_month',
+    'weekday': 'reservation_weekday',
+    'lead_time': 'lead_time',
+    'stays_in_week_nights': 'stays_in_week_nights',
+    'stays_in_weekend_nights': 'stays_in_weekend_nights',
+    'total_of_special_requests': 'total_of_special_requests',
+    'market_segment': 'market_segment'
+}
+
+
+class AppServices:
+    '''The database, model and configuration behind one Flask app.
+
+    Creating it only sets up the metrics. The configuration, database
+    engine, model and background workers are set up by ``init``, which
+    runs on the first request or can be called explicitly before serving.
+
+    Args:
+        app (:obj:`flask.app.Flask`): The app the services belong to.
+        config_path (str): The path of the YAML configuration file.
+
+    '''
+
+    def __init__(self, app, config_path=YAML_PATH):
+        self.app = app
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self.initialized = False
+
+        # Latency histograms and counters reported on /metrics
+        self.metrics = MetricsRegistry(directory=app.config['METRICS_DIR'])
+        self.request_count = self.metrics.counter(
+            'http_requests_total', 'HTTP requests by route, method and status',
+            ('route', 'method', 'status'))
+        self.request_latency = self.metrics.histogram(
+            'http_request_duration_seconds', 'Latency of HTTP requests by route',
+            ('route', 'method'))
+        self.stage_latency = self.metrics.histogram(
+            'stage_duration_seconds', 'Latency of the stages of a request', ('stage',))
+
+        # Every SQL statement is timed; slow and repeated ones are reported
+        self.query_stats = QueryStats(slow_query_seconds=app.config['SLOW_QUERY_SECONDS'],
+                                      slow_query_log=app.config['SLOW_QUERY_LOG'])
+
+        # Flask-SQLAlchemy registers its teardown here but only creates the
+        # engine, and connects, when it is first used
+        self.booking_manager = BookingManager(app,
+                                              pool_size=app.config['DB_POOL_SIZE'],
+                                              max_overflow=app.config['DB_MAX_OVERFLOW'],
+                                              pool_recycle=app.config['DB_POOL_RECYCLE'],
+                                              pool_pre_ping=app.config['DB_POOL_PRE_PING'],
+                                              pool_timeout=app.config['DB_POOL_TIMEOUT'],
+                                              sqlite_tuning=app.config['SQLITE_TUNING_ENABLED'],
+                                              busy_timeout=app.config['SQLITE_BUSY_TIMEOUT'])
+
+        # Identical bookings are scored once per model version
+        self.prediction_cache = PredictionCache(max_size=app.config['PREDICTION_CACHE_SIZE'],
+                                                ttl_seconds=app.config['PREDICTION_CACHE_TTL'])
+
+        self.config = None
+        self.booking_writer = None
+        self.model_client = None
+        self.batcher = None
+        self.shadow_scorer = None
+
+        # Set once warm-up has finished; /ready reports it to the load balancer
+        self.warm_up_done = threading.Event()
+        self.warm_up_failed = threading.Event()
+        self.warm_up_thread = None
+
+    def init(self, warm_up_database=True):
+        '''Sets up everything the requests need, once.
+
+        Args:
+            warm_up_database (bool): Whether warm-up opens database
+                connections. ``run.py serve`` turns it off in the master so
+                that only the forked workers connect.
+
+        Raises:
+            FileNotFoundError: The configuration file does not exist.
+            ValueError: The configuration file is invalid.
+
+        '''
+        if self.initialized:
+            return
+        with self._lock:
+            if self.initialized:
+                return
+            app = self.app
+
+            # Reading yaml file, which is reloaded when it changes or on SIGHUP
+            logger.info('Reading configuration file')
+            self.config = config_manager(self.config_path)
+            logger.info('Configuration file read')
+
+            self.query_stats.attach(self.booking_manager.engine)
+            if self.booking_manager.write_engine is not self.booking_manager.engine:
+                self.query_stats.attach(self.booking_manager.write_engine)
+
+            # Bookings are written in the background in batches when write-behind is on
+            if app.config['WRITE_BEHIND_ENABLED']:
+                self.booking_writer = BookingWriter(
+                    self.booking_manager.write_engine,
+                    max_queue_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+                    flush_size=app.config['WRITE_BEHIND_FLUSH_SIZE'],
+                    flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+                    dead_letter_path=app.config['WRITE_BEHIND_DEAD_LETTER_PATH'])
+                # Drain the queue when the worker shuts down
+                atexit.register(self.booking_writer.close)
+
+            # Rows are scored by the model server process pool when one is configured
+            if app.config['MODEL_SERVER_SOCKET']:
+                logger.info('Scoring on the model server at %s',
+                            app.config['MODEL_SERVER_SOCKET'])
+                self.model_client = ModelServerClient(app.config['MODEL_SERVER_SOCKET'],
+                                                      timeout=app.config['MODEL_SERVER_TIMEOUT'])
+
+            # Concurrent /predict requests are scored together when micro-batching is on
+            if app.config['MICRO_BATCH_ENABLED']:
+                if self.model_client is not None:
+                    predict_fn = self.model_client.predict_rows
+                else:
+                    def predict_fn(rows):
+                        '''Scores a batch with the model currently configured.'''
+                        return predict_rows(rows, model_path=self.config.get().model_path)
+                self.batcher = MicroBatcher(predict_fn,
+                                            max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+                                            max_wait_ms=app.config['MICRO_BATCH_WINDOW_MS'])
+
+            # A candidate model scores the same rows in the background when configured
+            if app.config['SHADOW_MODEL_PATH']:
+                logger.info('Shadow scoring with candidate model %s',
+                            app.config['SHADOW_MODEL_PATH'])
+                self.shadow_scorer = ShadowScorer(app.config['SHADOW_MODEL_PATH'],
+                                                  app.config['SHADOW_LOG_PATH'])
+
+            if app.config['WARMUP_ON_START']:
+                self.warm_up_thread = threading.Thread(
+                    target=self.warm_up, args=(warm_up_database,), name='warm-up', daemon=True)
+                self.warm_up_thread.start()
+            else:
+                self.warm_up_done.set()
+            self.initialized = True
+
+    def warm_up(self, database=True):
+        '''Preloads everything the first requests would otherwise pay for.
+
+        Loads and compiles the model, opens pooled database connections,
+        compiles the templates and runs a few dummy predictions.
+
+        Args:
+            database (bool): Whether to open database connections.
+
+        '''
+        start = time.perf_counter()
+        try:
+            cfg = self.config.get()
+            # With a model server the model is only ever loaded there
+            if self.model_client is None:
+                load_compiled_tree(cfg.model_path)
+            if database:
+                self.booking_manager.warm_up(self.app.config['WARMUP_DB_CONNECTIONS'])
+            for template in ('index.html', 'predict.html', 'error.html'):
+                self.app.jinja_env.get_template(template)
+
+            dummy_row = booking_to_row({feature: 0 for feature in cfg.initial_features},
+                                       cfg.initial_features)
+            for _ in range(self.app.config['WARMUP_PREDICTIONS']):
+                if self.model_client is not None:
+                    self.model_client.score(dummy_row)
+                else:
+                    predict_row(dummy_row, cfg.model_path)
+                    predict_rows(dummy_row.reshape(1, -1), cfg.model_path)
+        except Exception:
+            traceback.print_exc()
+            logger.error('Warm-up failed, the app will not report ready')
+            self.warm_up_failed.set()
+            return
+        logger.info('Warm-up finished in %.1f ms', (time.perf_counter() - start) * 1000)
+        self.warm_up_done.set()
+
+    def post_fork(self):
+        '''Prepares a worker forked by ``run.py serve`` to serve requests.
+
+        Pooled database connections opened in the master must not be shared
+        between processes, so the worker drops any inherited copies and opens
+        its own pool before serving.
+
+        '''
+        self.init()
+        self.booking_manager.engine.dispose(close=False)
+        if self.booking_manager.write_engine is not self.booking_manager.engine:
+            self.booking_manager.write_engine.dispose(close=False)
+        if self.app.config['WARMUP_ON_START']:
+            try:
+                self.booking_manager.warm_up(self.app.config['WARMUP_DB_CONNECTIONS'])
+            except Exception:
+                traceback.print_exc()
+                logger.warning('Worker could not open its database connections')
+        # kill -HUP on a worker reloads its configuration; the master replaces all workers
+        self.config.install_signal_handler()
+        # Only count what this worker serves
+        self.metrics.reset()
+
+    def worker_exit(self):
+        '''Finishes the background work of a worker that stopped serving.'''
+        if self.booking_writer is not None:
+            self.booking_writer.close()
+        if self.batcher is not None:
+            self.batcher.close()
+        if self.shadow_scorer is not None:
+            self.shadow_scorer.close()
+        self.metrics.flush()
+
+    def score_booking(self, booking_dict):
+        '''Scores one booking on the serving fast path.
+
+        Builds the feature row directly, without a one-row DataFrame, goes
+        through the prediction cache and micro-batcher and hands the row to the
+        shadow scorer when one is configured.
+
+        Args:
+            booking_dict (dict): The features of the booking with ``hotel`` encoded.
+
+        Returns:
+            prediction (str), prediction_prob (np.ndarray), the model version
+            and the scoring latency in seconds
+
+        '''
+        cfg = self.config.get()
+        with self.stage_latency.time('features'):
+            booking_row = booking_to_row(booking_dict, cfg.initial_features)
+        # Resolved once, before scoring, so a hot reload in between cannot
+        # stamp the prediction with a version other than the one that made it
+        with self.stage_latency.time('model_load'):
+            entry = None if self.model_client is not None else registry.get(cfg.model_path)
+        # The model server's version when scoring there, the local file's otherwise
+        model_version = self.model_client.version if entry is None else entry.version
+        start = time.perf_counter()
+        with self.stage_latency.time('predict'):
+            prediction, prediction_prob = predict_row(
+                booking_row, cfg.model_path, cache=self.prediction_cache, batcher=self.batcher,
+                client=self.model_client, entry=entry)
+        latency = time.perf_counter() - start
+        if self.shadow_scorer is not None:
+            self.shadow_scorer.submit(booking_row, prediction_prob, model_version,
+                                      cfg.model_path)
+        return prediction, prediction_prob, model_version, latency
+
+
+def get_services(app=None):
+    '''Returns the services of an app, by default the one handling the request.'''
+    return (app or current_app).extensions[APP_NAME]
+
+
+def create_app(config_path=YAML_PATH, init=False):
+    '''Creates the web app without connecting to anything.
+
+    Args:
+        config_path (str): The path of the YAML configuration file.
+        init (bool): Whether to set up the configuration, database and
+            model now instead of on the first request.
+
+    Returns:
+        :obj:`flask.app.Flask`: The app, with its services under
+        ``app.extensions[APP_NAME]``
+
+    '''
+    # Initialize the Flask application
+    app = Flask(__name__, template_folder='app/templates',
+                static_folder='app/static')
+
+    # Configure flask app from flask_config.py
+    app.config.from_pyfile('config/flaskconfig.py')
+
+    # Define LOGGING_CONFIG in flask_config.py - path to config file for setting
+    # up the logger (e.g. config/logging/local.conf). The app logger already
+    # exists, so it must not be disabled.
+    logging.config.fileConfig(app.config['LOGGING_CONFIG'], disable_existing_loggers=False)
+    logger.debug(
+        'Web app should be viewable at %s:%s if docker run command maps local '
+        'port to the same port as configured for the Docker container '
+        'in config/flaskconfig.py (e.g. `-p 5000:5000`). Otherwise, go to the '
+        'port defined on the left side of the port mapping '
+        '(`i.e. -p THISPORT:5000`). If you are running from a Windows machine, '
+        'go to 127.0.0.1 instead of 0.0.0.0.', app.config['HOST'], app.config['PORT'])
+
+    app.extensions[APP_NAME] = services = AppServices(app, config_path)
+
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+    app.add_url_rule('/', view_func=index, methods=['GET', 'POST'])
+    app.add_url_rule('/predict', view_func=add_entry, methods=['POST', 'GET'])
+    app.add_url_rule('/predict.html/<prediction>/<prediction_prob>', view_func=response,
+                     methods=['GET', 'POST'])
+    app.add_url_rule('/api/v1/predict', view_func=predict_booking, methods=['POST'])
+    app.add_url_rule('/api/predict/batch', view_func=predict_bookings_batch, methods=['POST'])
+    app.add_url_rule('/ready', view_func=ready, methods=['GET'])
+    app.add_url_rule('/model/stats', view_func=model_stats, methods=['GET'])
+    app.add_url_rule('/metrics', view_func=metrics_view, methods=['GET'])
+
+    if init:
+        services.init()
+    return app
+
+
+def encode_hotel(hotel):
+    '''Returns the model code of a hotel given by type or by code.'''
+    if hotel in HOTEL_TYPE:
+        return HOTEL_TYPE.index(hotel)
+    return hotel
+
+
+def start_request_timer():
+    '''Notes when the request started for the route latency histogram.
+
+    Sets up the services on the first request when they were not set up
+    before serving.
+
+    '''
+    g.request_start = time.perf_counter()
+    services = get_services()
+    services.init()
+    services.query_stats.begin_request()
+
+
+def record_request_metrics(response):
+    '''Records the latency and status of the request per route.
+
+    Returns:
+        The unchanged response
+
+    '''
+    services = get_services()
+    # The URL rule rather than the path keeps the number of series bounded
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    services.request_latency.observe(time.perf_counter() - g.request_start, route,
+                                     request.method)
+    services.request_count.inc(route, request.method, str(response.status_code))
+    services.query_stats.end_request(route)
+    services.metrics.start_flushing()
+    return response
+
+
 def index():
     '''Main view that enables user to add bookings.
 
@@ -70,7 +393,6 @@ def index():
             return render_template('error.html')
 
 
-@app.route('/predict', methods=['POST', 'GET'])
 def add_entry():
     '''View that process a POST with new booking input
 
@@ -83,62 +405,63 @@ def add_entry():
 
     if request.method == 'POST':
 
+        services = get_services()
+        stage_latency = services.stage_latency
         try:
             logger.debug(request.form['hotel_type'])
-            booking_dict = {
-                'hotel': request.form['hotel_type'],
-                'arrival_date_day_of_month': request.form['arrival_day_of_month'],
-                'arrival_date_week_number': request.form['arrival_week_number'],
-                'day': request.form['reservation_day'],
-                'month': request.form['reservation_month'],
-                'weekday': request.form['reservation_weekday'],
-                'lead_time': request.form['lead_time'],
-                'stays_in_week_nights': request.form['stays_in_week_nights'],
-                'stays_in_weekend_nights': request.form['stays_in_weekend_nights'],
-                'total_of_special_requests': request.form['total_of_special_requests'],
-                'market_segment': request.form['market_segment']
-            }
+            with stage_latency.time('parse'):
+                booking_dict = {feature: request.form[field]
+                                for feature, field in FORM_FIELDS.items()}
 
             logger.debug(booking_dict)
 
-            booking_df = pd.DataFrame(booking_dict, index=[0])
-            if booking_df['hotel'][0] == 'City Hotel':
-                booking_df['hotel'] = int(1)
+            if booking_dict['hotel'] == 'City Hotel':
                 hotel_no = 1
             else:
-                booking_df['hotel'] = int(0)
                 hotel_no = 0
-            prediction, prediction_prob = predict(
-                booking_df, **cfg['predict']['predict'])
+            booking_dict['hotel'] = hotel_no
+            prediction, prediction_prob, model_version, latency = services.score_booking(
+                booking_dict)
 
             logger.debug(prediction)
             logger.debug(prediction_prob)
 
-            booking_manager.add_booking(hotel=hotel_no,
-                                        arrival_date_day_of_month=request.form['arrival_day_of_month'],
-                                        arrival_date_week_number=request.form['arrival_week_number'],
-                                        reservation_day=request.form['reservation_day'],
-                                        reservation_month=request.form['reservation_month'],
-                                        reservation_weekday=request.form['reservation_weekday'],
-                                        lead_time=request.form['lead_time'],
-                                        stays_in_week_nights=request.form['stays_in_week_nights'],
-                                        stays_in_weekend_nights=request.form['stays_in_weekend_nights'],
-                                        total_of_special_requests=request.form['total_of_special_requests'],
-                                        market_segment=request.form['market_segment'])
+            booking_record = dict(hotel=hotel_no,
+                                  arrival_date_day_of_month=request.form['arrival_day_of_month'],
+                                  arrival_date_week_number=request.form['arrival_week_number'],
+                                  reservation_day=request.form['reservation_day'],
+                                  reservation_month=request.form['reservation_month'],
+                                  reservation_weekday=request.form['reservation_weekday'],
+                                  lead_time=request.form['lead_time'],
+                                  stays_in_week_nights=request.form['stays_in_week_nights'],
+                                  stays_in_weekend_nights=request.form['stays_in_weekend_nights'],
+                                  total_of_special_requests=request.form['total_of_special_requests'],
+                                  market_segment=request.form['market_segment'],
+                                  # Stored with the booking so it never has to be rescored
+                                  prediction_prob=float(prediction_prob[0][1]),
+                                  prediction_label=int(prediction == CANCELLED_LABEL),
+                                  model_version=model_version,
+                                  scoring_latency_ms=latency * 1000)
+            # Fall back to a synchronous write when the queue is full
+            with stage_latency.time('add_booking'):
+                booking_writer = services.booking_writer
+                if booking_writer is None or not booking_writer.enqueue(booking_record):
+                    services.booking_manager.add_booking(**booking_record)
             logger.info('New booking from %s added',
                         request.form['hotel_type'])
 
-            url_for_post = url_for(
-                'response', prediction=prediction, prediction_prob=round(prediction_prob[0][1], 2))
-
-            return redirect(url_for_post)
+            with stage_latency.time('redirect'):
+                url_for_post = url_for(
+                    'response', prediction=prediction,
+                    prediction_prob=round(prediction_prob[0][1], 2))
+                return redirect(url_for_post)
 
         except Exception:
             traceback.print_exc()
             logger.warning('Hotel booking information not found.')
             return render_template('error.html')
 
-@app.route('/predict.html/<prediction>/<prediction_prob>', methods=['GET', 'POST'])
+
 def response(prediction, prediction_prob):
     '''View that displays the prediction.
 
@@ -149,13 +472,19 @@ def response(prediction, prediction_prob):
 
     '''
     if request.method == 'GET':
+        services = get_services()
         try:
             logger.debug('Prediction page accessed')
-            res = booking_manager.session.query(Bookings)
-            logger.debug(res)
-            logger.debug(res.all())
-            return render_template('predict.html', prediction=prediction,
-                                        prediction_prob=prediction_prob, responses=res)
+            with services.stage_latency.time('recent_bookings'):
+                res, older_cursor, newer_cursor = services.booking_manager.recent_bookings(
+                    services.config.get().max_rows_show or current_app.config['MAX_ROWS_SHOW'],
+                    before=request.args.get('before', type=int),
+                    after=request.args.get('after', type=int))
+            logger.debug('Showing %d recent bookings', len(res))
+            with services.stage_latency.time('render'):
+                return render_template('predict.html', prediction=prediction,
+                                       prediction_prob=prediction_prob, responses=res,
+                                       older_cursor=older_cursor, newer_cursor=newer_cursor)
         except Exception:
             traceback.print_exc()
             logger.warning('Hotel booking information not found.')
@@ -163,6 +492,148 @@ def response(prediction, prediction_prob):
     elif request.method == 'POST':
         return 'POST'
 
+
+def predict_booking():
+    '''API view that scores one booking and returns the result directly.
+
+    Expects a JSON object with the model features, with ``hotel`` given
+    either as the hotel type or its code. Unlike ``/predict`` it does not
+    store the booking, redirect or render the recent bookings.
+
+    Returns:
+        JSON with the prediction, the cancellation probability and the
+        version of the model that made it
+
+    '''
+    booking = request.get_json(silent=True)
+    if not isinstance(booking, dict):
+        return jsonify(error='Expected a JSON object with the booking'), 400
+
+    try:
+        booking_dict = dict(booking)
+        booking_dict['hotel'] = encode_hotel(booking_dict.get('hotel'))
+        prediction, prediction_prob, model_version, _ = get_services().score_booking(
+            booking_dict)
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning('Invalid booking: %s', e)
+        return jsonify(error='Invalid booking information'), 400
+
+    return jsonify(prediction=prediction,
+                   prediction_prob=float(prediction_prob[0][1]),
+                   model_version=model_version)
+
+
+def predict_bookings_batch():
+    '''API view that scores many bookings in one request.
+
+    Expects a JSON body of the form ``{"bookings": [{...}, ...]}`` where each
+    booking carries the model features, with ``hotel`` given either as the
+    hotel type or its code.
+
+    Returns:
+        JSON with the prediction and cancellation probability of each booking
+
+    '''
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('bookings'), list):
+        return jsonify(error='Expected a JSON object with a list of bookings'), 400
+
+    bookings = payload['bookings']
+    max_batch_size = current_app.config['MAX_BATCH_SIZE']
+    if not bookings:
+        return jsonify(error='No bookings provided'), 400
+    if len(bookings) > max_batch_size:
+        return jsonify(error='At most %d bookings per request' % max_batch_size), 413
+
+    services = get_services()
+    try:
+        records = []
+        for booking in bookings:
+            record = dict(booking)
+            record['hotel'] = encode_hotel(record.get('hotel'))
+            records.append(record)
+        cfg = services.config.get()
+        predictions, prediction_proba = predict_batch(
+            records, cfg.model_path, client=services.model_client,
+            initial_features=cfg.initial_features)
+    except MissingFeaturesError as e:
+        logger.warning('Invalid batch of bookings: %s', e)
+        return jsonify(error=str(e), index=e.index), 400
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning('Invalid batch of bookings: %s', e)
+        return jsonify(error='Invalid booking information'), 400
+
+    logger.info('Scored a batch of %d bookings', len(records))
+    return jsonify(predictions=[
+        {'prediction': prediction, 'prediction_prob': float(proba[1])}
+        for prediction, proba in zip(predictions, prediction_proba)])
+
+
+def ready():
+    '''Readiness probe for the load balancer.
+
+    Returns:
+        200 once warm-up has finished, 503 while warming up or after a
+        failed warm-up
+
+    '''
+    services = get_services()
+    if services.warm_up_done.is_set():
+        return jsonify(status='ready')
+    if services.warm_up_failed.is_set():
+        return jsonify(status='warm-up failed'), 503
+    return jsonify(status='warming up'), 503
+
+
+def model_stats():
+    '''View that reports how often the model artifacts were loaded.
+
+    Returns:
+        JSON with load counts and load latency per model artifact, the
+        hit and miss counters of the prediction cache, the micro-batching
+        queue metrics, the shadow scoring summary, the write-behind
+        queue metrics, the model server requests, the SQL statements
+        taking the most time, the database connection pool and the
+        configuration reloads
+
+    '''
+    services = get_services()
+    stats = registry.stats()
+    stats['prediction_cache'] = services.prediction_cache.stats()
+    if services.batcher is not None:
+        stats['micro_batch'] = services.batcher.stats()
+    if services.shadow_scorer is not None:
+        stats['shadow'] = services.shadow_scorer.stats()
+    if services.booking_writer is not None:
+        stats['booking_writer'] = services.booking_writer.stats()
+    if services.model_client is not None:
+        stats['model_server'] = services.model_client.stats()
+    stats['queries'] = services.query_stats.stats()
+    stats['db_pool'] = services.booking_manager.pool_stats()
+    stats['config'] = services.config.stats()
+    return jsonify(stats)
+
+
+def metrics_view():
+    '''Exposes the request and stage latency metrics to Prometheus.
+
+    Returns:
+        The metrics in the Prometheus text exposition format
+
+    '''
+    return Response(get_services().metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
+    app = create_app()
+    try:
+        get_services(app).init()
+    except FileNotFoundError:
+        logger.error('Configuration file not found')
+        sys.exit(1)
+    except ValueError as e:
+        logger.error('Invalid configuration file: %s', e)
+        sys.exit(1)
+    get_services(app).config.install_signal_handler()
     app.run(debug=app.config['DEBUG'], port=app.config['PORT'],
             host=app.config['HOST'])
@@ -0,0 +1,107 @@
+"""
+Times the bookings queries on SQLite before and after adding the indexes.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_bookings_indexes --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import timeit
+
+import sqlalchemy
+from sqlalchemy.schema import CreateTable
+
+from src.add_bookings import Bookings
+
+TABLE = Bookings.__table__
+START = datetime.datetime(2026, 1, 1)
+
+
+def queries(n_rows):
+    """The statements served by the web app and the common reporting queries."""
+    c = TABLE.c
+    return {
+        "hotel page": (sqlalchemy.select(TABLE)
+                       .where(c.hotel == 1, c.id < n_rows // 2)
+                       .order_by(c.id.desc()).limit(100)),
+        "hotel + week": sqlalchemy.select(TABLE).where(c.hotel == 1,
+                                                       c.arrival_date_week_number == 20),
+        "segment + week count": (sqlalchemy.select(sqlalchemy.func.count())
+                                 .where(c.market_segment == 5,
+                                        c.arrival_date_week_number == 20)),
+        "segment per week": (sqlalchemy.select(c.arrival_date_week_number,
+                                               sqlalchemy.func.count())
+                             .where(c.market_segment == 5)
+                             .group_by(c.arrival_date_week_number)),
+        "created_at last hour": sqlalchemy.select(TABLE).where(
+            c.created_at >= START + datetime.timedelta(seconds=25 * n_rows - 3600)),
+    }
+
+
+def fill(engine, n_rows, seed=0):
+    """Create the bookings table without its indexes and insert random bookings."""
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        connection.execute(CreateTable(TABLE))
+        for offset in range(0, n_rows, 100000):
+            connection.execute(TABLE.insert(), [
+                dict(hotel=rng.randint(0, 1), arrival_date_day_of_month=rng.randint(1, 31),
+                     arrival_date_week_number=rng.randint(1, 53),
+                     reservation_day=rng.randint(1, 31), reservation_month=rng.randint(1, 12),
+                     reservation_weekday=rng.randint(0, 6), lead_time=rng.randint(0, 400),
+                     stays_in_week_nights=rng.randint(0, 5),
+                     stays_in_weekend_nights=rng.randint(0, 2),
+                     total_of_special_requests=rng.randint(0, 3),
+                     market_segment=rng.randint(0, 7),
+                     created_at=START + datetime.timedelta(seconds=25 * i))
+                for i in range(offset, min(offset + 100000, n_rows))])
+
+
+def time_queries(engine, statements, repeat):
+    """Return the fastest run of each statement in milliseconds, and its query plan."""
+    results = {}
+    with engine.connect() as connection:
+        for name, statement in statements.items():
+            seconds = min(timeit.repeat(lambda: connection.execute(statement).fetchall(),
+                                        number=1, repeat=repeat))
+            compiled = statement.compile(engine)
+            parameters = compiled.construct_params()
+            plan = "; ".join(row[-1] for row in connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + str(compiled),
+                tuple(parameters[key] for key in compiled.positiontup)))
+            results[name] = (seconds * 1000, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000,
+                        help="Bookings inserted before timing")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timing runs; the fastest one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = sqlalchemy.create_engine(
+            f"sqlite:///{os.path.join(directory, 'bookings.db')}")
+        fill(engine, args.rows)
+        statements = queries(args.rows)
+        before = time_queries(engine, statements, args.repeat)
+        for index in TABLE.indexes:
+            index.create(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+        after = time_queries(engine, statements, args.repeat)
+        engine.dispose()
+
+    print(f"{'query':<22} {'before ms':>10} {'after ms':>10}  plan with indexes")
+    for name in statements:
+        print(f"{name:<22} {before[name][0]:10.1f} {after[name][0]:10.1f}  {after[name][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares single-row scoring with sklearn and with the compiled tree.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_tree_evaluator --model models/dt_model.pkl
+"""
+import argparse
+import pickle
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from src.tree_evaluator import CompiledTree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="models/dt_model.pkl",
+                        help="Pickled DecisionTreeClassifier to benchmark")
+    parser.add_argument("--number", type=int, default=1000,
+                        help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timing runs; the fastest one is reported")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as model_file:
+        model = pickle.load(model_file)
+    compiled = CompiledTree.from_model(model)
+
+    x_one = pd.DataFrame(np.ones((1, model.n_features_in_)),
+                         columns=getattr(model, "feature_names_in_", None))
+    row = x_one.to_numpy()[0]
+
+    timings = {
+        "sklearn predict + predict_proba": lambda: (model.predict(x_one),
+                                                    model.predict_proba(x_one)),
+        "CompiledTree.predict_with_proba": lambda: compiled.predict_with_proba(x_one),
+        "CompiledTree.predict_one": lambda: compiled.predict_one(row),
+    }
+    for name, call in timings.items():
+        seconds = min(timeit.repeat(call, number=args.number, repeat=args.repeat))
+        print(f"{name:<34} {seconds / args.number * 1e6:10.1f} us/row")
+
+
+if __name__ == "__main__":
+    main()
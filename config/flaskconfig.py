@@ -7,7 +7,41 @@ APP_NAME = 'hotel_bookings'
 SQLALCHEMY_TRACK_MODIFICATIONS = True
 HOST = '0.0.0.0'
 SQLALCHEMY_ECHO = False  # If true, SQL for queries made will be printed
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))  # Connections each process keeps open to MySQL
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))  # Extra connections opened when the pool is exhausted
+DB_POOL_RECYCLE = 1800  # Seconds before a connection is replaced, below the server's wait_timeout
+DB_POOL_PRE_PING = True  # Test connections on checkout and replace stale ones
+DB_POOL_TIMEOUT = 30  # Seconds a request waits for a free connection
+SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING_ENABLED', 'true').lower() == 'true'  # WAL and one writer connection for SQLite files
+SQLITE_BUSY_TIMEOUT = 5.0  # Seconds an SQLite connection waits for a lock held by another process
+SLOW_QUERY_SECONDS = 0.1  # Statements taking at least this long go to the slow-query log
+SLOW_QUERY_LOG = 'data/slow_queries.jsonl'  # JSON-lines file of slow statements, None to only log them
 MAX_ROWS_SHOW = 100
+MAX_BATCH_SIZE = 1000  # Most bookings accepted by /api/predict/batch
+PREDICTION_CACHE_SIZE = 10000  # Most predictions memoized per worker
+PREDICTION_CACHE_TTL = 3600  # Seconds a memoized prediction stays valid, None to disable
+MICRO_BATCH_ENABLED = os.environ.get('MICRO_BATCH_ENABLED', 'false').lower() == 'true'
+MICRO_BATCH_WINDOW_MS = 2  # How long a /predict request waits for others to batch with
+MICRO_BATCH_MAX_SIZE = 64  # Largest batch scored in one model call
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH')  # Candidate model scored in the background
+SHADOW_LOG_PATH = 'data/shadow_predictions.jsonl'  # Where primary vs candidate comparisons go
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_QUEUE_SIZE = 10000  # Most bookings waiting to be written
+WRITE_BEHIND_FLUSH_SIZE = 100  # Bookings written per transaction
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0  # Seconds the oldest queued booking waits at most
+WRITE_BEHIND_DEAD_LETTER_PATH = 'data/failed_bookings.jsonl'  # Bookings that could not be written
+WARMUP_ON_START = True  # Preload model, DB connections and templates before reporting ready
+WARMUP_DB_CONNECTIONS = 2  # Database connections opened during warm-up
+WARMUP_PREDICTIONS = 3  # Dummy predictions run during warm-up
+METRICS_DIR = os.environ.get('METRICS_DIR')  # Where workers share their metrics, None for this process only
+MODEL_SERVER_SOCKET = os.environ.get('MODEL_SERVER_SOCKET')  # Unix socket of run.py model_server, None to score in-process
+MODEL_SERVER_TIMEOUT = 1.0  # Seconds to wait for the model server
+MODEL_SERVER_WORKERS = int(os.environ.get('MODEL_SERVER_WORKERS', 2))  # Scoring processes started by run.py model_server
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', os.cpu_count() or 1))  # Processes forked by run.py serve
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', 4))  # Request threads per worker
+SERVE_MAX_REQUESTS = 10000  # Requests a worker serves before it is replaced, 0 to disable
+SERVE_MAX_REQUESTS_JITTER = 1000  # Spreads worker replacements apart
+SERVE_GRACEFUL_TIMEOUT = 30  # Seconds a stopping worker gets to finish its requests
 
 host = os.environ.get('MYSQL_HOST')
 user = os.environ.get('MYSQL_USER')
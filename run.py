@@ -1,20 +1,16 @@
 """Configures the subparsers for receiving command line arguments for each
- stage in the model pipeline and orchestrates their execution."""
+ stage in the model pipeline and orchestrates their execution.
+
+Each subcommand imports only the modules it needs, so ``create_db`` and
+``ingest`` start without loading pandas, scikit-learn or boto3."""
 import argparse
-import sqlite3
 import logging.config
 import sys
-import yaml
-import pandas as pd
-import sqlalchemy
-import botocore
-
-from config.flaskconfig import SQLALCHEMY_DATABASE_URI
-from src.add_bookings import create_db, BookingManager
-from src.access_s3 import upload_to_s3, download_from_s3
-from src.clean import get_clean_data
-from src.train import train
-from src.evaluate import score_model, evaluate_model
+
+from config.flaskconfig import (SQLALCHEMY_DATABASE_URI, HOST, PORT, SERVE_WORKERS,
+                                SERVE_THREADS, SERVE_MAX_REQUESTS, SERVE_MAX_REQUESTS_JITTER,
+                                SERVE_GRACEFUL_TIMEOUT, MODEL_SERVER_SOCKET,
+                                MODEL_SERVER_WORKERS, YAML_PATH)
 
 logging.config.fileConfig("config/logging/local.conf")
 logger = logging.getLogger("BookingPredictor")
@@ -49,6 +45,14 @@ if __name__ == "__main__":
     sp_ingest.add_argument("--stays_in_weekend_nights", default=1)
     sp_ingest.add_argument("--total_of_special_requests", default=1)
     sp_ingest.add_argument("--market_segment", default=1)
+    sp_ingest.add_argument("--file", default=None,
+                           help="CSV, Parquet or JSON-lines file of bookings to add "
+                                "instead of a single booking (optional, default = None)")
+    sp_ingest.add_argument("--chunksize", type=int, default=10000,
+                           help="Bookings validated and inserted at a time with --file")
+    sp_ingest.add_argument("--rejected_path", default=None,
+                           help="Where rows rejected from --file are written "
+                                "(optional, default = <file>.rejected.csv)")
 
     # Sub-parser for accessing s3
     sp_upload = subparsers.add_parser(
@@ -73,18 +77,53 @@ if __name__ == "__main__":
                                         description="Acquire data, clean data, "
                                                     "featurize data, and run model-pipeline")
     sp_pipeline.add_argument("--step", help="Which step to run",
-                             choices=["clean", "train", "score", "evaluate"])
+                             choices=["clean", "train", "score", "evaluate", "export"])
     sp_pipeline.add_argument("--input", "-i", nargs="+", default=None,
                              help="Path to input data (optional, default = None)")
     sp_pipeline.add_argument("--config", default="config/config.yaml",
                              help="Path to configuration file")
     sp_pipeline.add_argument("--output", "-o", nargs="+", default=None,
                              help="Path to save output (optional, default = None)")
+    sp_pipeline.add_argument("--chunksize", type=int, default=None,
+                             help="Score the input in chunks of this many rows, "
+                                  "streaming predictions to the output (optional, default = None)")
+
+    # Sub-parser for serving the web app with several worker processes
+    sp_serve = subparsers.add_parser("serve",
+                                     description="Serve the web app with pre-forked workers")
+    sp_serve.add_argument("--host", default=HOST, help="Interface to listen on")
+    sp_serve.add_argument("--port", type=int, default=PORT, help="Port to listen on")
+    sp_serve.add_argument("--workers", type=int, default=SERVE_WORKERS,
+                          help="Number of worker processes")
+    sp_serve.add_argument("--threads", type=int, default=SERVE_THREADS,
+                          help="Number of request threads per worker")
+    sp_serve.add_argument("--max_requests", type=int, default=SERVE_MAX_REQUESTS,
+                          help="Requests a worker serves before it is replaced (0 = never)")
+    sp_serve.add_argument("--max_requests_jitter", type=int, default=SERVE_MAX_REQUESTS_JITTER,
+                          help="Random extra requests per worker to spread replacements")
+    sp_serve.add_argument("--graceful_timeout", type=float, default=SERVE_GRACEFUL_TIMEOUT,
+                          help="Seconds stopping workers get to finish their requests")
+
+    # Sub-parser for serving the model to the web workers over a Unix socket
+    sp_model_server = subparsers.add_parser("model_server",
+                                            description="Serve the model on a Unix socket")
+    sp_model_server.add_argument("--socket_path", default=MODEL_SERVER_SOCKET or "/tmp/model.sock",
+                                 help="Path of the Unix socket to listen on")
+    sp_model_server.add_argument("--config", default=YAML_PATH,
+                                 help="Path to configuration file")
+    sp_model_server.add_argument("--model_path", default=None,
+                                 help="Path of the model to serve, "
+                                      "predict.predict.model_path of the configuration by default")
+    sp_model_server.add_argument("--workers", type=int, default=MODEL_SERVER_WORKERS,
+                                 help="Number of scoring processes")
 
     args = parser.parse_args()
     sp_used = args.subparser_name
 
     if sp_used == "create_db":
+        import sqlite3
+        import sqlalchemy
+        from src.add_bookings import create_db
         try:
             logger.info("Creating database at %s", args.engine_string)
             create_db(args.engine_string)
@@ -95,14 +134,21 @@ if __name__ == "__main__":
             logger.exception("Failed to create database")
             sys.exit(1)
     elif sp_used == "ingest":
+        import sqlite3
+        import sqlalchemy
+        from src.add_bookings import BookingManager
         try:
-            bm = BookingManager(args.engine_string)
-            bm.add_booking(args.hotel, args.arrival_date_day_of_month,
-                        args.arrival_date_week_number, args.reservation_day,
-                        args.reservation_month, args.reservation_weekday,
-                        args.lead_time, args.stays_in_week_nights,
-                        args.stays_in_weekend_nights, args.total_of_special_requests,
-                        args.market_segment)
+            bm = BookingManager(engine_string=args.engine_string)
+            if args.file:
+                bm.add_bookings(args.file, chunksize=args.chunksize,
+                                rejected_path=args.rejected_path)
+            else:
+                bm.add_booking(args.hotel, args.arrival_date_day_of_month,
+                            args.arrival_date_week_number, args.reservation_day,
+                            args.reservation_month, args.reservation_weekday,
+                            args.lead_time, args.stays_in_week_nights,
+                            args.stays_in_weekend_nights, args.total_of_special_requests,
+                            args.market_segment)
             bm.close()
         except sqlalchemy.exc.OperationalError as e:
             logger.exception("Failed to ingest data")
@@ -110,37 +156,46 @@ if __name__ == "__main__":
         except sqlite3.OperationalError as e:
             logger.exception("Failed to ingest data")
             sys.exit(1)
+        except FileNotFoundError as e:
+            logger.exception("Failed to ingest data")
+            sys.exit(1)
+        except ValueError as e:
+            logger.exception("Failed to ingest data")
+            sys.exit(1)
 
     elif sp_used == "upload_to_s3":
+        import botocore
+        from src.access_s3 import upload_to_s3
         try:
             upload_to_s3(args.local_path, args.s3_path)
         except botocore.exceptions.NoCredentialsError as e:
             logger.exception("Failed to upload data to s3")
             sys.exit(1)
     elif sp_used == "download_from_s3":
+        import botocore
+        from src.access_s3 import download_from_s3
         try:
             download_from_s3(args.local_path, args.s3_path)
         except botocore.exceptions.NoCredentialsError as e:
             logger.exception("Failed to download data from s3")
             sys.exit(1)
     elif sp_used == "model_pipeline":
+        from src.app_config import load_config
+
         # Reading yaml file
         logger.info("Reading configuration file")
         try:
-            with open(args.config, "r") as ymlfile:
-                cfg = yaml.load(ymlfile, Loader=yaml.FullLoader)
+            cfg = load_config(args.config)
         except FileNotFoundError:
             logger.error("Configuration file not found")
             sys.exit(1)
-        except TypeError:
-            logger.error("Please check the type of the object")
-            sys.exit(1)
-        except AttributeError:
-            logger.error("Please check the attribute of the object")
+        except ValueError as e:
+            logger.error("Invalid configuration file: %s", e)
             sys.exit(1)
         logger.info("Configuration file read")
 
         if args.step == "clean":
+            from src.clean import get_clean_data
             logger.info("Cleaning data")
             try:
                 get_clean_data(args.input[0], args.output[0])
@@ -154,6 +209,7 @@ if __name__ == "__main__":
                 logger.exception("Failed to clean data")
                 sys.exit(1)
         elif args.step == "train":
+            from src.train import train
             logger.info("Training model")
             try:
                 train(args.input[0], args.output[0],args.output[1],args.output[2],
@@ -171,11 +227,17 @@ if __name__ == "__main__":
                 logger.exception("Failed to train model")
                 sys.exit(1)
         elif args.step == "score":
+            from src.evaluate import score_model, score_model_chunked
             logger.info("Scoring model")
             try:
-                y_pred_proba, y_pred = score_model(args.input[0],args.input[1],**cfg["evaluate"]["score_model"])
-                y_pred_proba.to_csv(args.output[0], index=False)
-                y_pred.to_csv(args.output[1], index=False)
+                if args.chunksize:
+                    score_model_chunked(args.input[0], args.input[1], args.output[0],
+                                        args.output[1], chunksize=args.chunksize,
+                                        **cfg["evaluate"]["score_model"])
+                else:
+                    y_pred_proba, y_pred = score_model(args.input[0],args.input[1],**cfg["evaluate"]["score_model"])
+                    y_pred_proba.to_csv(args.output[0], index=False)
+                    y_pred.to_csv(args.output[1], index=False)
                 logger.info("Predictions saved.")
             except FileNotFoundError as err:
                 logger.exception("Failed to score model")
@@ -193,6 +255,8 @@ if __name__ == "__main__":
                 logger.exception("Failed to score model")
                 sys.exit(1)
         elif args.step == "evaluate":
+            import pandas as pd
+            from src.evaluate import evaluate_model
             try:
                 auc, accuracy, f1_scr = evaluate_model(args.input[0], args.input[1],
                         args.input[2])
@@ -214,6 +278,88 @@ if __name__ == "__main__":
             except PermissionError as err:
                 logger.exception("Failed to evaluate model")
                 sys.exit(1)
+        elif args.step == "export":
+            from src.model_artifact import export_model
+            from src.model_registry import load_model
+            logger.info("Exporting model")
+            try:
+                export_model(load_model(args.input[0]), args.output[0])
+            except FileNotFoundError as err:
+                logger.exception("Failed to export model")
+                sys.exit(1)
+            except TypeError as err:
+                logger.exception("Failed to export model")
+                sys.exit(1)
+            except PermissionError as err:
+                logger.exception("Failed to export model")
+                sys.exit(1)
+
+    elif sp_used == "serve":
+        # Imported here so the pipeline steps don't start the web app.
+        # The master loads the configuration and model and finishes warm-up
+        # before forking, so the workers share the model. Only the workers
+        # connect to the database, each with its own pool.
+        import tempfile
+        from app import create_app, get_services
+        from src.serve import PreforkServer
+        webapp = create_app()
+        services = get_services(webapp)
+        try:
+            services.init(warm_up_database=False)
+        except FileNotFoundError:
+            logger.error("Configuration file not found")
+            sys.exit(1)
+        except ValueError as e:
+            logger.error("Invalid configuration file: %s", e)
+            sys.exit(1)
+        if services.warm_up_thread is not None:
+            services.warm_up_thread.join()
+        if services.warm_up_failed.is_set():
+            logger.error("Warm-up failed, not starting the workers")
+            sys.exit(1)
+        # Workers share their metrics through files so /metrics reports all of them
+        if services.metrics.directory is None:
+            services.metrics.directory = tempfile.mkdtemp(prefix="metrics-")
+        services.metrics.clear_directory()
+        try:
+            PreforkServer(webapp, host=args.host, port=args.port,
+                          workers=args.workers, threads=args.threads,
+                          max_requests=args.max_requests or None,
+                          max_requests_jitter=args.max_requests_jitter,
+                          graceful_timeout=args.graceful_timeout,
+                          post_fork=services.post_fork,
+                          worker_exit=services.worker_exit,
+                          child_exit=services.metrics.collect_exited).run()
+        except OSError as e:
+            logger.exception("Failed to start server")
+            sys.exit(1)
+        except ValueError as e:
+            logger.exception("Failed to start server")
+            sys.exit(1)
+    elif sp_used == "model_server":
+        from src.model_server import ModelServer
+        model_path = args.model_path
+        if model_path is None:
+            from src.app_config import load_config
+            try:
+                model_path = load_config(args.config).model_path
+            except FileNotFoundError:
+                logger.error("Configuration file not found")
+                sys.exit(1)
+            except ValueError as e:
+                logger.error("Invalid configuration file: %s", e)
+                sys.exit(1)
+        try:
+            ModelServer(args.socket_path, model_path, workers=args.workers).run()
+        except FileNotFoundError as e:
+            logger.exception("Failed to start model server")
+            sys.exit(1)
+        except OSError as e:
+            logger.exception("Failed to start model server")
+            sys.exit(1)
+        except ValueError as e:
+            logger.exception("Failed to start model server")
+            sys.exit(1)
 
     else:
         parser.print_help()
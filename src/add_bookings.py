@@ -1,16 +1,24 @@
 """Creates, ingests data into, and enables querying of a table of
  bookings for the hotels to query from and display results to the user."""
 
+import collections
+import datetime
+import json
 import logging.config
+import re
 import sqlite3
+import threading
+import time
 import typing
 
-import flask
 import sqlalchemy
 import sqlalchemy.orm
-from flask_sqlalchemy import SQLAlchemy
+import sqlalchemy.pool
 from sqlalchemy.ext.declarative import declarative_base
 
+if typing.TYPE_CHECKING:
+    import flask
+
 logger = logging.getLogger(__name__)
 
 Base: typing.Any = declarative_base()
@@ -23,6 +31,18 @@ class Bookings(Base):
     # Define the table name
     __tablename__ = "bookings"
 
+    # Composite indexes matching how bookings are queried: the newest
+    # bookings of one hotel, and bookings per hotel or market segment by
+    # arrival week
+    __table_args__ = (
+        sqlalchemy.Index("ix_bookings_hotel_id", "hotel", "id"),
+        sqlalchemy.Index("ix_bookings_hotel_week", "hotel", "arrival_date_week_number"),
+        sqlalchemy.Index("ix_bookings_segment_week", "market_segment",
+                         "arrival_date_week_number"),
+        sqlalchemy.Index("ix_bookings_created_at", "created_at"),
+        sqlalchemy.Index("ix_bookings_model_version_created_at", "model_version", "created_at"),
+    )
+
     # Define the columns of the table
     id = sqlalchemy.Column(
         sqlalchemy.Integer, primary_key=True, autoincrement=True)
@@ -47,41 +67,304 @@ class Bookings(Base):
         sqlalchemy.Integer, primary_key=False)
     market_segment = sqlalchemy.Column(
         sqlalchemy.Integer, primary_key=False)
+    # Set on insert in UTC; NULL for bookings added before the column existed
+    created_at = sqlalchemy.Column(
+        sqlalchemy.DateTime, nullable=True, default=datetime.datetime.utcnow)
+    # The score the booking got when it was added, NULL for bookings added
+    # without one, e.g. from a file
+    prediction_prob = sqlalchemy.Column(sqlalchemy.Float, nullable=True)
+    prediction_label = sqlalchemy.Column(sqlalchemy.Integer, nullable=True)
+    model_version = sqlalchemy.Column(sqlalchemy.String(64), nullable=True)
+    scoring_latency_ms = sqlalchemy.Column(sqlalchemy.Float, nullable=True)
 
     def __repr__(self):
         return f"<Booking {self.id}>"
 
 
+class PoolStats:
+    """Counts connection checkouts from a pool and how long they waited.
+
+    The wait covers queueing for a free connection as well as opening a new
+    one when the pool is below its size.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        """Record one checkout, or one that gave up after ``wait_seconds``."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def stats(self) -> typing.Dict[str, float]:
+        """Report the checkouts and their mean and longest wait."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {"checkouts": self.checkouts,
+                    "timeouts": self.timeouts,
+                    "mean_wait_ms": self.total_wait_seconds / attempts * 1000 if attempts else 0.0,
+                    "max_wait_ms": self.max_wait_seconds * 1000}
+
+
+class TimedQueuePool(sqlalchemy.pool.QueuePool):
+    """QueuePool that times every checkout in a ``PoolStats``.
+
+    The statistics survive ``engine.dispose()``, which replaces the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def engine_options(engine_string: str, pool_size: int = 5, max_overflow: int = 10,
+                   pool_recycle: int = 1800, pool_pre_ping: bool = True,
+                   pool_timeout: float = 30,
+                   sqlite_tuning: bool = False) -> typing.Dict[str, typing.Any]:
+    """
+    Build the ``create_engine`` keyword arguments for the connection pool.
+
+    SQLite keeps the pool SQLAlchemy picks for it, which opens a new
+    connection for every checkout of a database file; only pre-ping and
+    recycle apply there. A tuned SQLite file is pooled like a server database
+    instead, so the connection PRAGMAs of ``tune_sqlite`` run once per pooled
+    connection rather than on every read.
+
+    Args:
+        engine_string (str): SQLAlchemy engine string of the database.
+        pool_size (int): Connections kept open in the pool.
+        max_overflow (int): Extra connections opened when the pool is exhausted.
+        pool_recycle (int): Seconds after which a connection is replaced, so
+            the server never closes one the pool still holds. -1 to disable.
+        pool_pre_ping (bool): Whether to test each connection on checkout and
+            replace it if it went stale.
+        pool_timeout (float): Seconds to wait for a free connection.
+        sqlite_tuning (bool): Whether an SQLite database file will be tuned
+            with ``tune_sqlite``.
+
+    Returns:
+        dict: The keyword arguments.
+    """
+    options: typing.Dict[str, typing.Any] = {"pool_pre_ping": pool_pre_ping,
+                                             "pool_recycle": pool_recycle}
+    if sqlalchemy.engine.make_url(engine_string).get_backend_name() != "sqlite":
+        options.update(poolclass=TimedQueuePool, pool_size=pool_size,
+                       max_overflow=max_overflow, pool_timeout=pool_timeout)
+    elif sqlite_tuning and is_file_sqlite(engine_string):
+        # The pool hands each connection to one thread at a time
+        options.update(poolclass=TimedQueuePool, pool_size=pool_size,
+                       max_overflow=max_overflow, pool_timeout=pool_timeout,
+                       connect_args={"check_same_thread": False})
+    return options
+
+
+def is_file_sqlite(url: typing.Union[str, sqlalchemy.engine.URL]) -> bool:
+    """Whether an engine string or URL points to an SQLite database file."""
+    url = sqlalchemy.engine.make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def tune_sqlite(engine: sqlalchemy.engine.Engine, busy_timeout: float = 5.0) -> None:
+    """
+    Configure every new connection of an SQLite engine for concurrent use.
+
+    Enables write-ahead logging, so readers no longer block the writer and
+    the other way round, relaxes fsyncs to ``synchronous=NORMAL``, which is
+    still safe from corruption in WAL mode, and makes a connection wait up
+    to ``busy_timeout`` for the write lock instead of failing with
+    "database is locked".
+
+    Args:
+        engine (:obj:`sqlalchemy.engine.Engine`): The SQLite engine.
+        busy_timeout (float): Seconds to wait for a lock held by another
+            connection.
+
+    Returns: None
+    """
+    def set_pragmas(dbapi_connection, connection_record):
+        # pylint: disable=unused-argument
+        cursor = dbapi_connection.cursor()
+        # The timeout first, so switching to WAL also waits for other connections
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    sqlalchemy.event.listen(engine, "connect", set_pragmas)
+
+
 class BookingManager:
     """Creates a SQLAlchemy connection to the bookings table.
+
+    Sessions are scoped: each thread, or each request within a Flask app,
+    gets its own session, and connections come from a pool shared by all of
+    them.
+
     Args:
         app (:obj:`flask.app.Flask`): Flask app object for when connecting from
             within a Flask app. Optional.
         engine_string (str): SQLAlchemy engine string specifying which database
             to write to. Follows the format
+        pool_size, max_overflow, pool_recycle, pool_pre_ping, pool_timeout:
+            Connection pool settings, see ``engine_options``. With an app
+            they apply unless ``SQLALCHEMY_ENGINE_OPTIONS`` is configured.
+        sqlite_tuning (bool): For an SQLite database file, enable WAL with
+            ``tune_sqlite`` and send all writes through one connection, so
+            concurrent writers queue in the process instead of failing on
+            the database lock. Reads use a pool of ``pool_size``
+            connections, like a server database.
+        busy_timeout (float): Seconds an SQLite connection waits for a lock
+            held by another process.
     """
 
-    def __init__(self, app: typing.Optional[flask.app.Flask] = None,
-                 engine_string: typing.Optional[str] = None):
+    def __init__(self, app: typing.Optional["flask.app.Flask"] = None,
+                 engine_string: typing.Optional[str] = None,
+                 pool_size: int = 5, max_overflow: int = 10, pool_recycle: int = 1800,
+                 pool_pre_ping: bool = True, pool_timeout: float = 30,
+                 sqlite_tuning: bool = False, busy_timeout: float = 5.0):
+        self.sqlite_tuning = sqlite_tuning
+        self.busy_timeout = busy_timeout
+        self.pool_timeout = pool_timeout
+        self._tune_lock = threading.Lock()
+        self._tuned = False
+        self._write_engine: typing.Optional[sqlalchemy.engine.Engine] = None
+        self._write_session: typing.Any = None
+        pool_settings = dict(pool_size=pool_size, max_overflow=max_overflow,
+                             pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping,
+                             pool_timeout=pool_timeout, sqlite_tuning=sqlite_tuning)
         if app:
-            # If app is provided, use it to create the engine
+            # If app is provided, use it to create the engine. Flask is only
+            # imported here so run.py create_db and ingest start without it.
+            from flask_sqlalchemy import SQLAlchemy
+            app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(
+                app.config["SQLALCHEMY_DATABASE_URI"], **pool_settings))
             self.database = SQLAlchemy(app)
+            # Flask-SQLAlchemy scopes the session to the app context
             self.session = self.database.session
         elif engine_string:
             # If engine_string is provided, use it to create the engine
-            engine = sqlalchemy.create_engine(engine_string)
-            session_maker = sqlalchemy.orm.sessionmaker(bind=engine)
-            self.session = session_maker()
+            self._engine = sqlalchemy.create_engine(
+                engine_string, **engine_options(engine_string, **pool_settings))
+            session_maker = sqlalchemy.orm.sessionmaker(bind=self._engine)
+            self.session = sqlalchemy.orm.scoped_session(session_maker)
         else:
             raise ValueError(
                 "Need either an engine string or a Flask app to initialize")
 
+    @property
+    def engine(self) -> sqlalchemy.engine.Engine:
+        """The SQLAlchemy engine behind the session."""
+        if hasattr(self, "database"):
+            engine = self.database.engine
+        else:
+            engine = self._engine
+        if self.sqlite_tuning and not self._tuned:
+            self._tune(engine)
+        return engine
+
+    @property
+    def write_engine(self) -> sqlalchemy.engine.Engine:
+        """The engine bookings are written with: the single-connection
+        writer of a tuned SQLite database, otherwise the shared engine."""
+        engine = self.engine
+        return self._write_engine or engine
+
+    @property
+    def write_session(self) -> typing.Any:
+        """The scoped session bookings are written with."""
+        if self.write_engine is self.engine:
+            return self.session
+        return self._write_session
+
+    def _tune(self, engine: sqlalchemy.engine.Engine) -> None:
+        """Set up WAL and the serialized writer once, before the first connection."""
+        with self._tune_lock:
+            if self._tuned:
+                return
+            if is_file_sqlite(engine.url):
+                tune_sqlite(engine, self.busy_timeout)
+                # One connection for all threads: writers wait for it in turn
+                self._write_engine = sqlalchemy.create_engine(
+                    engine.url, poolclass=TimedQueuePool, pool_size=1, max_overflow=0,
+                    pool_timeout=self.pool_timeout,
+                    connect_args={"check_same_thread": False})
+                tune_sqlite(self._write_engine, self.busy_timeout)
+                self._write_session = sqlalchemy.orm.scoped_session(
+                    sqlalchemy.orm.sessionmaker(bind=self._write_engine))
+                logger.info("SQLite tuned for concurrency at %s", engine.url)
+            self._tuned = True
+
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Report the state of the connection pool and how long checkouts waited.
+
+        Returns:
+            dict: The pool status, plus the checkout counts and waits of a
+                ``TimedQueuePool`` and its size, connections checked out and
+                overflow.
+        """
+        pool = self.engine.pool
+        stats: typing.Dict[str, typing.Any] = {"status": pool.status()}
+        if isinstance(pool, TimedQueuePool):
+            stats.update(pool.stats.stats())
+            stats.update(size=pool.size(), checked_out=pool.checkedout(),
+                         overflow=pool.overflow())
+        if self._write_engine is not None:
+            stats["writer"] = self._write_engine.pool.stats.stats()
+        return stats
+
+    def warm_up(self, connections: int = 1) -> None:
+        """Opens pooled connections ahead of the first request.
+
+        Args:
+            connections (int): How many connections to open at the same time,
+                so the pool holds that many once they are returned.
+
+        Returns: None
+        """
+        opened = []
+        try:
+            for _ in range(connections):
+                connection = self.engine.connect()
+                opened.append(connection)
+                connection.execute(sqlalchemy.text("SELECT 1"))
+            logger.info("Opened %d database connections", len(opened))
+        finally:
+            for connection in opened:
+                connection.close()
+
     def close(self) -> None:
         """Closes SQLAlchemy session
         Returns: None
         """
-        # Close the session
-        self.session.close()
+        # Close the session of this thread and discard it
+        self.session.remove()
+        if self._write_session is not None:
+            self._write_session.remove()
 
     def add_booking(self, hotel: int,
                     arrival_date_day_of_month: int,
@@ -93,7 +376,11 @@ class BookingManager:
                     stays_in_week_nights: int,
                     stays_in_weekend_nights: int,
                     total_of_special_requests: int,
-                    market_segment: int) -> None:
+                    market_segment: int,
+                    prediction_prob: typing.Optional[float] = None,
+                    prediction_label: typing.Optional[int] = None,
+                    model_version: typing.Optional[str] = None,
+                    scoring_latency_ms: typing.Optional[float] = None) -> None:
         """
         Adds a booking to the database.
 
@@ -113,12 +400,19 @@ class BookingManager:
             total_of_special_requests (int): The total number of special requests
                 for the booking.
             market_segment (int): The market segment of the booking.
+            prediction_prob (float): The predicted probability of cancellation.
+                Optional.
+            prediction_label (int): The predicted class, 1 for cancelled.
+                Optional.
+            model_version (str): The version of the model that scored the
+                booking. Optional.
+            scoring_latency_ms (float): How long scoring took. Optional.
 
         Returns: None
         """
         try:
             # Create a new booking object
-            session = self.session
+            session = self.write_session
             booking = Bookings(hotel=hotel,
                                arrival_date_day_of_month=arrival_date_day_of_month,
                                arrival_date_week_number=arrival_date_week_number,
@@ -129,9 +423,13 @@ class BookingManager:
                                stays_in_week_nights=stays_in_week_nights,
                                stays_in_weekend_nights=stays_in_weekend_nights,
                                total_of_special_requests=total_of_special_requests,
-                               market_segment=market_segment)
+                               market_segment=market_segment,
+                               prediction_prob=prediction_prob,
+                               prediction_label=prediction_label,
+                               model_version=model_version,
+                               scoring_latency_ms=scoring_latency_ms)
 
-            # Add the booking to the database
+            # Add the booking and its score to the database in one transaction
             session.add(booking)
             session.commit()
             logger.info("Booking added to database.")
@@ -145,9 +443,376 @@ class BookingManager:
             logger.error(
             "Error page returned. Not able to add booking to local sqlite database")
 
+    def add_bookings(self, path: str, chunksize: int = 10000,
+                     rejected_path: typing.Optional[str] = None) -> typing.Dict[str, float]:
+        """
+        Adds all bookings in a CSV, Parquet or JSON-lines file to the database.
+
+        The file is streamed in chunks. Each chunk is validated with
+        vectorized checks and its valid rows are inserted with a single
+        executemany in their own transaction. Rejected rows are appended to
+        a side file with the reason they were rejected.
+
+        Args:
+            path (str): The path of the bookings file.
+            chunksize (int): The number of rows validated and inserted at a time.
+            rejected_path (str): The CSV file rejected rows are written to.
+                Optional, defaults to ``<path>.rejected.csv``.
+
+        Returns:
+            dict: The rows read, inserted and rejected, the seconds taken and
+                the rows inserted per second.
+        """
+        # pandas is only needed here, so run.py ingest of a single booking starts without it
+        from src.ingest import read_booking_chunks, validate_bookings
+
+        if rejected_path is None:
+            rejected_path = path + ".rejected.csv"
+        insert = Bookings.__table__.insert()
+        rows = inserted = rejected = 0
+        start = time.perf_counter()
+        for chunk in read_booking_chunks(path, chunksize):
+            valid, invalid = validate_bookings(chunk)
+            if len(valid):
+                with self.write_engine.begin() as connection:
+                    connection.execute(insert, valid.to_dict("records"))
+            if len(invalid):
+                invalid.to_csv(rejected_path, mode="a" if rejected else "w",
+                               header=not rejected, index=False)
+            rows += len(chunk)
+            inserted += len(valid)
+            rejected += len(invalid)
+            logger.debug("Inserted %d of %d bookings", inserted, rows)
+
+        seconds = time.perf_counter() - start
+        rows_per_second = inserted / seconds if seconds > 0 else 0.0
+        logger.info("Inserted %d bookings from %s in %.2f s (%.0f rows/s)",
+                    inserted, path, seconds, rows_per_second)
+        if rejected:
+            logger.warning("Rejected %d bookings, written to %s", rejected, rejected_path)
+        return {"rows": rows, "inserted": inserted, "rejected": rejected,
+                "seconds": seconds, "rows_per_second": rows_per_second}
+
+    def prediction_history(self, model_version: typing.Optional[str] = None,
+                           since: typing.Optional[datetime.datetime] = None,
+                           limit: typing.Optional[int] = None) -> typing.List[typing.Any]:
+        """
+        Returns the stored scores of bookings, oldest first, without rescoring.
+
+        Bookings added without a score are left out.
+
+        Args:
+            model_version (str): Only return scores of this model version.
+                Optional.
+            since (datetime): Only return bookings added at or after this UTC
+                time. Optional.
+            limit (int): The maximum number of scores returned. Optional.
+
+        Returns:
+            list: Rows with the ``id``, ``created_at``, ``prediction_prob``,
+                ``prediction_label``, ``model_version`` and
+                ``scoring_latency_ms`` of each booking.
+        """
+        table = Bookings.__table__
+        query = (sqlalchemy.select(table.c.id, table.c.created_at, table.c.prediction_prob,
+                                   table.c.prediction_label, table.c.model_version,
+                                   table.c.scoring_latency_ms)
+                 .where(table.c.prediction_prob.isnot(None))
+                 .order_by(table.c.id.asc()))
+        if model_version is not None:
+            query = query.where(table.c.model_version == model_version)
+        if since is not None:
+            query = query.where(table.c.created_at >= since)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as connection:
+            return connection.execute(query).all()
+
+    def recent_bookings(self, limit: int,
+                        before: typing.Optional[int] = None,
+                        after: typing.Optional[int] = None,
+                        hotel: typing.Optional[int] = None
+                        ) -> typing.Tuple[typing.List[Bookings],
+                                          typing.Optional[int], typing.Optional[int]]:
+        """
+        Returns one page of bookings, newest first, using keyset pagination.
+
+        Each page is a single indexed range scan on the primary key, or on
+        the (hotel, id) index for one hotel, so the cost does not grow with
+        the size of the table.
+
+        Args:
+            limit (int): The maximum number of bookings on the page.
+            before (int): Only return bookings with an id below this cursor,
+                i.e. the next (older) page. Optional.
+            after (int): Only return bookings with an id above this cursor,
+                i.e. the previous (newer) page. Optional.
+            hotel (int): Only return bookings of this hotel. Optional.
+
+        Returns:
+            bookings (list): The bookings on the page, newest first.
+            older_cursor (int): Cursor for the next (older) page, or None
+                on the last page.
+            newer_cursor (int): Cursor for the previous (newer) page, or
+                None on the first page.
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        if before is not None and after is not None:
+            raise ValueError("Only one of before and after can be given")
+
+        query = self.session.query(Bookings)
+        if hotel is not None:
+            query = query.filter(Bookings.hotel == hotel)
+        if after is not None:
+            # Walk upwards from the cursor, then flip to newest first
+            rows = (query.filter(Bookings.id > after)
+                    .order_by(Bookings.id.asc()).limit(limit + 1).all())
+            has_newer = len(rows) > limit
+            bookings = list(reversed(rows[:limit]))
+            has_older = True
+        else:
+            if before is not None:
+                query = query.filter(Bookings.id < before)
+            rows = query.order_by(Bookings.id.desc()).limit(limit + 1).all()
+            has_older = len(rows) > limit
+            bookings = rows[:limit]
+            has_newer = before is not None
+
+        if not bookings:
+            return bookings, None, None
+        older_cursor = bookings[-1].id if has_older else None
+        newer_cursor = bookings[0].id if has_newer else None
+        return bookings, older_cursor, newer_cursor
+
+
+# Literals and whitespace that differ between otherwise identical statements
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a SQL statement to its shape so its executions can be grouped.
+
+    Literals and placeholders of every paramstyle become ``?``, lists of them
+    become a single ``(?)`` and whitespace is collapsed.
+
+    Args:
+        statement (str): The SQL statement as sent to the database.
+
+    Returns:
+        str: The normalized statement.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """Times every statement run on the engines it is attached to.
+
+    Timings are aggregated by normalized statement. Statements slower than
+    ``slow_query_seconds`` are appended to a JSON-lines slow-query log, and
+    identical statements run more than once between ``begin_request`` and
+    ``end_request`` in the same thread are reported as repeated.
+
+    Args:
+        slow_query_seconds (float): Statements taking at least this long are
+            logged as slow.
+        slow_query_log (str): The JSON-lines file slow statements are appended
+            to. Optional, they are only logged as warnings when not given.
+    """
+
+    # Most distinct raw statements whose normalized form is remembered
+    MAX_NORMALIZED = 1000
+
+    def __init__(self, slow_query_seconds: float = 0.1,
+                 slow_query_log: typing.Optional[str] = None):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_query_log = slow_query_log
+        # Guards the counters only, every statement takes it
+        self._lock = threading.Lock()
+        # Serializes the appends to the slow-query log
+        self._log_lock = threading.Lock()
+        self._local = threading.local()
+        self._normalized: typing.Dict[str, str] = {}
+        # Per normalized statement: executions, total and slowest seconds
+        self._timings: typing.Dict[str, typing.List[float]] = {}
+        self.queries = 0
+        self.slow_queries = 0
+        self.repeated_queries = 0
+
+    def attach(self, engine: sqlalchemy.engine.Engine) -> None:
+        """
+        Start timing the statements run on an engine.
+
+        Args:
+            engine (:obj:`sqlalchemy.engine.Engine`): The engine to instrument.
+
+        Returns: None
+        """
+        sqlalchemy.event.listen(engine, "before_cursor_execute", self._before_execute)
+        sqlalchemy.event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,too-many-arguments
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,too-many-arguments
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        normalized = self._normalized.get(statement)
+        if normalized is None:
+            normalized = normalize_statement(statement)
+            if len(self._normalized) >= self.MAX_NORMALIZED:
+                self._normalized.clear()
+            self._normalized[statement] = normalized
+
+        with self._lock:
+            self.queries += 1
+            timing = self._timings.get(normalized)
+            if timing is None:
+                timing = self._timings[normalized] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+        request_queries = getattr(self._local, "request_queries", None)
+        if request_queries is not None and not executemany:
+            request_queries[(statement, repr(parameters))] += 1
+
+        if elapsed >= self.slow_query_seconds:
+            self._log_slow_query(normalized, statement, parameters, elapsed)
+
+    def _log_slow_query(self, normalized: str, statement: str, parameters: typing.Any,
+                        elapsed: float) -> None:
+        """Report a slow statement."""
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, normalized)
+        with self._lock:
+            self.slow_queries += 1
+        if self.slow_query_log is None:
+            return
+        record = {"timestamp": time.time(),
+                  "duration_ms": elapsed * 1000,
+                  "statement": statement,
+                  "normalized": normalized,
+                  "parameters": repr(parameters)}
+        line = json.dumps(record) + "\n"
+        try:
+            with self._log_lock:
+                with open(self.slow_query_log, "a", encoding="utf-8") as log_file:
+                    log_file.write(line)
+        except OSError as e:
+            logger.error("Error writing slow query log %s: %s", self.slow_query_log, e)
+
+    def begin_request(self) -> None:
+        """Start collecting the statements run by this thread for one request.
+
+        Returns: None
+        """
+        self._local.request_queries = collections.Counter()
+
+    def end_request(self, label: str = "request") -> typing.Dict[str, int]:
+        """
+        Stop collecting and report identical statements run more than once.
+
+        Args:
+            label (str): Names the request in the warning, e.g. its route.
+
+        Returns:
+            dict: How often each repeated statement ran, by normalized statement.
+        """
+        request_queries = getattr(self._local, "request_queries", None)
+        self._local.request_queries = None
+        if not request_queries:
+            return {}
+        repeated = {}
+        for (statement, _), count in request_queries.items():
+            if count > 1:
+                normalized = self._normalized.get(statement) or normalize_statement(statement)
+                repeated[normalized] = max(repeated.get(normalized, 0), count)
+        if repeated:
+            with self._lock:
+                self.repeated_queries += len(repeated)
+            for normalized, count in repeated.items():
+                logger.warning("%s ran the same query %d times: %s", label, count, normalized)
+        return repeated
+
+    def stats(self, top: int = 10) -> typing.Dict[str, typing.Any]:
+        """
+        Report the statements taking the most time.
+
+        Args:
+            top (int): How many statements to report.
+
+        Returns:
+            dict: Query counts and the executions, total, mean and slowest
+                time of the ``top`` statements by total time.
+        """
+        with self._lock:
+            timings = sorted(self._timings.items(), key=lambda item: item[1][1], reverse=True)
+            return {"queries": self.queries,
+                    "slow_queries": self.slow_queries,
+                    "repeated_queries": self.repeated_queries,
+                    "statements": [{"statement": statement,
+                                    "count": count,
+                                    "total_ms": total * 1000,
+                                    "mean_ms": total / count * 1000,
+                                    "max_ms": slowest * 1000}
+                                   for statement, (count, total, slowest) in timings[:top]]}
+
+
+def migrate_db(engine: sqlalchemy.engine.Engine) -> typing.List[str]:
+    """Bring a bookings table created by an earlier version up to date.
+
+    Adds the ``created_at`` column and any missing indexes of the Bookings
+    data model. Existing bookings keep a NULL ``created_at``. Running it on
+    an up-to-date table does nothing.
+
+    Args:
+        engine (:obj:`sqlalchemy.engine.Engine`): Engine of the bookings database.
+
+    Returns:
+        list: The columns and indexes that were added.
+    """
+    table = Bookings.__table__
+    inspector = sqlalchemy.inspect(engine)
+    if not inspector.has_table(table.name):
+        return []
+    existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+    existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+
+    added = []
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            # Added as a nullable column without a default, which both
+            # SQLite and MySQL can do on a table that already has rows
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.execute(sqlalchemy.text(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(column.name)
+    for index in table.indexes:
+        if index.name not in existing_indexes:
+            index.create(engine)
+            added.append(index.name)
+    if added:
+        logger.info("Migrated %s table, added %s", table.name, ", ".join(added))
+    return added
+
 
 def create_db(engine_string: str) -> None:
     """Create database with Bookings() data model from provided engine string.
+
+    A bookings table that already exists is migrated to the current data
+    model with ``migrate_db``.
+
     Args:
         engine_string (str): SQLAlchemy engine string specifying which database
             to write to
@@ -156,6 +821,7 @@ def create_db(engine_string: str) -> None:
     try:
         # Create the database
         engine = sqlalchemy.create_engine(engine_string)
+        migrate_db(engine)
         Base.metadata.create_all(engine)
         logger.info("Database created.")
     except sqlalchemy.exc.OperationalError as e:
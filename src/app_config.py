@@ -0,0 +1,215 @@
+"""
+Cached, validated view of ``config/config.yaml`` that reloads itself when
+the file changes or the process receives SIGHUP.
+
+The file is parsed with libyaml's C loader when PyYAML was built with it and
+only parsed again once its modification time or size changes, so looking up
+a setting on every request costs at most an occasional ``os.stat``.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+import typing
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class AppConfig:
+    """A parsed and validated configuration file.
+
+    The sections are still available as dictionaries, e.g.
+    ``config["train"]["train"]``, for passing on as keyword arguments.
+
+    Args:
+        sections (dict): The parsed configuration file.
+        path (str): The path the configuration was read from. Optional.
+        signature (tuple): The (mtime_ns, size) of the file when read. Optional.
+    """
+
+    def __init__(self, sections: typing.Dict[str, typing.Any], path: typing.Optional[str] = None,
+                 signature: typing.Optional[typing.Tuple[int, int]] = None):
+        if not isinstance(sections, dict):
+            raise ValueError("The configuration must be a mapping of sections")
+        self.sections = sections
+        self.path = path
+        self.signature = signature
+
+        predict = sections.get("predict")
+        if not isinstance(predict, dict):
+            raise ValueError("The configuration needs a 'predict' section")
+        model_path = (predict.get("predict") or {}).get("model_path")
+        if not isinstance(model_path, str) or not model_path:
+            raise ValueError("predict.predict.model_path must be a non-empty string")
+        initial_features = (predict.get("booking_to_row") or {}).get("initial_features")
+        if not isinstance(initial_features, list) or not initial_features or \
+                not all(isinstance(feature, str) for feature in initial_features):
+            raise ValueError("predict.booking_to_row.initial_features must be a list of names")
+        max_rows_show = (sections.get("web") or {}).get("max_rows_show")
+        if max_rows_show is not None and (not isinstance(max_rows_show, int)
+                                          or max_rows_show <= 0):
+            raise ValueError("web.max_rows_show must be a positive integer")
+
+        self.model_path: str = model_path
+        self.initial_features: typing.List[str] = initial_features
+        self.max_rows_show: typing.Optional[int] = max_rows_show
+
+    def __getitem__(self, section: str) -> typing.Any:
+        return self.sections[section]
+
+    def __contains__(self, section: str) -> bool:
+        return section in self.sections
+
+    def __repr__(self):
+        return f"<AppConfig {self.path}>"
+
+
+def read_config(path: str) -> AppConfig:
+    """
+    Parse and validate a configuration file.
+
+    Args:
+        path (str): The path of the YAML configuration file.
+
+    Returns:
+        AppConfig: The validated configuration.
+    """
+    stat = os.stat(path)
+    with open(path, "r", encoding="utf-8") as ymlfile:
+        try:
+            sections = yaml.load(ymlfile, Loader=SafeLoader)
+        except yaml.YAMLError as err:
+            raise ValueError(f"{path} is not valid YAML: {err}") from err
+    return AppConfig(sections, path=path, signature=(stat.st_mtime_ns, stat.st_size))
+
+
+class ConfigManager:
+    """Keeps the parsed configuration cached and reloads it when it changes.
+
+    A configuration that fails to parse or validate on reload is logged and
+    the previous one stays in use.
+
+    Args:
+        path (str): The path of the YAML configuration file.
+        check_interval (float): Seconds between checks of the file on disk.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._config = read_config(path)
+        self._next_check = time.monotonic() + check_interval
+        self._reload_requested = False
+        self.reloads = 0
+        self.failed_reloads = 0
+        logger.info("Configuration read from %s", path)
+
+    def get(self) -> AppConfig:
+        """
+        Return the current configuration, reloading it first if the file changed.
+
+        Returns:
+            AppConfig: The current configuration.
+        """
+        now = time.monotonic()
+        if now < self._next_check and not self._reload_requested:
+            return self._config
+        with self._lock:
+            self._next_check = now + self.check_interval
+            force, self._reload_requested = self._reload_requested, False
+            try:
+                stat = os.stat(self.path)
+                changed = (stat.st_mtime_ns, stat.st_size) != self._config.signature
+            except OSError as err:
+                logger.error("Cannot check configuration file %s: %s", self.path, err)
+                return self._config
+            if force or changed:
+                self._reload()
+            return self._config
+
+    def _reload(self) -> None:
+        """Parse the file again, keeping the current configuration on errors."""
+        try:
+            config = read_config(self.path)
+        except (OSError, ValueError) as err:
+            self.failed_reloads += 1
+            logger.error("Keeping the previous configuration, %s is invalid: %s",
+                         self.path, err)
+            return
+        self._config = config
+        self.reloads += 1
+        logger.info("Configuration reloaded from %s", self.path)
+
+    def request_reload(self, *_) -> None:
+        """Reload on the next ``get``; safe to use as a signal handler."""
+        self._reload_requested = True
+
+    def install_signal_handler(self, signum: int = signal.SIGHUP) -> None:
+        """
+        Reload the configuration when the process receives a signal.
+
+        Args:
+            signum (int): The signal, SIGHUP by default.
+
+        Returns: None
+        """
+        signal.signal(signum, self.request_reload)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Report how often the configuration was reloaded.
+
+        Returns:
+            dict: The path, reload counts and the signature of the file in use.
+        """
+        return {"path": self.path,
+                "reloads": self.reloads,
+                "failed_reloads": self.failed_reloads,
+                "signature": list(self._config.signature or ())}
+
+
+# Managers shared by every caller in this process, keyed by absolute path
+_managers: typing.Dict[str, ConfigManager] = {}
+_managers_lock = threading.Lock()
+
+
+def load_config(path: str) -> AppConfig:
+    """
+    Return the configuration at ``path``, parsed at most once per change.
+
+    Args:
+        path (str): The path of the YAML configuration file.
+
+    Returns:
+        AppConfig: The current configuration.
+    """
+    return config_manager(path).get()
+
+
+def config_manager(path: str) -> ConfigManager:
+    """
+    Return the process-wide manager of the configuration at ``path``.
+
+    Args:
+        path (str): The path of the YAML configuration file.
+
+    Returns:
+        ConfigManager: The manager, created on first use.
+    """
+    key = os.path.abspath(path)
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = _managers[key] = ConfigManager(path)
+    return manager
@@ -0,0 +1,262 @@
+"""Write-behind persistence of bookings.
+
+Requests put their bookings on a bounded in-process queue and return
+immediately. A background thread writes the queued bookings in multi-row
+transactions once enough of them have accumulated or the oldest one has
+waited long enough, so database write latency stays off the request path.
+
+A batch that fails on a transient error (a locked database, a dropped
+connection) is retried with backoff. If it still fails, the bookings are
+written one by one so a single bad booking only loses itself, and any
+booking that cannot be written is appended to a dead-letter file.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import typing
+
+import sqlalchemy
+
+from src.add_bookings import Bookings
+
+logger = logging.getLogger(__name__)
+
+# Marker telling the writer thread to flush and stop
+_STOP = object()
+
+
+class BookingWriter:
+    """Background writer flushing queued bookings in batches.
+
+    Args:
+        engine (:obj:`sqlalchemy.engine.Engine`): Engine of the bookings database.
+        max_queue_size (int): The most bookings waiting to be written.
+        flush_size (int): Write as soon as this many bookings are queued.
+        flush_interval (float): Write at the latest this many seconds after
+            the oldest queued booking arrived.
+        put_timeout (float): How long ``enqueue`` waits for room in a full
+            queue before giving up.
+        max_retries (int): How often a batch is retried after a transient error.
+        retry_backoff (float): Seconds before the first retry, doubled for
+            every further one.
+        dead_letter_path (str): JSON-lines file the bookings that could not
+            be written are appended to. Optional, they are only logged when
+            not given.
+    """
+
+    def __init__(self, engine: sqlalchemy.engine.Engine, max_queue_size: int = 10000,
+                 flush_size: int = 100, flush_interval: float = 1.0,
+                 put_timeout: float = 0.05, max_retries: int = 3,
+                 retry_backoff: float = 0.05,
+                 dead_letter_path: typing.Optional[str] = None):
+        self.engine = engine
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._pid: typing.Optional[int] = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.flushes = 0
+        self.max_queue_depth = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread, again in a forked child or if it died.
+
+        The caller holds ``self._lock``.
+        """
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        if self._thread is not None and self._pid == os.getpid():
+            logger.error("Booking writer thread died, restarting it")
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="booking-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, booking: typing.Dict[str, typing.Any]) -> bool:
+        """Queues a booking to be written in the background.
+
+        Args:
+            booking (dict): The column values of the booking.
+
+        Returns:
+            bool: Whether the booking was queued. False when the writer is
+                closed or the queue stayed full for ``put_timeout`` seconds,
+                in which case the caller should write it directly.
+        """
+        # Under the lock so close() cannot drain the queue between the check and the put
+        with self._lock:
+            if self._closed:
+                return False
+            self._ensure_started()
+            try:
+                self._queue.put(booking, timeout=self.put_timeout)
+            except queue.Full:
+                self.rejected += 1
+                logger.warning("Booking write queue is full")
+                return False
+            self.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def _run(self) -> None:
+        """Writer loop executed by the background thread."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # Drain whatever was queued behind the stop marker
+        remaining_batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining_batch.append(item)
+        if remaining_batch:
+            self._flush(remaining_batch)
+
+    @staticmethod
+    def _is_transient(error: sqlalchemy.exc.SQLAlchemyError) -> bool:
+        """Whether retrying the same write may succeed."""
+        if isinstance(error, sqlalchemy.exc.DBAPIError) and error.connection_invalidated:
+            return True
+        return isinstance(error, (sqlalchemy.exc.OperationalError, sqlalchemy.exc.TimeoutError))
+
+    def _insert(self, rows: typing.List[typing.Dict[str, typing.Any]],
+                max_retries: int) -> None:
+        """Inserts rows in one transaction, retrying transient errors with backoff."""
+        delay = self.retry_backoff
+        for attempt in range(max_retries + 1):
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(Bookings.__table__.insert(), rows)
+                return
+            except sqlalchemy.exc.SQLAlchemyError as e:
+                if attempt == max_retries or not self._is_transient(e):
+                    raise
+                self.retries += 1
+                logger.warning("Retrying write of %d bookings in %.2f s: %s",
+                               len(rows), delay, e)
+                time.sleep(delay)
+                delay *= 2
+
+    def _dead_letter(self, failures: typing.List[typing.Tuple[dict, str]]) -> None:
+        """Appends bookings that could not be written to the dead-letter file."""
+        self.failed += len(failures)
+        if self.dead_letter_path is None:
+            logger.error("Dropped %d bookings that could not be written", len(failures))
+            return
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter_file:
+                for booking, error in failures:
+                    dead_letter_file.write(json.dumps({"booking": booking, "error": error},
+                                                      default=str) + "\n")
+        except OSError as e:
+            logger.error("Error writing %d bookings to %s: %s",
+                         len(failures), self.dead_letter_path, e)
+            return
+        self.dead_lettered += len(failures)
+        logger.error("Wrote %d bookings that could not be saved to %s",
+                     len(failures), self.dead_letter_path)
+
+    def _flush(self, batch: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """Writes one batch of bookings in a single transaction."""
+        start = time.perf_counter()
+        try:
+            self._insert(batch, self.max_retries)
+        except Exception as e:  # pylint: disable=broad-except
+            # Anything escaping here would kill the writer thread
+            logger.error("Error writing %d bookings to database, writing them one by one: %s",
+                         len(batch), e)
+            # Only the bookings that fail on their own are lost; the batch was
+            # already retried, so a row gets a single attempt
+            failures = []
+            for booking in batch:
+                try:
+                    self._insert([booking], 0)
+                except Exception as row_error:  # pylint: disable=broad-except
+                    failures.append((booking, str(row_error)))
+                else:
+                    self.written += 1
+            if failures:
+                self._dead_letter(failures)
+            return
+        elapsed = time.perf_counter() - start
+        self.written += len(batch)
+        self.flushes += 1
+        self.last_flush_seconds = elapsed
+        self.total_flush_seconds += elapsed
+        logger.debug("Wrote %d bookings in %.1f ms", len(batch), elapsed * 1000)
+
+    def close(self) -> None:
+        """Stops accepting bookings and writes everything still queued.
+
+        Returns: None
+        """
+        with self._lock:
+            self._closed = True
+            if (self._thread is not None and self._pid == os.getpid()
+                    and not self._queue.empty()):
+                # A writer thread that died would leave the queued bookings behind
+                self._ensure_started()
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+            logger.info("Booking writer stopped after writing %d bookings", self.written)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """Reports queue depth and flush latency.
+
+        Returns:
+            dict: Queue depth, bookings queued, rejected, written, failed
+                and dead-lettered, retries, and the number and latency of
+                flushes.
+        """
+        return {"queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "written": self.written,
+                "failed": self.failed,
+                "retries": self.retries,
+                "dead_lettered": self.dead_lettered,
+                "flushes": self.flushes,
+                "last_flush_seconds": self.last_flush_seconds,
+                "mean_flush_seconds": (self.total_flush_seconds / self.flushes
+                                       if self.flushes else 0.0)}
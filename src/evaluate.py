@@ -4,13 +4,15 @@ Module to evaluate the decision tree model.
 
 import logging
 import typing
-import pickle
 
 import pandas as pd
 import sklearn.tree
 from sklearn.metrics import accuracy_score, roc_auc_score, confusion_matrix, classification_report, f1_score
 from sklearn.exceptions import NotFittedError
 
+from src.model_registry import load_model
+from src.tree_evaluator import CompiledTree
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,8 +46,7 @@ def score_model(x_test_path: typing.Union[str, pd.DataFrame],
         try:
             # Load the model
             logger.info("Loading the model from %s", model_path)
-            with open(model_path, "rb") as file_handle:
-                dtree = pickle.load(file_handle)
+            dtree = load_model(model_path)
         except FileNotFoundError as err:
             raise FileNotFoundError("Model file not found") from err
 
@@ -72,6 +73,75 @@ def score_model(x_test_path: typing.Union[str, pd.DataFrame],
     return pd.DataFrame(ypred_proba_test), pd.DataFrame(ypred_bin_test)
 
 
+def score_model_chunked(x_test_path: str,
+                        model_path: typing.Union[str, sklearn.tree.DecisionTreeClassifier],
+                        ypred_proba_path: str, ypred_bin_path: str,
+                        initial_features: typing.List[str],
+                        chunksize: int = 100000) -> int:
+    """
+    Score the model on a CSV file chunk by chunk, appending the predictions
+    to the output files as it goes so memory stays flat for any input size.
+    The output files have the same format as those written from ``score_model``.
+    Args:
+        x_test_path (str): The path of the testing features.
+        model_path (str/sklearn.tree.DecisionTreeClassifier): The path or trained
+            model object of the trained model.
+        ypred_proba_path (str): The path to save the predicted probabilities.
+        ypred_bin_path (str): The path to save the predicted labels.
+        initial_features (list): The initial features.
+        chunksize (int): The number of rows scored at a time.
+    Returns:
+        n_rows (int): The number of rows scored.
+    """
+    if not isinstance(x_test_path, str):
+        raise TypeError("x_test_path must be a string")
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive")
+
+    if isinstance(model_path, str):
+        try:
+            logger.info("Loading the model from %s", model_path)
+            dtree = load_model(model_path)
+        except FileNotFoundError as err:
+            raise FileNotFoundError("Model file not found") from err
+    else:
+        dtree = model_path
+
+    try:
+        # Walks the tree once per row for both the label and the probability
+        compiled = CompiledTree.from_model(dtree)
+    except TypeError as err:
+        logger.error("Error: %s", err)
+        raise err
+
+    n_rows = 0
+    try:
+        logger.info("Scoring %s in chunks of %d rows", x_test_path, chunksize)
+        for chunk in pd.read_csv(x_test_path, usecols=initial_features, chunksize=chunksize):
+            ypred_bin_chunk, ypred_proba_chunk = compiled.predict_with_proba(
+                chunk[initial_features])
+            first = n_rows == 0
+            pd.DataFrame(ypred_proba_chunk[:, 1]).to_csv(
+                ypred_proba_path, mode="w" if first else "a", header=first, index=False)
+            pd.DataFrame(ypred_bin_chunk).to_csv(
+                ypred_bin_path, mode="w" if first else "a", header=first, index=False)
+            n_rows += len(chunk)
+            logger.debug("Scored %d rows", n_rows)
+    except FileNotFoundError as err:
+        logger.error("Error: The file %s does not exist", x_test_path)
+        raise FileNotFoundError from err
+    except ValueError as err:
+        logger.error("Error: %s", err)
+        raise err
+
+    if n_rows == 0:
+        # Header-only outputs, like score_model on an empty input
+        pd.DataFrame(columns=[0]).to_csv(ypred_proba_path, index=False)
+        pd.DataFrame(columns=[0]).to_csv(ypred_bin_path, index=False)
+    logger.info("Scored %d rows", n_rows)
+    return n_rows
+
+
 def evaluate_model(y_test_path: str, ypred_proba_path: str,
                    ypred_bin_path: str) -> None:
     """
@@ -0,0 +1,145 @@
+"""
+Reading and validating bookings from partner feed files for bulk ingestion.
+
+Files are read in chunks so memory stays flat for any file size, and every
+chunk is validated with vectorized checks instead of row by row.
+"""
+
+import logging
+import os
+import typing
+
+import numpy as np
+import pandas as pd
+
+from config.flaskconfig import HOTEL_TYPE
+
+logger = logging.getLogger(__name__)
+
+# Columns of the bookings table, in insertion order
+BOOKING_COLUMNS = ["hotel",
+                   "arrival_date_day_of_month",
+                   "arrival_date_week_number",
+                   "reservation_day",
+                   "reservation_month",
+                   "reservation_weekday",
+                   "lead_time",
+                   "stays_in_week_nights",
+                   "stays_in_weekend_nights",
+                   "total_of_special_requests",
+                   "market_segment"]
+
+# Model feature names accepted for the reservation date columns
+COLUMN_ALIASES = {"day": "reservation_day",
+                  "month": "reservation_month",
+                  "weekday": "reservation_weekday"}
+
+# Inclusive range of valid values per column, None for no upper bound
+VALID_RANGES = {"hotel": (0, 1),
+                "arrival_date_day_of_month": (1, 31),
+                "arrival_date_week_number": (1, 53),
+                "reservation_day": (1, 31),
+                "reservation_month": (1, 12),
+                "reservation_weekday": (0, 6),
+                "lead_time": (0, None),
+                "stays_in_week_nights": (0, None),
+                "stays_in_weekend_nights": (0, None),
+                "total_of_special_requests": (0, None),
+                "market_segment": (0, None)}
+
+FILE_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+                ".jsonl": "jsonl", ".json": "jsonl"}
+
+
+def file_format(path: str) -> str:
+    """
+    Determine the format of a bookings file from its extension.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: One of ``csv``, ``parquet`` or ``jsonl``.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise ValueError(f"Unsupported bookings file {path}, expected one of "
+                         f"{', '.join(sorted(FILE_FORMATS))}")
+    return FILE_FORMATS[extension]
+
+
+def read_booking_chunks(path: str, chunksize: int = 10000) -> typing.Iterator[pd.DataFrame]:
+    """
+    Stream a CSV, Parquet or JSON-lines file of bookings chunk by chunk.
+
+    Args:
+        path (str): The path of the file.
+        chunksize (int): The number of rows per chunk.
+
+    Returns:
+        Iterator of pd.DataFrame: The chunks, in file order.
+    """
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive")
+    fmt = file_format(path)
+    if not os.path.exists(path):
+        logger.error("Error: The file %s does not exist", path)
+        raise FileNotFoundError(path)
+
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunksize)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunksize)
+    else:
+        try:
+            import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise ValueError("Reading Parquet files requires pyarrow") from err
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def validate_bookings(chunk: pd.DataFrame) -> typing.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split a chunk of bookings into valid and rejected rows.
+
+    A row is rejected when a column is missing, not a whole number or out
+    of its range in ``VALID_RANGES``. The hotel can be given by type or by
+    code.
+
+    Args:
+        chunk (pd.DataFrame): The bookings as read from the file.
+
+    Returns:
+        valid (pd.DataFrame): The valid rows with the ``BOOKING_COLUMNS`` as
+            integers.
+        rejected (pd.DataFrame): The rejected rows as read, with a
+            ``reason`` column naming the first invalid column.
+    """
+    chunk = chunk.rename(columns=COLUMN_ALIASES)
+    missing = [column for column in BOOKING_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Bookings file is missing columns {missing}")
+
+    bookings = chunk[BOOKING_COLUMNS].copy()
+    if bookings["hotel"].dtype == object:
+        bookings["hotel"] = bookings["hotel"].replace(
+            {hotel: code for code, hotel in enumerate(HOTEL_TYPE)})
+    bookings = bookings.apply(pd.to_numeric, errors="coerce")
+
+    # One flag per row and column, True where the value is invalid
+    invalid = bookings.isna() | (bookings % 1 != 0)
+    for column, (low, high) in VALID_RANGES.items():
+        invalid[column] |= bookings[column] < low
+        if high is not None:
+            invalid[column] |= bookings[column] > high
+
+    rejected_mask = invalid.any(axis=1).to_numpy()
+    rejected = chunk[rejected_mask].copy()
+    if rejected_mask.any():
+        rejected["reason"] = "invalid " + invalid[rejected_mask].idxmax(axis=1)
+    else:
+        rejected["reason"] = pd.Series(dtype=object)
+    valid = bookings[~rejected_mask].astype(np.int64)
+    return valid, rejected
@@ -0,0 +1,394 @@
+"""
+Lightweight counters and latency histograms exposed in the Prometheus text format.
+
+Recording a value is a bucket lookup and a few integer increments under a
+lock, cheap enough to leave on in production. Every process keeps its own
+values; when a metrics directory is configured, a background thread in each
+process also dumps its values there every second, so that any worker of a
+pre-forked server can report the totals of all of them. When a worker exits,
+the master folds its last dump into a running total and removes the dump, so
+replaced workers are neither lost nor counted twice.
+"""
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+# Dump holding the final values of every worker that has exited
+TOTAL_FILE = "metrics_total.json"
+
+# Upper bounds in seconds, from sub-millisecond scoring to slow page renders
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: typing.Sequence[str], labelvalues: typing.Sequence[str],
+                   extra: str = "") -> str:
+    """Render a label set as ``{name="value",...}``."""
+    pairs = ['%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+             for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, integers without a decimal point."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Monotonically increasing count per label set.
+
+    Args:
+        name (str): The metric name.
+        documentation (str): The help text of the metric.
+        labelnames (tuple): The names of the labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: typing.Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """
+        Increase the count of a label set.
+
+        Args:
+            *labelvalues (str): The label values, in the order of ``labelnames``.
+            amount (float): How much to add.
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self) -> list:
+        """Return the values as JSON-serializable ``[labelvalues, value]`` pairs."""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def reset(self) -> None:
+        """Drop all values."""
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(snapshots: typing.Iterable[list]) -> typing.Dict[tuple, float]:
+        """Add up the snapshots of several processes."""
+        merged: typing.Dict[tuple, float] = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot:
+                merged[tuple(labels)] = merged.get(tuple(labels), 0) + value
+        return merged
+
+    def render(self, merged: typing.Dict[tuple, float]) -> typing.List[str]:
+        """Render merged values as exposition lines."""
+        return ["%s%s %s" % (self.name, _format_labels(self.labelnames, labels),
+                             _format_value(value))
+                for labels, value in sorted(merged.items())]
+
+
+class _Timer:
+    """Context manager observing the time spent in its block."""
+
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: "Histogram", labelvalues: tuple):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+class Histogram:
+    """Distribution of observed values per label set over fixed buckets.
+
+    Args:
+        name (str): The metric name.
+        documentation (str): The help text of the metric.
+        labelnames (tuple): The names of the labels.
+        buckets (tuple): The sorted upper bounds of the buckets; an
+            unbounded bucket is always added.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = (),
+                 buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be sorted")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: one count per bucket plus the unbounded one, then sum
+        self._values: typing.Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """
+        Record one value.
+
+        Args:
+            value (float): The observed value, e.g. a latency in seconds.
+            *labelvalues (str): The label values, in the order of ``labelnames``.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(labelvalues)
+            if values is None:
+                values = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+
+    def time(self, *labelvalues: str) -> _Timer:
+        """
+        Time a block of code.
+
+        Args:
+            *labelvalues (str): The label values, in the order of ``labelnames``.
+
+        Returns:
+            A context manager recording the time spent in its block.
+        """
+        return _Timer(self, labelvalues)
+
+    def snapshot(self) -> list:
+        """Return the values as JSON-serializable ``[labelvalues, values]`` pairs."""
+        with self._lock:
+            return [[list(labels), list(values)] for labels, values in self._values.items()]
+
+    def reset(self) -> None:
+        """Drop all values."""
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(snapshots: typing.Iterable[list]) -> typing.Dict[tuple, list]:
+        """Add up the snapshots of several processes."""
+        merged: typing.Dict[tuple, list] = {}
+        for snapshot in snapshots:
+            for labels, values in snapshot:
+                total = merged.get(tuple(labels))
+                if total is None:
+                    merged[tuple(labels)] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return merged
+
+    def render(self, merged: typing.Dict[tuple, list]) -> typing.List[str]:
+        """Render merged values as cumulative bucket, sum and count lines."""
+        lines = []
+        for labels, values in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append("%s_bucket%s %d" % (
+                    self.name, _format_labels(self.labelnames, labels, 'le="%s"' % le),
+                    cumulative))
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append("%s_sum%s %s" % (self.name, label_text, repr(float(values[-1]))))
+            lines.append("%s_count%s %d" % (self.name, label_text, cumulative))
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on ``/metrics``.
+
+    Args:
+        directory (str): Directory where every process dumps its values so
+            the totals of all processes can be reported. Optional, only this
+            process is reported when not given.
+        flush_interval (float): Seconds between dumps to ``directory``.
+    """
+
+    def __init__(self, directory: typing.Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: typing.Dict[str, typing.Union[Counter, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._pid: typing.Optional[int] = None
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: typing.Sequence[str] = ()) -> Counter:
+        """
+        Create and register a counter.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text of the metric.
+            labelnames (tuple): The names of the labels.
+
+        Returns:
+            Counter: The new counter.
+        """
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: typing.Sequence[str] = (),
+                  buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Create and register a histogram.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text of the metric.
+            labelnames (tuple): The names of the labels.
+            buckets (tuple): The sorted upper bounds of the buckets.
+
+        Returns:
+            Histogram: The new histogram.
+        """
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def reset(self) -> None:
+        """Drop the values of every metric, e.g. in a freshly forked worker."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def _write(self, path: str, snapshot: dict) -> None:
+        """Write a snapshot atomically, so readers never see a partial file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file)
+        os.replace(tmp_path, path)
+
+    def flush(self) -> None:
+        """Dump the values of this process to the metrics directory.
+
+        Returns: None
+        """
+        if self.directory is None:
+            return
+        snapshot = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        path = os.path.join(self.directory, "metrics_%d.json" % os.getpid())
+        try:
+            self._write(path, snapshot)
+        except OSError as err:
+            logger.warning("Failed to write metrics to %s: %s", path, err)
+
+    def collect_exited(self, pid: int) -> None:
+        """Fold the last dump of an exited process into the total and remove it.
+
+        Called by the master after reaping a worker, so the dump of a replaced
+        worker is not reported next to its replacement, nor overwritten when
+        its pid is reused.
+
+        Args:
+            pid (int): The process id of the exited worker.
+
+        Returns: None
+        """
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, "metrics_%d.json" % pid)
+        total_path = os.path.join(self.directory, TOTAL_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as err:
+            logger.warning("Dropping metrics file %s: %s", path, err)
+            os.remove(path)
+            return
+        try:
+            with open(total_path, "r", encoding="utf-8") as file:
+                total = json.load(file)
+        except FileNotFoundError:
+            total = {}
+        except (OSError, ValueError) as err:
+            logger.warning("Starting a new metrics total, %s is unreadable: %s", total_path, err)
+            total = {}
+
+        for name, metric in self._metrics.items():
+            merged = metric.merge([total.get(name, []), snapshot.get(name, [])])
+            total[name] = [[list(labels), value] for labels, value in merged.items()]
+        try:
+            self._write(total_path, total)
+        except OSError as err:
+            logger.warning("Failed to write metrics to %s: %s", total_path, err)
+            return
+        os.remove(path)
+
+    def _run(self) -> None:
+        """Flushing loop executed by the background thread."""
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def start_flushing(self) -> None:
+        """Start dumping to the metrics directory, again in a forked child if needed."""
+        if self.directory is None or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="metrics-flush",
+                                                daemon=True)
+                self._thread.start()
+
+    def clear_directory(self) -> None:
+        """Remove the dumps of earlier processes from the metrics directory."""
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            os.remove(path)
+
+    def _snapshots(self) -> typing.List[dict]:
+        """Collect the values of this process and the dumps of all others."""
+        snapshots = [{name: metric.snapshot() for name, metric in self._metrics.items()}]
+        if self.directory is None:
+            return snapshots
+        own_path = os.path.join(self.directory, "metrics_%d.json" % os.getpid())
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            if path == own_path:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError) as err:
+                logger.warning("Skipping metrics file %s: %s", path, err)
+        return snapshots
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        snapshots = self._snapshots()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append("# HELP %s %s" % (name, metric.documentation))
+            lines.append("# TYPE %s %s" % (name, metric.kind))
+            lines.extend(metric.render(metric.merge(s.get(name, []) for s in snapshots)))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,253 @@
+"""
+In-process micro-batching of concurrent single-row predictions.
+
+Each request thread submits its feature row and waits. A background thread
+collects the rows that arrive within a short window (or until the batch is
+full), scores them with one vectorized model call and hands every waiting
+request its own result.
+"""
+import concurrent.futures
+import logging
+import os
+import queue
+import threading
+import time
+import typing
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects single rows into batches for one vectorized model call.
+
+    The batch size limit adapts to the observed scoring time: it doubles
+    while full batches are scored within the window and halves when a batch
+    takes longer than the window, so the batcher never adds more delay than
+    it saves.
+
+    Args:
+        predict_fn (callable): Scores a 2-D array of rows and returns one
+            result per row.
+        max_batch_size (int): The largest batch ever scored in one call.
+        max_wait_ms (float): How long the first row of a batch waits for
+            more rows to arrive.
+        max_queue_size (int): The most rows waiting to be batched before
+            ``submit`` blocks.
+        adaptive (bool): Whether to adapt the batch size limit.
+        score_budget_ms (float): How long scoring may take before a waiting
+            request gives up, on top of ``max_wait_ms``.
+    """
+
+    def __init__(self, predict_fn: typing.Callable[[np.ndarray], typing.Sequence[typing.Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0,
+                 max_queue_size: int = 10000, adaptive: bool = True,
+                 score_budget_ms: float = 1000.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Default wait for a result, so a stuck scoring call cannot hang requests
+        self.timeout = self.max_wait + score_budget_ms / 1000
+        self.adaptive = adaptive
+        self.batch_limit = max_batch_size if not adaptive else max(1, max_batch_size // 4)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._pid: typing.Optional[int] = None
+        self._closed = False
+        self._scoring: list = []
+
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.total_score_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def _ensure_started(self) -> None:
+        """Start the batching thread, again in a forked child if needed."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher",
+                                                daemon=True)
+                self._thread.start()
+
+    def submit(self, row: np.ndarray) -> concurrent.futures.Future:
+        """
+        Queue one feature row for scoring.
+
+        Args:
+            row (np.ndarray): The feature row.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the result for this row.
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        self._ensure_started()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put((row, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def predict(self, row: np.ndarray, timeout: typing.Optional[float] = None) -> typing.Any:
+        """
+        Score one feature row as part of a batch and wait for its result.
+
+        Args:
+            row (np.ndarray): The feature row.
+            timeout (float): Seconds to wait for the result. Optional,
+                defaults to the batching window plus the scoring budget.
+
+        Returns:
+            The result ``predict_fn`` returned for this row.
+
+        Raises:
+            concurrent.futures.TimeoutError: The result did not arrive in time.
+        """
+        return self.submit(row).result(timeout=self.timeout if timeout is None else timeout)
+
+    def _collect(self) -> typing.Optional[list]:
+        """Block for the first row, then gather rows until the window closes."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_limit:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the shutdown marker back so the loop ends after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        """Batching loop executed by the background thread."""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._score(batch)
+
+    @staticmethod
+    def _resolve(future: concurrent.futures.Future, result: typing.Any = None,
+                 error: typing.Optional[BaseException] = None) -> None:
+        """Resolve a future unless ``close`` already failed it."""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except concurrent.futures.InvalidStateError:
+            pass
+
+    def _score(self, batch: list) -> None:
+        """Score one batch and resolve the futures of its rows."""
+        self._scoring = batch
+        start = time.perf_counter()
+        try:
+            results = self.predict_fn(np.vstack([row for row, _, _ in batch]))
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error("Error scoring a batch of %d rows: %s", len(batch), err)
+            if len(batch) == 1:
+                self._resolve(batch[0][1], error=err)
+            else:
+                self._score_one_by_one(batch)
+            return
+        finally:
+            self._scoring = []
+        elapsed = time.perf_counter() - start
+
+        for (_, future, queued_at), result in zip(batch, results):
+            self.total_wait_seconds += start - queued_at
+            self._resolve(future, result)
+
+        self.batches += 1
+        self.items += len(batch)
+        self.total_score_seconds += elapsed
+        if self.adaptive:
+            self._adapt(len(batch), elapsed)
+
+    def _score_one_by_one(self, batch: list) -> None:
+        """Score the rows of a failed batch separately, so only the bad rows fail."""
+        for row, future, _ in batch:
+            try:
+                result = self.predict_fn(row.reshape(1, -1))[0]
+            except Exception as err:  # pylint: disable=broad-except
+                self._resolve(future, error=err)
+            else:
+                self._resolve(future, result)
+
+    def _adapt(self, batch_size: int, elapsed: float) -> None:
+        """Grow the limit while full batches stay fast, shrink it when they are slow."""
+        if elapsed > self.max_wait and self.batch_limit > 1:
+            self.batch_limit = max(1, self.batch_limit // 2)
+        elif batch_size >= self.batch_limit and self.batch_limit < self.max_batch_size:
+            self.batch_limit = min(self.max_batch_size, self.batch_limit * 2)
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """
+        Stop accepting rows and finish the rows already queued.
+
+        Rows that are not scored within the timeout, or that were queued in
+        another process and have no batching thread here, fail with a
+        ``RuntimeError`` instead of leaving their requests waiting.
+
+        Args:
+            timeout (float): Seconds to wait for the queued rows. Optional,
+                defaults to the batching window plus the scoring budget.
+        """
+        self._closed = True
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join(self.timeout if timeout is None else timeout)
+            if self._thread.is_alive():
+                logger.warning("MicroBatcher did not finish its queued rows before closing")
+
+        error = RuntimeError("MicroBatcher is closed")
+        for _, future, _ in self._scoring:
+            self._resolve(future, error=error)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._resolve(item[1], error=error)
+        if self._thread is not None and self._thread.is_alive():
+            # The shutdown marker was drained too, the stuck thread still needs it
+            self._queue.put(None)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Report queue depth and batching metrics.
+
+        Returns:
+            dict: Current and peak queue depth, batch counts and sizes, the
+                current batch size limit and average wait and scoring time.
+        """
+        return {"queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_limit": self.batch_limit,
+                "mean_wait_seconds": self.total_wait_seconds / self.items if self.items else 0.0,
+                "mean_score_seconds": (self.total_score_seconds / self.batches
+                                       if self.batches else 0.0)}
@@ -0,0 +1,163 @@
+"""
+Memory-mappable model artifact format for fitted decision trees.
+
+A pickled model has to be deserialized into private memory by every process
+that loads it. This format stores the flattened tree arrays as raw buffers
+behind a small JSON header instead, so loading is an ``mmap`` of the file and
+all web workers on a host share one page-cached copy of the tree. The
+normalized leaf probabilities and predicted classes are stored too, so
+nothing derived from the tree has to be recomputed into private memory.
+
+Layout::
+
+    8 bytes   magic ``HBTREE01``
+    8 bytes   little-endian length of the JSON header
+    n bytes   JSON header (array dtypes, shapes and offsets, classes,
+              feature names and a checksum of the array data)
+    ...       the raw arrays, each starting on a 64-byte boundary
+"""
+import hashlib
+import json
+import logging
+import os
+import struct
+import typing
+
+import numpy as np
+
+from src.tree_evaluator import CompiledTree
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HBTREE01"
+ARTIFACT_SUFFIX = ".tree"
+ALIGNMENT = 64
+
+# Arrays stored in the artifact and the dtype each one is written with
+ARRAY_DTYPES = {"children_left": "<i8",
+                "children_right": "<i8",
+                "feature": "<i8",
+                "threshold": "<f8",
+                "value": "<f8",
+                "node_proba": "<f8",
+                "node_class_index": "<i8"}
+
+# Bumped whenever the layout changes; older artifacts have to be re-exported
+FORMAT = 2
+
+
+def _pad(length: int) -> int:
+    """Return the number of bytes needed to reach the next aligned offset."""
+    return -length % ALIGNMENT
+
+
+def export_model(model: typing.Any, artifact_path: str) -> str:
+    """
+    Write a fitted decision tree as a memory-mappable artifact.
+
+    Args:
+        model (DecisionTreeClassifier/CompiledTree): The fitted model.
+        artifact_path (str): The path to save the artifact.
+
+    Returns:
+        version (str): Short checksum of the array data, used as model version.
+    """
+    tree = CompiledTree.from_model(model)
+    arrays = {name: np.ascontiguousarray(getattr(tree, name), dtype=dtype)
+              for name, dtype in ARRAY_DTYPES.items()}
+
+    checksum = hashlib.sha256()
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape),
+                        "offset": offset}
+        checksum.update(array.tobytes())
+        offset += array.nbytes + _pad(array.nbytes)
+    version = checksum.hexdigest()[:12]
+
+    header = json.dumps({"format": FORMAT,
+                         "version": version,
+                         "classes": tree.classes_.tolist(),
+                         "feature_names": tree.feature_names,
+                         "arrays": layout}).encode("utf-8")
+    prefix_length = len(MAGIC) + 8 + len(header)
+
+    # Write next to the target and swap it in, so readers never see a partial file
+    tmp_path = artifact_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<Q", len(header)))
+            file.write(header)
+            file.write(b"\0" * _pad(prefix_length))
+            for array in arrays.values():
+                file.write(array.tobytes())
+                file.write(b"\0" * _pad(array.nbytes))
+        os.replace(tmp_path, artifact_path)
+    except FileNotFoundError as err:
+        logger.error("Error: %s", err)
+        raise err
+    logger.info("Model exported to %s (version %s)", artifact_path, version)
+    return version
+
+
+def read_header(artifact_path: str) -> typing.Tuple[dict, int]:
+    """
+    Read the JSON header of an artifact without touching the array data.
+
+    Args:
+        artifact_path (str): The path of the artifact.
+
+    Returns:
+        header (dict): The parsed header.
+        data_offset (int): The file offset where the array data starts.
+    """
+    with open(artifact_path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            logger.error("%s is not a model artifact", artifact_path)
+            raise ValueError(f"{artifact_path} is not a model artifact")
+        try:
+            (header_length,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_length).decode("utf-8"))
+        except (struct.error, UnicodeDecodeError) as err:
+            raise ValueError(f"{artifact_path} has a corrupt header") from err
+    prefix_length = len(MAGIC) + 8 + header_length
+    return header, prefix_length + _pad(prefix_length)
+
+
+def load_model_artifact(artifact_path: str) -> typing.Tuple[CompiledTree, str]:
+    """
+    Memory-map an artifact written by ``export_model``.
+
+    Args:
+        artifact_path (str): The path of the artifact.
+
+    Returns:
+        tree (CompiledTree): The tree, backed by read-only views of the file.
+        version (str): The version recorded in the artifact.
+    """
+    header, data_offset = read_header(artifact_path)
+    if header.get("format") != FORMAT:
+        # Format 1 lacked the leaf arrays; re-export with run.py model_pipeline --step export
+        raise ValueError(f"Unsupported artifact format {header.get('format')}, "
+                         f"re-export {artifact_path} from the pickled model")
+
+    buffer = np.memmap(artifact_path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name in ARRAY_DTYPES:
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        offset = data_offset + spec["offset"]
+        if offset + dtype.itemsize * int(np.prod(spec["shape"])) > buffer.size:
+            # Most likely the artifact is still being written
+            raise ValueError(f"{artifact_path} is truncated")
+        arrays[name] = np.ndarray(tuple(spec["shape"]), dtype=dtype,
+                                  buffer=buffer, offset=offset)
+
+    tree = CompiledTree(arrays["children_left"], arrays["children_right"],
+                        arrays["feature"], arrays["threshold"], arrays["value"],
+                        np.asarray(header["classes"]), header["feature_names"],
+                        node_proba=arrays["node_proba"],
+                        node_class_index=arrays["node_class_index"])
+    return tree, header["version"]
@@ -0,0 +1,225 @@
+"""
+Process-wide registry that loads each trained model artifact only once and
+picks up retrained artifacts when the file on disk changes.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import typing
+
+from src.model_artifact import ARTIFACT_SUFFIX, load_model_artifact
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedModel:
+    """A model loaded from disk together with the metadata identifying it.
+
+    Args:
+        model: The deserialized model object.
+        path (str): The absolute path of the artifact.
+        version (str): Short checksum of the artifact bytes.
+        signature (tuple): The (mtime_ns, size) of the artifact when loaded.
+        load_seconds (float): Time spent reading and deserializing the artifact.
+        derived (dict): Objects already derived from this model. Optional.
+    """
+
+    def __init__(self, model: typing.Any, path: str, version: str,
+                 signature: typing.Tuple[int, int], load_seconds: float,
+                 derived: typing.Optional[typing.Dict[str, typing.Any]] = None):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.derived: typing.Dict[str, typing.Any] = derived if derived is not None else {}
+
+    def derive(self, name: str, factory: typing.Callable[[typing.Any], typing.Any]) -> typing.Any:
+        """
+        Return ``factory(model)``, computed once per loaded model version.
+
+        Args:
+            name (str): Cache key of the derived object.
+            factory (callable): Function building the derived object from the model.
+
+        Returns:
+            The derived object, e.g. a compiled evaluator for the model.
+        """
+        try:
+            return self.derived[name]
+        except KeyError:
+            derived = factory(self.model)
+            self.derived[name] = derived
+            return derived
+
+    def __repr__(self):
+        return f"<LoadedModel {self.path}@{self.version}>"
+
+
+def read_pickle(path: str) -> typing.Tuple[typing.Any, str]:
+    """
+    Deserialize a pickled model.
+
+    Args:
+        path (str): The path of the pickled model.
+
+    Returns:
+        model: The deserialized model object.
+        version (str): Short checksum of the artifact bytes.
+    """
+    with open(path, "rb") as model_file:
+        data = model_file.read()
+    return pickle.loads(data), hashlib.sha256(data).hexdigest()[:12]
+
+
+def read_model(path: str) -> typing.Tuple[typing.Any, str]:
+    """
+    Load a model artifact, memory-mapping it when it is in the ``.tree`` format.
+
+    Args:
+        path (str): The path of the artifact.
+
+    Returns:
+        model: The model object.
+        version (str): The version of the artifact.
+    """
+    if path.endswith(ARTIFACT_SUFFIX):
+        return load_model_artifact(path)
+    return read_pickle(path)
+
+
+class ModelRegistry:
+    """Caches loaded models keyed by path, invalidated on mtime/size change.
+
+    Every lookup costs one ``os.stat``. The artifact is only read again when
+    its modification time or size differs from the cached entry, and the new
+    entry replaces the old one in a single assignment so concurrent readers
+    see either the old or the new model, never a partially loaded one.
+
+    Args:
+        loader (callable): Function loading the artifact at a path and
+            returning the model and its version. Defaults to ``read_model``.
+    """
+
+    def __init__(self, loader: typing.Callable[[str], typing.Tuple[typing.Any, str]] = read_model):
+        self._loader = loader
+        self._entries: typing.Dict[str, LoadedModel] = {}
+        self._lock = threading.Lock()
+        self._load_counts: typing.Dict[str, int] = {}
+        self._load_seconds: typing.Dict[str, float] = {}
+        self._failed_loads = 0
+
+    def get(self, model_path: str) -> LoadedModel:
+        """
+        Return the cached model for ``model_path``, loading it if needed.
+
+        Args:
+            model_path (str): The path of the trained model.
+
+        Returns:
+            LoadedModel: The model and its version metadata.
+        """
+        path = os.path.abspath(model_path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                return entry
+            try:
+                new_entry = self._load(path, signature, entry)
+            except (pickle.UnpicklingError, EOFError, ValueError) as err:
+                self._failed_loads += 1
+                if entry is None:
+                    logger.error("Failed to load model from %s", path)
+                    raise err
+                # Most likely the artifact is still being written; keep
+                # serving the previous model and retry on the next lookup
+                logger.warning("Failed to reload model from %s, keeping version %s",
+                               path, entry.version)
+                return entry
+            self._entries[path] = new_entry
+        return new_entry
+
+    def get_model(self, model_path: str) -> typing.Any:
+        """
+        Return only the model object for ``model_path``.
+
+        Args:
+            model_path (str): The path of the trained model.
+
+        Returns:
+            The deserialized model object.
+        """
+        return self.get(model_path).model
+
+    def _load(self, path: str, signature: typing.Tuple[int, int],
+              previous: typing.Optional[LoadedModel]) -> LoadedModel:
+        """Load the artifact at ``path`` and record how long it took."""
+        start = time.perf_counter()
+        model, version = self._loader(path)
+        elapsed = time.perf_counter() - start
+
+        if previous is not None and previous.version == version:
+            # Only the mtime changed (e.g. the file was touched)
+            logger.debug("Model %s unchanged at version %s", path, version)
+            return LoadedModel(previous.model, path, version, signature,
+                               previous.load_seconds, previous.derived)
+
+        self._load_counts[path] = self._load_counts.get(path, 0) + 1
+        self._load_seconds[path] = self._load_seconds.get(path, 0.0) + elapsed
+        logger.info("Loaded model %s version %s in %.1f ms",
+                    path, version, elapsed * 1000)
+        return LoadedModel(model, path, version, signature, elapsed)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Summarize how often each artifact was loaded and how long it took.
+
+        Returns:
+            dict: Load counts, cumulative and last load latency per path.
+        """
+        with self._lock:
+            models = {}
+            for path, entry in self._entries.items():
+                models[path] = {"version": entry.version,
+                                "loads": self._load_counts.get(path, 0),
+                                "total_load_seconds": self._load_seconds.get(path, 0.0),
+                                "last_load_seconds": entry.load_seconds}
+            return {"loads": sum(self._load_counts.values()),
+                    "failed_loads": self._failed_loads,
+                    "models": models}
+
+    def clear(self) -> None:
+        """Drop every cached model and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._load_counts.clear()
+            self._load_seconds.clear()
+            self._failed_loads = 0
+
+
+# Shared by every consumer in the process
+registry = ModelRegistry()
+
+
+def load_model(model_path: str) -> typing.Any:
+    """
+    Load a trained model through the process-wide registry.
+
+    Args:
+        model_path (str): The path of the trained model.
+
+    Returns:
+        The deserialized model object.
+    """
+    return registry.get_model(model_path)
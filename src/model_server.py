@@ -0,0 +1,224 @@
+"""
+Model server scoring feature rows for the web workers over a Unix socket.
+
+A pool of forked processes holds the loaded model and answers scoring
+requests on a Unix domain socket, so scoring no longer competes for the GIL
+with request handling in the web workers and both can be scaled separately.
+The model is loaded before forking and picked up again by every process when
+the file on disk changes.
+
+Every message is a fixed little-endian header followed by raw array data.
+
+Request::
+
+    uint32    number of rows
+    uint32    number of features
+    float32   the rows, row-major
+
+Response::
+
+    uint8     status, 0 for success
+    uint32    number of rows (length of the error message on failure)
+    uint32    number of classes
+    16 bytes  model version, ASCII padded with NUL bytes
+    int64     the predicted class of each row
+    float64   the class probabilities of each row, row-major
+
+A connection carries any number of request/response pairs.
+"""
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import typing
+
+import numpy as np
+
+from src.model_registry import registry
+from src.serve import PreforkServer
+from src.tree_evaluator import CompiledTree
+
+logger = logging.getLogger(__name__)
+
+REQUEST_HEADER = struct.Struct("<II")
+RESPONSE_HEADER = struct.Struct("<BII16s")
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Largest request accepted, so a corrupt header cannot exhaust memory
+MAX_ROWS = 100000
+MAX_FEATURES = 1024
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytearray:
+    """
+    Read exactly ``size`` bytes from a socket.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        size (int): The number of bytes to read.
+
+    Returns:
+        bytearray: The bytes read.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += count
+    return buffer
+
+
+def encode_request(rows: np.ndarray) -> bytes:
+    """
+    Frame feature rows as a scoring request.
+
+    Args:
+        rows (np.ndarray): One row or a 2-D array of rows.
+
+    Returns:
+        bytes: The request message.
+    """
+    rows = np.ascontiguousarray(rows, dtype="<f4")
+    if rows.ndim == 1:
+        rows = rows.reshape(1, -1)
+    return REQUEST_HEADER.pack(*rows.shape) + rows.tobytes()
+
+
+def read_response(sock: socket.socket) -> typing.Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Read one scoring response from the model server.
+
+    Args:
+        sock (socket.socket): The connection to the model server.
+
+    Returns:
+        classes (np.ndarray): The predicted class of each row.
+        proba (np.ndarray): The class probabilities of each row.
+        version (str): The version of the model that scored the rows.
+    """
+    status, n_rows, n_classes, version = RESPONSE_HEADER.unpack(
+        recv_exact(sock, RESPONSE_HEADER.size))
+    if status != STATUS_OK:
+        message = recv_exact(sock, n_rows).decode("utf-8")
+        raise ValueError(f"Model server error: {message}")
+    classes = np.frombuffer(recv_exact(sock, n_rows * 8), dtype="<i8")
+    proba = np.frombuffer(recv_exact(sock, n_rows * n_classes * 8),
+                          dtype="<f8").reshape(n_rows, n_classes)
+    return classes, proba, version.rstrip(b"\0").decode("ascii")
+
+
+class _ScoringHandler(socketserver.BaseRequestHandler):
+    """Answers the scoring requests of one connection until it is closed."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                n_rows, n_features = REQUEST_HEADER.unpack(
+                    recv_exact(self.request, REQUEST_HEADER.size))
+                if n_rows > MAX_ROWS or n_features > MAX_FEATURES:
+                    self._send_error(f"At most {MAX_ROWS} rows of {MAX_FEATURES} features")
+                    return
+                payload = recv_exact(self.request, n_rows * n_features * 4)
+            except ConnectionError:
+                return
+            rows = np.frombuffer(payload, dtype="<f4").reshape(n_rows, n_features)
+            try:
+                entry = registry.get(self.server.model_path)
+                tree = entry.derive("compiled_tree", CompiledTree.from_model)
+                classes, proba = tree.predict_with_proba(rows)
+            except (ValueError, OSError) as err:
+                logger.warning("Failed to score %d rows: %s", n_rows, err)
+                self._send_error(str(err))
+                continue
+            self.request.sendall(
+                RESPONSE_HEADER.pack(STATUS_OK, n_rows, proba.shape[1],
+                                     entry.version.encode("ascii"))
+                + np.ascontiguousarray(classes, dtype="<i8").tobytes()
+                + np.ascontiguousarray(proba, dtype="<f8").tobytes())
+
+    def _send_error(self, message: str) -> None:
+        """Reply with an error message instead of predictions."""
+        encoded = message.encode("utf-8")
+        self.request.sendall(RESPONSE_HEADER.pack(STATUS_ERROR, len(encoded), 0, b"")
+                             + encoded)
+
+
+class ScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded server answering scoring requests on a bound Unix socket.
+
+    Args:
+        fd (int): Descriptor of the already bound listening socket.
+        model_path (str): The path of the model used for scoring.
+    """
+
+    # Connections are long-lived, so don't wait for them when stopping
+    daemon_threads = True
+
+    def __init__(self, fd: int, model_path: str):
+        super().__init__(None, _ScoringHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, fileno=os.dup(fd))
+        self.model_path = model_path
+
+
+class ModelServer(PreforkServer):
+    """Pool of forked processes serving the model on a Unix socket.
+
+    Args:
+        socket_path (str): The path of the Unix socket to listen on.
+        model_path (str): The path of the model used for scoring.
+        workers (int): Scoring processes kept running.
+        graceful_timeout (float): Seconds a stopping process gets to exit
+            before it is killed.
+    """
+
+    def __init__(self, socket_path: str, model_path: str, workers: int = 2,
+                 graceful_timeout: float = 10.0):
+        super().__init__(None, workers=workers, threads=1, graceful_timeout=graceful_timeout)
+        self.socket_path = socket_path
+        self.model_path = model_path
+
+    def _bind(self) -> socket.socket:
+        """Create the Unix socket shared by all scoring processes."""
+        if os.path.exists(self.socket_path):
+            # Left behind by a server that did not shut down cleanly
+            os.unlink(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        sock.listen(socketserver.UnixStreamServer.request_queue_size)
+        sock.set_inheritable(True)
+        return sock
+
+    def _serve_worker(self) -> None:
+        """Answer scoring requests until the process is told to stop."""
+        server = ScoringServer(self.socket.fileno(), self.model_path)
+
+        def _stop(*_):
+            # shutdown() waits for serve_forever, which runs in this thread
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, _stop)
+        server.serve_forever()
+        server.socket.close()
+
+    def run(self) -> None:
+        """Load the model, then fork and supervise the scoring processes.
+
+        Returns: None
+        """
+        entry = registry.get(self.model_path)
+        entry.derive("compiled_tree", CompiledTree.from_model)
+        logger.info("Serving model %s (version %s) on %s",
+                    self.model_path, entry.version, self.socket_path)
+        try:
+            super().run()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
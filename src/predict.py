@@ -2,13 +2,186 @@
 This module contains functions used to make prediction based on the new user input.
 """
 import logging
+import math
+import os
+import socket
+import threading
 import typing
-import pickle
 import pandas as pd
 import numpy as np
 
+from src.model_registry import LoadedModel, registry
+from src.micro_batch import MicroBatcher
+from src.model_server import encode_request, read_response
+from src.prediction_cache import PredictionCache
+from src.tree_evaluator import CompiledTree
+
 logger = logging.getLogger(__name__)
 
+
+def load_compiled_tree(model_path: str) -> CompiledTree:
+    """
+    Load the trained model through the registry as a compiled tree.
+
+    Args:
+        model_path (str): The path of the trained model.
+
+    Returns:
+        CompiledTree: The flattened tree, compiled once per model version.
+    """
+    return registry.get(model_path).derive("compiled_tree", CompiledTree.from_model)
+
+
+def current_model_version(model_path: str,
+                          client: typing.Optional["ModelServerClient"] = None
+                          ) -> typing.Optional[str]:
+    """
+    Return the version of the model that scores in this process.
+
+    Args:
+        model_path (str): The path of the trained model.
+        client (ModelServerClient): The model server client, when rows are
+            scored there. Optional.
+
+    Returns:
+        str: The version the model server reported for its latest response
+            when a client is given, without loading the model here (None
+            before the first response). The version of the local model
+            otherwise.
+    """
+    if client is not None:
+        return client.version
+    return registry.get(model_path).version
+
+
+CANCELLED_LABEL = "Booking is likely to be cancelled"
+CONFIRMED_LABEL = "Booking is likely to be confirmed"
+
+
+class MissingFeaturesError(KeyError):
+    """A booking in a batch lacks features the model needs.
+
+    Args:
+        index (int): The position of the booking in the batch.
+        missing (list): The missing feature names.
+    """
+
+    def __init__(self, index: int, missing: typing.List[str]):
+        super().__init__(index, missing)
+        self.index = index
+        self.missing = missing
+
+    def __str__(self):
+        return f"Booking {self.index} is missing features {self.missing}"
+
+
+class ModelServerClient:
+    """Client scoring feature rows on the model server started by ``run.py model_server``.
+
+    Every thread keeps its own connection open across requests. A request
+    on a connection that the server closed, e.g. because a scoring process
+    was replaced, is retried once on a fresh connection.
+
+    Args:
+        socket_path (str): The path of the model server's Unix socket.
+        timeout (float): Seconds to wait for a connection or a response.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 1.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.version: typing.Optional[str] = None
+        self._local = threading.local()
+        self.requests = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    def _connection(self) -> socket.socket:
+        """Return this thread's connection, opening it if needed."""
+        sock = getattr(self._local, "sock", None)
+        if sock is not None and self._local.pid == os.getpid():
+            return sock
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        # A connection inherited across fork belongs to the parent
+        self._local.pid = os.getpid()
+        return sock
+
+    def _disconnect(self) -> None:
+        """Close this thread's connection."""
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            if self._local.pid == os.getpid():
+                sock.close()
+            self._local.sock = None
+
+    def score(self, rows: np.ndarray) -> typing.Tuple[np.ndarray, np.ndarray, str]:
+        """
+        Score feature rows on the model server.
+
+        Args:
+            rows (np.ndarray): One feature row or a 2-D array of rows.
+
+        Returns:
+            classes (np.ndarray): The predicted class of each row.
+            proba (np.ndarray): The class probabilities of each row.
+            version (str): The version of the model that scored the rows.
+        """
+        request = encode_request(rows)
+        self.requests += 1
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(request)
+                classes, proba, version = read_response(sock)
+                break
+            except ConnectionError as e:
+                self._disconnect()
+                if attempt:
+                    self.errors += 1
+                    logger.error("Model server at %s unavailable", self.socket_path)
+                    raise e
+                self.reconnects += 1
+            except OSError as e:
+                # Timed out, the connection may hold a late response
+                self._disconnect()
+                self.errors += 1
+                logger.error("Error scoring on model server: %s", e)
+                raise e
+        self.version = version
+        return classes, proba, version
+
+    def predict_rows(self, rows: np.ndarray) -> typing.List[typing.Tuple[str, np.ndarray]]:
+        """
+        Make predictions for many feature rows on the model server.
+
+        Args:
+            rows (np.ndarray): The feature rows in the order the model was trained on.
+
+        Returns:
+            list: The prediction and probability of each row, shaped like the
+                result of ``predict_rows``.
+        """
+        classes, proba, _ = self.score(rows)
+        return [(CANCELLED_LABEL if label == 1 else CONFIRMED_LABEL, row_proba.reshape(1, -1))
+                for label, row_proba in zip(classes, proba)]
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Report the requests made to the model server.
+
+        Returns:
+            dict: Requests, reconnects, errors and the last model version seen.
+        """
+        return {"socket_path": self.socket_path,
+                "requests": self.requests,
+                "reconnects": self.reconnects,
+                "errors": self.errors,
+                "model_version": self.version}
+
+
 def predict(df:pd.DataFrame, model_path:str) -> typing.Tuple[str,float]:
     """
     Make prediction based on the new user input.
@@ -31,21 +204,19 @@ def predict(df:pd.DataFrame, model_path:str) -> typing.Tuple[str,float]:
 
     try:
         logging.info("Predicting based on the new user input")
-        # Load the model
-        with open(model_path, "rb") as model_file:
-            model = pickle.load(model_file)
+        # Load the model (cached after the first call)
+        model = load_compiled_tree(model_path)
 
         # log transformation
         df["lead_time"] = df["lead_time"].apply(lambda x: np.log(int(x)+1))
 
-        # Make prediction
-        prediction_bin = model.predict(df)
-        prediction_proba = model.predict_proba(df)
+        # Make prediction, walking the tree once for the label and probability
+        prediction_bin, prediction_proba = model.predict_with_proba(df)
 
         if prediction_bin == 1:
-            prediction = "Booking is likely to be cancelled"
+            prediction = CANCELLED_LABEL
         else:
-            prediction = "Booking is likely to be confirmed"
+            prediction = CONFIRMED_LABEL
     except FileNotFoundError as e:
         logger.error("Model file not found")
         raise e
@@ -56,3 +227,213 @@ def predict(df:pd.DataFrame, model_path:str) -> typing.Tuple[str,float]:
         logger.error("Invalid input data")
         raise e
     return prediction, prediction_proba
+
+
+def predict_batch(records: typing.Union[typing.List[dict], pd.DataFrame],
+                  model_path: str,
+                  client: typing.Optional[ModelServerClient] = None,
+                  initial_features: typing.Optional[typing.List[str]] = None
+                  ) -> typing.Tuple[typing.List[str], np.ndarray]:
+    """
+    Make predictions for many bookings with a single vectorized model call.
+
+    Args:
+        records (list/pd.DataFrame): The bookings to score, either as a list of
+            dictionaries keyed by feature name or as a dataframe.
+        model_path (str): The path of the trained model.
+        client (ModelServerClient): Scores the bookings on the model server.
+            Optional, they are scored in this process when not given.
+        initial_features (list): The features in the order the model was
+            trained on. Optional, taken from the model when not given;
+            required with a client, so the model is not loaded here.
+
+    Returns:
+        predictions(list): The prediction of each booking.
+        prediction_proba(np.ndarray): The class probabilities of each booking.
+
+    Raises:
+        MissingFeaturesError: A booking lacks one of the features, which
+            would otherwise be scored as NaN.
+    """
+    if initial_features is None:
+        if client is not None:
+            logger.error("Feature names are needed to score on the model server")
+            raise ValueError("initial_features are required when scoring with a client")
+        initial_features = load_compiled_tree(model_path).feature_names
+
+    if isinstance(records, pd.DataFrame):
+        df = records.copy()
+    elif isinstance(records, list):
+        for index, record in enumerate(records):
+            missing = [feature for feature in initial_features if feature not in record]
+            if missing:
+                logger.error("Booking %d is missing features %s", index, missing)
+                raise MissingFeaturesError(index, missing)
+        df = pd.DataFrame.from_records(records)
+    else:
+        logger.error("Invalid input data")
+        raise ValueError("records must be a list of dictionaries or a pandas DataFrame")
+
+    if not isinstance(model_path, str):
+        logger.error("Invalid model path")
+        raise ValueError("model_path must be a string")
+
+    if df.empty:
+        logger.error("No bookings to predict")
+        raise ValueError("records must contain at least one booking")
+
+    try:
+        logger.info("Predicting %d bookings", len(df))
+
+        # Select the columns in the order the model was trained on
+        features = df[initial_features].astype(float)
+
+        # log transformation
+        features["lead_time"] = np.log(features["lead_time"] + 1)
+
+        # One pass over the tree for the whole batch
+        if client is not None:
+            prediction_bin, prediction_proba, _ = client.score(features.to_numpy())
+        else:
+            model = load_compiled_tree(model_path)
+            prediction_bin, prediction_proba = model.predict_with_proba(features)
+        predictions = [CANCELLED_LABEL if label == 1 else CONFIRMED_LABEL
+                       for label in prediction_bin]
+    except FileNotFoundError as e:
+        logger.error("Model file not found")
+        raise e
+    except KeyError as e:
+        logger.error("Invalid column name")
+        raise e
+    except ValueError as e:
+        logger.error("Invalid input data")
+        raise e
+    return predictions, prediction_proba
+
+
+def booking_to_row(booking: typing.Mapping[str, typing.Any],
+                   initial_features: typing.List[str]) -> np.ndarray:
+    """
+    Turn one booking straight into a feature row, without building a dataframe.
+
+    Args:
+        booking (dict): The feature values of the booking keyed by feature name,
+            with ``hotel`` already encoded.
+        initial_features (list): The features in the order the model was trained on.
+
+    Returns:
+        np.ndarray: The feature row with the log transformation of ``lead_time``
+            applied.
+
+    Raises:
+        ValueError: A value is not a number, or not finite as a float32.
+    """
+    row = np.empty(len(initial_features), dtype=np.float32)
+    try:
+        for i, feature in enumerate(initial_features):
+            if feature == "lead_time":
+                # log1p rounds to the same float32 value as np.log(x + 1)
+                row[i] = math.log1p(int(booking[feature]))
+            else:
+                row[i] = float(booking[feature])
+    except KeyError as e:
+        logger.error("Invalid column name")
+        raise e
+    except ValueError as e:
+        logger.error("Invalid input data")
+        raise e
+    # Refused here, before the row can be batched with other requests
+    if not np.isfinite(row).all():
+        logger.error("Invalid input data")
+        raise ValueError("Booking contains NaN, infinity or a value too large for float32")
+    return row
+
+
+def predict_rows(rows: np.ndarray, model_path: str) -> typing.List[typing.Tuple[str, np.ndarray]]:
+    """
+    Make predictions for many feature rows built by ``booking_to_row``.
+
+    Args:
+        rows (np.ndarray): The feature rows in the order the model was trained on.
+        model_path (str): The path of the trained model.
+
+    Returns:
+        list: The prediction and probability of each row, shaped like the
+            result of ``predict_row``.
+    """
+    model = load_compiled_tree(model_path)
+    prediction_bin, prediction_proba = model.predict_with_proba(rows)
+    return [(CANCELLED_LABEL if label == 1 else CONFIRMED_LABEL, proba.reshape(1, -1))
+            for label, proba in zip(prediction_bin, prediction_proba)]
+
+
+def predict_row(row: np.ndarray, model_path: str,
+                cache: typing.Optional[PredictionCache] = None,
+                batcher: typing.Optional[MicroBatcher] = None,
+                client: typing.Optional[ModelServerClient] = None,
+                entry: typing.Optional[LoadedModel] = None
+                ) -> typing.Tuple[str, np.ndarray]:
+    """
+    Make prediction for a single feature row built by ``booking_to_row``.
+
+    Args:
+        row (np.ndarray): The feature row in the order the model was trained on.
+        model_path (str): The path of the trained model.
+        cache (PredictionCache): Cache of earlier predictions, keyed on the
+            feature tuple and the model version. Optional.
+        batcher (MicroBatcher): Batcher scoring concurrent rows together with
+            ``predict_rows``. Optional, the row is scored directly when not given.
+        client (ModelServerClient): Scores the row on the model server when
+            no batcher is given. Optional. The model is then never loaded in
+            this process and cached predictions are keyed on the version the
+            server reports.
+        entry (LoadedModel): The registry entry of ``model_path`` to score
+            with when there is no client. Optional, looked up when not given;
+            passing it keeps the model scored the one the caller read the
+            version of.
+
+    Returns:
+        prediction(str): The prediction of the new user input.
+        prediction_proba(np.ndarray): The probability of the prediction, with
+            the same shape as returned by ``predict``.
+    """
+    try:
+        if client is not None:
+            version = client.version
+        else:
+            if entry is None:
+                entry = registry.get(model_path)
+            version = entry.version
+        if cache is not None:
+            key = tuple(row.tolist())
+            # Nothing can be cached before the model server reported its version
+            cached = cache.get(key, version) if version is not None else None
+            if cached is not None:
+                return cached
+
+        if batcher is not None:
+            result = batcher.predict(row)
+            if client is not None:
+                version = client.version
+        elif client is not None:
+            prediction_bin, prediction_proba, version = client.score(row)
+            result = (CANCELLED_LABEL if prediction_bin[0] == 1 else CONFIRMED_LABEL,
+                      prediction_proba[0].reshape(1, -1))
+        else:
+            model = entry.derive("compiled_tree", CompiledTree.from_model)
+            prediction_bin, prediction_proba = model.predict_one(row)
+            if prediction_bin == 1:
+                prediction = CANCELLED_LABEL
+            else:
+                prediction = CONFIRMED_LABEL
+            result = prediction, prediction_proba.reshape(1, -1)
+    except FileNotFoundError as e:
+        logger.error("Model file not found")
+        raise e
+    except ValueError as e:
+        logger.error("Invalid input data")
+        raise e
+
+    if cache is not None and version is not None:
+        cache.put(key, version, result)
+    return result
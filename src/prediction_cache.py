@@ -0,0 +1,115 @@
+"""
+Bounded LRU/TTL cache of predictions keyed on the booking feature tuple.
+
+All model inputs are small integers, so identical feature vectors repeat
+constantly in production traffic. Entries are tied to the model version and
+the whole cache is flushed as soon as a different version is looked up.
+"""
+import collections
+import logging
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of predictions with an optional time-to-live.
+
+    Args:
+        max_size (int): The most predictions kept before the least recently
+            used one is evicted.
+        ttl_seconds (float): How long a prediction stays valid. Optional,
+            entries never expire when not given.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: typing.Optional[float] = None):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "collections.OrderedDict[tuple, tuple]" = collections.OrderedDict()
+        self._version: typing.Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def _check_version(self, version: str) -> None:
+        """Flush every entry when the model version changes. Caller holds the lock."""
+        if version != self._version:
+            if self._entries:
+                logger.info("Model version changed to %s, flushing %d cached predictions",
+                            version, len(self._entries))
+                self._entries.clear()
+                self.flushes += 1
+            self._version = version
+
+    def get(self, key: tuple, version: str) -> typing.Optional[typing.Any]:
+        """
+        Look up the cached prediction for a feature tuple.
+
+        Args:
+            key (tuple): The normalized feature tuple.
+            version (str): The version of the model making the prediction.
+
+        Returns:
+            The cached prediction, or None on a miss.
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, version: str, value: typing.Any) -> None:
+        """
+        Store the prediction for a feature tuple.
+
+        Args:
+            key (tuple): The normalized feature tuple.
+            version (str): The version of the model that made the prediction.
+            value: The prediction to cache.
+        """
+        expires = None
+        if self.ttl_seconds is not None:
+            expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached prediction."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Report the hit and miss counters of the cache.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, flushes and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "flushes": self.flushes,
+                    "size": len(self._entries),
+                    "max_size": self.max_size,
+                    "model_version": self._version}
@@ -0,0 +1,298 @@
+"""
+Pre-fork WSGI server for running the web app on every core of a host.
+
+The master process imports the app, loads the model and configuration and
+binds the listening socket once, then forks the workers. The workers share
+the loaded objects copy-on-write and accept connections from the shared
+socket, each serving requests from a small thread pool. A worker exits
+gracefully after a configurable number of requests and the master forks a
+fresh one in its place, so slow leaks never build up in a long-running
+process.
+
+Signals understood by the master:
+
+    SIGTERM, SIGINT   finish the in-flight requests and stop
+    SIGHUP            gracefully replace every worker
+"""
+import concurrent.futures
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import typing
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """Request handler closing the connection after every response.
+
+    Without keep-alive an idle client cannot pin one of the worker threads.
+    """
+    protocol_version = "HTTP/1.0"
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server handing accepted connections to a fixed thread pool.
+
+    A connection is only accepted while a pool thread is free, so busy
+    workers leave new connections on the shared socket for idle ones.
+
+    Args:
+        app (callable): The WSGI application.
+        fd (int): Descriptor of the already bound listening socket.
+        threads (int): Threads serving requests concurrently.
+        max_requests (int): Requests served before the worker stops
+            accepting. Optional, the worker never recycles when not given.
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app: typing.Callable, fd: int, threads: int = 4,
+                 max_requests: typing.Optional[int] = None):
+        sock = socket.socket(fileno=os.dup(fd))
+        host, port = sock.getsockname()[:2]
+        sock.close()
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self.timeout = 0.5
+        self.max_requests = max_requests
+        self.handled = 0
+        self._accepted = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(threads)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="http")
+        self._stopping = threading.Event()
+
+    def process_request(self, request, client_address) -> None:
+        """Serve an accepted connection on the thread pool."""
+        self._accepted += 1
+        self._executor.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address) -> None:
+        """Serve one connection and free its pool slot."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+            with self._lock:
+                self.handled += 1
+                if self.max_requests is not None and self.handled >= self.max_requests:
+                    self._stopping.set()
+
+    def stop(self) -> None:
+        """Stop accepting connections; ``serve`` then drains and returns."""
+        self._stopping.set()
+
+    def serve(self) -> None:
+        """Accept connections until stopped, then finish the in-flight requests.
+
+        Returns: None
+        """
+        while not self._stopping.is_set():
+            if not self._slots.acquire(timeout=self.timeout):
+                continue
+            accepted = self._accepted
+            self.handle_request()
+            if self._accepted == accepted:
+                # Timed out or failed to accept, the slot is still free
+                self._slots.release()
+        self._executor.shutdown(wait=True)
+        self.socket.close()
+
+
+class PreforkServer:
+    """Master process forking and supervising the worker processes.
+
+    Args:
+        app (callable): The WSGI application, loaded before forking.
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+        workers (int): Worker processes kept running.
+        threads (int): Request threads per worker.
+        max_requests (int): Requests a worker serves before it is replaced.
+            Optional, workers are never recycled when not given.
+        max_requests_jitter (int): Up to this many requests are added to
+            ``max_requests`` per worker, so workers do not all recycle at once.
+        graceful_timeout (float): Seconds a stopping worker gets to finish its
+            in-flight requests before it is killed.
+        post_fork (callable): Called in every new worker before it serves
+            requests, e.g. to drop database connections inherited from the
+            master. Optional.
+        worker_exit (callable): Called in a worker after it stopped serving,
+            e.g. to flush background queues. Optional.
+        child_exit (callable): Called in the master with the pid of every
+            worker it reaped, e.g. to collect what the worker left behind.
+            Optional.
+    """
+
+    def __init__(self, app: typing.Callable, host: str = "0.0.0.0", port: int = 5000,
+                 workers: int = 2, threads: int = 4,
+                 max_requests: typing.Optional[int] = None, max_requests_jitter: int = 0,
+                 graceful_timeout: float = 30.0,
+                 post_fork: typing.Optional[typing.Callable[[], None]] = None,
+                 worker_exit: typing.Optional[typing.Callable[[], None]] = None,
+                 child_exit: typing.Optional[typing.Callable[[int], None]] = None):
+        if workers < 1 or threads < 1:
+            raise ValueError("workers and threads must be at least 1")
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.post_fork = post_fork
+        self.worker_exit = worker_exit
+        self.child_exit = child_exit
+        self.socket: typing.Optional[socket.socket] = None
+        self._children: typing.Dict[int, float] = {}
+        self._stopping = False
+        self._reload = False
+        self._backoff_until = 0.0
+
+    def _bind(self) -> socket.socket:
+        """Create the listening socket shared by all workers."""
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(BaseWSGIServer.request_queue_size)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self) -> None:
+        """Fork one worker."""
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            logger.info("Started worker %d", pid)
+            return
+
+        # In the worker from here on, which never returns to the caller
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            if self.post_fork is not None:
+                self.post_fork()
+            self._serve_worker()
+            if self.worker_exit is not None:
+                self.worker_exit()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Worker %d failed", os.getpid())
+            exit_code = 1
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _serve_worker(self) -> None:
+        """Serve requests in a forked worker until it is stopped or recycled."""
+        max_requests = None
+        if self.max_requests:
+            max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+        server = PooledWSGIServer(self.app, self.socket.fileno(), threads=self.threads,
+                                  max_requests=max_requests)
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+        server.serve()
+        if max_requests is not None and server.handled >= max_requests:
+            logger.info("Worker %d served %d requests, recycling", os.getpid(), server.handled)
+
+    def _reap(self) -> None:
+        """Collect exited workers."""
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            started = self._children.pop(pid, None)
+            if started is not None:
+                code = os.waitstatus_to_exitcode(status)
+                if code != 0 and not self._stopping:
+                    logger.warning("Worker %d exited with code %d", pid, code)
+                    if time.monotonic() - started < 1:
+                        # Don't fork in a tight loop when workers die on startup
+                        self._backoff_until = time.monotonic() + 1
+                if self.child_exit is not None:
+                    try:
+                        self.child_exit(pid)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Error cleaning up after worker %d", pid)
+
+    def _signal_workers(self, signum: int) -> None:
+        """Send a signal to every live worker."""
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+    def _handle_stop(self, *_) -> None:
+        self._stopping = True
+
+    def _handle_reload(self, *_) -> None:
+        self._reload = True
+
+    def run(self) -> None:
+        """Bind the socket, fork the workers and supervise them until stopped.
+
+        Returns: None
+        """
+        self.socket = self._bind()
+        logger.info("Listening on %s with %d workers x %d threads",
+                    self.socket.getsockname(), self.workers, self.threads)
+
+        # Keep the garbage collector from touching the objects loaded so far,
+        # which would copy their pages into every worker
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        try:
+            while not self._stopping:
+                self._reap()
+                if self._reload:
+                    self._reload = False
+                    logger.info("Replacing all workers")
+                    self._signal_workers(signal.SIGTERM)
+                while (len(self._children) < self.workers and not self._stopping
+                       and time.monotonic() >= self._backoff_until):
+                    self._spawn()
+                time.sleep(0.1)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        """Stop the workers gracefully, killing the ones that take too long."""
+        logger.info("Stopping %d workers", len(self._children))
+        self._signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        if self._children:
+            logger.warning("Killing %d workers after %.0f seconds",
+                           len(self._children), self.graceful_timeout)
+            self._signal_workers(signal.SIGKILL)
+            while self._children:
+                self._reap()
+                time.sleep(0.05)
+        self.socket.close()
+        logger.info("Server stopped")
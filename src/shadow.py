@@ -0,0 +1,152 @@
+"""
+Shadow scoring of a candidate model on live traffic.
+
+The primary model answers the request as usual. The same feature row is then
+handed to a small background thread pool that scores it with the candidate
+model and appends the comparison to a local JSON-lines file, so a retrained
+model can be checked against real traffic without touching request latency.
+
+Both models are timed the same way in the shadow thread, as one bare
+``predict_one`` call each, since the request's own scoring time includes
+cache lookups, micro-batch waits or the model server round trip.
+"""
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+import typing
+
+import numpy as np
+
+from src.model_registry import registry
+from src.tree_evaluator import CompiledTree
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Scores rows with a candidate model off the request path.
+
+    Args:
+        candidate_path (str): The path of the candidate model.
+        log_path (str): The JSON-lines file the comparisons are appended to.
+        max_workers (int): Threads scoring with the candidate model.
+        max_pending (int): The most rows waiting to be shadow scored; rows
+            beyond that are dropped rather than slowing the web workers down.
+    """
+
+    def __init__(self, candidate_path: str, log_path: str, max_workers: int = 2,
+                 max_pending: int = 1000):
+        self.candidate_path = candidate_path
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="shadow")
+        # Guards the counters only, submit takes it on the request path
+        self._lock = threading.Lock()
+        # Serializes the appends to the log file
+        self._file_lock = threading.Lock()
+        self._pending = 0
+
+        self.scored = 0
+        self.disagreements = 0
+        self.dropped = 0
+        self.errors = 0
+        self.total_latency_delta = 0.0
+
+    def submit(self, row: np.ndarray, primary_proba: np.ndarray,
+               primary_version: str, primary_path: str) -> bool:
+        """
+        Queue a row for shadow scoring without waiting for it.
+
+        Args:
+            row (np.ndarray): The feature row the primary model scored.
+            primary_proba (np.ndarray): The probabilities from the primary model.
+            primary_version (str): The version of the primary model.
+            primary_path (str): The path of the primary model, timed against
+                the candidate in the shadow thread.
+
+        Returns:
+            bool: Whether the row was queued (False when the queue is full).
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self._executor.submit(self._score, row.copy(), np.asarray(primary_proba).ravel(),
+                              primary_version, primary_path)
+        return True
+
+    def _score(self, row: np.ndarray, primary_proba: np.ndarray,
+               primary_version: str, primary_path: str) -> None:
+        """Score one row with the candidate model and log the comparison."""
+        try:
+            primary = registry.get(primary_path).derive("compiled_tree",
+                                                        CompiledTree.from_model)
+            entry = registry.get(self.candidate_path)
+            candidate = entry.derive("compiled_tree", CompiledTree.from_model)
+            start = time.perf_counter()
+            primary.predict_one(row)
+            primary_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            _, candidate_proba = candidate.predict_one(row)
+            candidate_seconds = time.perf_counter() - start
+
+            primary_label = int(np.argmax(primary_proba))
+            candidate_label = int(np.argmax(candidate_proba))
+            agree = primary_label == candidate_label
+            latency_delta = candidate_seconds - primary_seconds
+            record = {"timestamp": time.time(),
+                      "features": row.tolist(),
+                      "primary_version": primary_version,
+                      "candidate_version": entry.version,
+                      "primary_proba": primary_proba.tolist(),
+                      "candidate_proba": candidate_proba.tolist(),
+                      "agree": agree,
+                      "primary_ms": primary_seconds * 1000,
+                      "candidate_ms": candidate_seconds * 1000,
+                      "latency_delta_ms": latency_delta * 1000}
+
+            line = json.dumps(record) + "\n"
+            with self._file_lock:
+                with open(self.log_path, "a", encoding="utf-8") as log_file:
+                    log_file.write(line)
+            with self._lock:
+                self.scored += 1
+                self.total_latency_delta += latency_delta
+                if not agree:
+                    self.disagreements += 1
+        except Exception as err:  # pylint: disable=broad-except
+            # Shadow scoring must never affect the primary path
+            logger.warning("Shadow scoring with %s failed: %s", self.candidate_path, err)
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def close(self) -> None:
+        """Wait for the queued rows to be scored and stop the thread pool."""
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Summarize the comparison between the primary and candidate models.
+
+        Returns:
+            dict: Rows scored, disagreements, dropped rows, errors and the mean
+                latency delta of the candidate model.
+        """
+        with self._lock:
+            return {"candidate_path": self.candidate_path,
+                    "pending": self._pending,
+                    "scored": self.scored,
+                    "disagreements": self.disagreements,
+                    "disagreement_rate": (self.disagreements / self.scored
+                                          if self.scored else 0.0),
+                    "dropped": self.dropped,
+                    "errors": self.errors,
+                    "mean_latency_delta_ms": (self.total_latency_delta / self.scored * 1000
+                                              if self.scored else 0.0)}
@@ -2,6 +2,7 @@
 Module to train the decision tree model.
 """
 import logging
+import os
 import typing
 import pickle
 
@@ -164,10 +165,13 @@ def train(input_path: str,x_train_path: str, y_train_path: str, x_test_path: str
         raise err
 
     try:
-        # Save the model
+        # Save the model to a temporary file first and swap it in, so a web
+        # worker reloading the model never reads a half-written artifact
         logger.info("Saving the model")
-        with open(model_path, "wb") as file:
+        tmp_path = model_path + ".tmp"
+        with open(tmp_path, "wb") as file:
             pickle.dump(dt_model, file)
+        os.replace(tmp_path, model_path)
     except FileNotFoundError as err:
         logger.error("Error: %s", err)
         raise err
@@ -0,0 +1,195 @@
+"""
+Flat array-based evaluator for fitted decision trees.
+
+``DecisionTreeClassifier.predict``/``predict_proba`` spend most of their time
+validating the input for a single row, and calling both walks the tree twice.
+``CompiledTree`` keeps the fitted node arrays as contiguous NumPy arrays and
+returns the class and the probabilities from a single walk. Arrays that are
+already contiguous with the right dtype, such as the memory-mapped views of a
+model artifact, are used as they are without a copy.
+"""
+import logging
+import typing
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Marker sklearn uses for the children of a leaf node
+TREE_LEAF = -1
+
+
+class CompiledTree:
+    """A fitted decision tree flattened into contiguous node arrays.
+
+    Results match ``DecisionTreeClassifier`` bit-for-bit: the input is cast
+    to float32 like sklearn does before comparing against the float64
+    thresholds, and the leaf probabilities are normalized the same way as in
+    ``predict_proba``.
+
+    Args:
+        children_left (np.ndarray): Left child of each node, -1 for leaves.
+        children_right (np.ndarray): Right child of each node, -1 for leaves.
+        feature (np.ndarray): Feature index tested at each node.
+        threshold (np.ndarray): Threshold tested at each node.
+        value (np.ndarray): Class counts (or weights) of each node, with
+            shape (n_nodes, n_classes).
+        classes (np.ndarray): The class labels.
+        feature_names (list): The feature names in training order.
+        node_proba (np.ndarray): Normalized class probabilities of each node.
+            Optional, computed from ``value`` when not given.
+        node_class_index (np.ndarray): Index into ``classes`` of the class
+            predicted at each node. Optional, computed from ``value`` when
+            not given.
+    """
+
+    def __init__(self, children_left: np.ndarray, children_right: np.ndarray,
+                 feature: np.ndarray, threshold: np.ndarray, value: np.ndarray,
+                 classes: np.ndarray, feature_names: typing.List[str],
+                 node_proba: typing.Optional[np.ndarray] = None,
+                 node_class_index: typing.Optional[np.ndarray] = None):
+        self.children_left = np.ascontiguousarray(children_left, dtype=np.intp)
+        self.children_right = np.ascontiguousarray(children_right, dtype=np.intp)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        if node_proba is None:
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            normalizer = self.value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            node_proba = self.value / normalizer
+        if node_class_index is None:
+            # Same tie-breaking as DecisionTreeClassifier.predict
+            node_class_index = np.argmax(self.value, axis=1)
+        self.node_proba = np.ascontiguousarray(node_proba, dtype=np.float64)
+        self.node_class_index = np.ascontiguousarray(node_class_index, dtype=np.intp)
+        # Rows of these are handed out as views, so keep them read-only
+        self.node_proba.flags.writeable = False
+        self.node_class_index.flags.writeable = False
+
+        # Indexing a memoryview yields plain Python numbers, which is much
+        # faster than NumPy scalars for walking one row and copies nothing
+        self._left = memoryview(self.children_left)
+        self._right = memoryview(self.children_right)
+        self._feature = memoryview(self.feature)
+        self._threshold = memoryview(self.threshold)
+
+    @classmethod
+    def from_model(cls, model: typing.Any) -> "CompiledTree":
+        """
+        Compile a fitted ``DecisionTreeClassifier``.
+
+        Args:
+            model (DecisionTreeClassifier): The fitted decision tree.
+
+        Returns:
+            CompiledTree: The flattened tree.
+        """
+        if isinstance(model, cls):
+            return model
+        if not hasattr(model, "tree_"):
+            logger.error("Model is not a fitted decision tree")
+            raise TypeError("model must be a fitted DecisionTreeClassifier")
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output trees can be compiled")
+
+        tree = model.tree_
+        feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is None:
+            feature_names = [f"x{i}" for i in range(model.n_features_in_)]
+        return cls(tree.children_left, tree.children_right, tree.feature,
+                   tree.threshold, tree.value[:, 0, :model.n_classes_],
+                   model.classes_, feature_names)
+
+    def _as_array(self, x: typing.Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Return the input as a 2-D float32 array in training column order."""
+        if isinstance(x, pd.DataFrame):
+            x = x[self.feature_names].to_numpy()
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        if x.ndim != 2 or x.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {x.shape}")
+        # sklearn refuses these too; NaN would silently go right at every split
+        if not np.isfinite(x).all():
+            raise ValueError("Input contains NaN, infinity or a value too large for float32")
+        return x
+
+    def apply(self, x: typing.Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """
+        Return the index of the leaf each row ends up in.
+
+        Args:
+            x (pd.DataFrame/np.ndarray): The rows to evaluate.
+
+        Returns:
+            np.ndarray: The leaf index of each row.
+        """
+        x = self._as_array(x)
+        node = np.zeros(x.shape[0], dtype=np.intp)
+        active = np.arange(x.shape[0])
+        # Walk all rows one level per iteration, dropping rows that hit a leaf
+        while active.size:
+            current = node[active]
+            go_left = x[active, self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.children_left[current],
+                               self.children_right[current])
+            node[active] = current
+            active = active[self.children_left[current] != TREE_LEAF]
+        return node
+
+    def predict_with_proba(self, x: typing.Union[pd.DataFrame, np.ndarray]
+                           ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict the class and the class probabilities in a single pass.
+
+        Args:
+            x (pd.DataFrame/np.ndarray): The rows to evaluate.
+
+        Returns:
+            prediction(np.ndarray): The predicted class of each row.
+            prediction_proba(np.ndarray): The class probabilities of each row.
+        """
+        leaves = self.apply(x)
+        return self.classes_.take(self.node_class_index[leaves], axis=0), self.node_proba[leaves]
+
+    def predict(self, x: typing.Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Predict the class of each row, like ``DecisionTreeClassifier.predict``."""
+        return self.classes_.take(self.node_class_index[self.apply(x)], axis=0)
+
+    def predict_proba(self, x: typing.Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Predict class probabilities, like ``DecisionTreeClassifier.predict_proba``."""
+        return self.node_proba[self.apply(x)]
+
+    def predict_one(self, row: typing.Sequence[float]) -> typing.Tuple[typing.Any, np.ndarray]:
+        """
+        Predict a single row without any per-call array allocation.
+
+        Args:
+            row (sequence): The feature values in training column order.
+
+        Returns:
+            prediction: The predicted class.
+            prediction_proba(np.ndarray): The class probabilities.
+        """
+        # Round through float32 exactly like sklearn's input validation
+        values = np.asarray(row, dtype=np.float32)
+        if values.shape != (self.n_features,):
+            raise ValueError(f"Expected {self.n_features} features, got shape {values.shape}")
+        if not np.isfinite(values).all():
+            raise ValueError("Input contains NaN, infinity or a value too large for float32")
+        values = values.tolist()
+        left, right = self._left, self._right
+        feature, threshold = self._feature, self._threshold
+        node = 0
+        while left[node] != TREE_LEAF:
+            if values[feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return self.classes_[self.node_class_index[node]], self.node_proba[node]
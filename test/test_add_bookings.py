@@ -0,0 +1,443 @@
+"""
+Unit tests for the add_bookings.py module.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pytest
+import sqlalchemy
+
+from src.add_bookings import (BookingManager, QueryStats, TimedQueuePool, create_db,
+                              engine_options, is_file_sqlite, migrate_db,
+                              normalize_statement)
+
+
+@pytest.fixture
+def booking_manager(tmp_path):
+    """Booking manager on an empty SQLite database."""
+    engine_string = f"sqlite:///{tmp_path / 'bookings.db'}"
+    create_db(engine_string)
+    manager = BookingManager(engine_string=engine_string)
+    yield manager
+    manager.close()
+
+
+def test_warm_up(booking_manager):
+    """
+    Happy path: Test opening database connections ahead of the first request.
+    """
+    booking_manager.warm_up(connections=2)
+
+
+def _add_bookings(booking_manager, n_bookings):
+    for i in range(n_bookings):
+        booking_manager.add_booking(i % 2, 1, 1, 1, 1, 1, i, 1, 1, 0, 1)
+
+
+def test_recent_bookings_pages(booking_manager):
+    """
+    Happy path: Test walking the pages newest first and back again.
+    """
+    _add_bookings(booking_manager, 25)
+
+    page, older, newer = booking_manager.recent_bookings(10)
+    assert [booking.id for booking in page] == list(range(25, 15, -1))
+    assert (older, newer) == (16, None)
+
+    page, older, newer = booking_manager.recent_bookings(10, before=older)
+    assert [booking.id for booking in page] == list(range(15, 5, -1))
+    assert (older, newer) == (6, 15)
+
+    page, last_older, last_newer = booking_manager.recent_bookings(10, before=older)
+    assert [booking.id for booking in page] == list(range(5, 0, -1))
+    assert (last_older, last_newer) == (None, 5)
+
+    page, older, newer = booking_manager.recent_bookings(10, after=15)
+    assert [booking.id for booking in page] == list(range(25, 15, -1))
+    assert (older, newer) == (16, None)
+
+
+def test_recent_bookings_of_hotel(booking_manager):
+    """
+    Happy path: Test paging through the bookings of one hotel.
+    """
+    _add_bookings(booking_manager, 10)
+
+    page, older, newer = booking_manager.recent_bookings(3, hotel=1)
+    assert [booking.id for booking in page] == [10, 8, 6]
+    assert (older, newer) == (6, None)
+
+    page, older, _ = booking_manager.recent_bookings(3, before=older, hotel=1)
+    assert [booking.id for booking in page] == [4, 2]
+    assert older is None
+    assert all(booking.created_at is not None for booking in page)
+
+
+def test_create_db_migrates_existing_table(tmp_path):
+    """
+    Happy path: Test that create_db adds the timestamp and indexes to an old table.
+    """
+    path = tmp_path / "bookings.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE bookings (id INTEGER PRIMARY KEY AUTOINCREMENT, hotel INTEGER, "
+        "arrival_date_day_of_month INTEGER, arrival_date_week_number INTEGER, "
+        "reservation_day INTEGER, reservation_month INTEGER, reservation_weekday INTEGER, "
+        "lead_time INTEGER, stays_in_week_nights INTEGER, stays_in_weekend_nights INTEGER, "
+        "total_of_special_requests INTEGER, market_segment INTEGER)")
+    connection.execute("INSERT INTO bookings (hotel, lead_time) VALUES (1, 5)")
+    connection.commit()
+    connection.close()
+
+    engine_string = f"sqlite:///{path}"
+    create_db(engine_string)
+    manager = BookingManager(engine_string=engine_string)
+    manager.add_booking(0, 1, 1, 1, 1, 1, 7, 1, 1, 0, 1)
+    page, _, _ = manager.recent_bookings(10)
+    manager.close()
+
+    assert [(booking.lead_time, booking.created_at is None) for booking in page] == [
+        (7, False), (5, True)]
+    inspector = sqlalchemy.inspect(sqlalchemy.create_engine(engine_string))
+    assert {index["name"] for index in inspector.get_indexes("bookings")} >= {
+        "ix_bookings_hotel_id", "ix_bookings_hotel_week",
+        "ix_bookings_segment_week", "ix_bookings_created_at",
+        "ix_bookings_model_version_created_at"}
+    assert migrate_db(sqlalchemy.create_engine(engine_string)) == []
+
+
+def test_prediction_history(booking_manager):
+    """
+    Happy path: Test reading back the scores stored with the bookings.
+    """
+    booking_manager.add_booking(0, 1, 1, 1, 1, 1, 10, 1, 1, 0, 1, prediction_prob=0.8,
+                                prediction_label=1, model_version="abc",
+                                scoring_latency_ms=0.5)
+    booking_manager.add_booking(1, 1, 1, 1, 1, 1, 20, 1, 1, 0, 1)
+    booking_manager.add_booking(1, 1, 1, 1, 1, 1, 30, 1, 1, 0, 1, prediction_prob=0.1,
+                                prediction_label=0, model_version="def",
+                                scoring_latency_ms=0.7)
+
+    history = booking_manager.prediction_history()
+    assert [(row.id, row.prediction_prob, row.prediction_label, row.model_version)
+            for row in history] == [(1, 0.8, 1, "abc"), (3, 0.1, 0, "def")]
+    assert history[0].scoring_latency_ms == 0.5
+    assert history[0].created_at is not None
+
+    assert [row.id for row in booking_manager.prediction_history(model_version="def")] == [3]
+
+
+def test_bookings_queries_use_indexes(booking_manager):
+    """
+    Happy path: Test that the paginated and score history queries search the
+    composite indexes instead of scanning the table.
+    """
+    _add_bookings(booking_manager, 30)
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,too-many-arguments
+        if statement.startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    sqlalchemy.event.listen(booking_manager.engine, 'before_cursor_execute', _record)
+    booking_manager.recent_bookings(10, hotel=1)
+    booking_manager.recent_bookings(10, before=20, hotel=1)
+    booking_manager.recent_bookings(10, after=5, hotel=1)
+    booking_manager.prediction_history(model_version='abc',
+                                       since=datetime.datetime(2026, 1, 1))
+    sqlalchemy.event.remove(booking_manager.engine, 'before_cursor_execute', _record)
+
+    with booking_manager.engine.connect() as connection:
+        plans = [' '.join(row[-1] for row in connection.exec_driver_sql(
+                     'EXPLAIN QUERY PLAN ' + statement, parameters))
+                 for statement, parameters in statements]
+    assert len(plans) == 4
+    for plan in plans[:3]:
+        assert 'USING INDEX ix_bookings_hotel_id' in plan
+        assert 'TEMP B-TREE' not in plan
+    assert 'USING INDEX ix_bookings_model_version_created_at' in plans[3]
+
+
+def test_recent_bookings_empty(booking_manager):
+    """
+    Happy path: Test an empty bookings table.
+    """
+    assert booking_manager.recent_bookings(10) == ([], None, None)
+
+
+def test_recent_bookings_invalid_cursor(booking_manager):
+    """
+    Sad path: Test passing both cursors at once.
+    """
+    with pytest.raises(ValueError):
+        booking_manager.recent_bookings(10, before=5, after=1)
+
+
+def test_sessions_scoped_per_thread(booking_manager):
+    """
+    Happy path: Test that each thread gets its own session.
+    """
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(booking_manager.session()))
+    thread.start()
+    thread.join()
+    assert booking_manager.session() is booking_manager.session()
+    assert sessions[0] is not booking_manager.session()
+
+
+def test_engine_options():
+    """
+    Happy path: Test that pool sizing only applies to server databases.
+    """
+    options = engine_options("mysql+pymysql://user:pw@host:3306/db", pool_size=3,
+                             max_overflow=1, pool_recycle=60)
+    assert options["poolclass"] is TimedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_recycle"]) == (3, 1, 60)
+    assert options["pool_pre_ping"]
+
+    assert engine_options("sqlite:///data/hotel_bookings.db") == {"pool_pre_ping": True,
+                                                                  "pool_recycle": 1800}
+
+    options = engine_options("sqlite:///data/hotel_bookings.db", pool_size=2,
+                             sqlite_tuning=True)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 2
+    assert options["connect_args"] == {"check_same_thread": False}
+    assert "poolclass" not in engine_options("sqlite://", sqlite_tuning=True)
+
+
+def test_sqlite_tuning_pools_reads(tmp_path):
+    """
+    Happy path: Test that reads of a tuned SQLite file reuse pooled connections.
+    """
+    engine_string = f"sqlite:///{tmp_path / 'bookings.db'}"
+    create_db(engine_string)
+    manager = BookingManager(engine_string=engine_string, sqlite_tuning=True, pool_size=2)
+    connects = []
+    sqlalchemy.event.listen(manager.engine, "connect", lambda *_: connects.append(1))
+    for _ in range(10):
+        manager.recent_bookings(10)
+        manager.close()
+
+    assert isinstance(manager.engine.pool, TimedQueuePool)
+    assert len(connects) == 1
+    with manager.engine.connect() as connection:
+        assert connection.execute(sqlalchemy.text("PRAGMA journal_mode")).scalar() == "wal"
+    assert manager.pool_stats()["writer"]["checkouts"] == 0
+    manager.close()
+
+
+def test_timed_queue_pool_stats(tmp_path):
+    """
+    Happy path: Test counting checkouts and timeouts across a dispose.
+    """
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                                      poolclass=TimedQueuePool, pool_size=1, max_overflow=0,
+                                      pool_timeout=0.05,
+                                      connect_args={"check_same_thread": False})
+    with engine.connect():
+        with pytest.raises(sqlalchemy.exc.TimeoutError):
+            engine.connect()
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    stats = engine.pool.stats.stats()
+    assert (stats["checkouts"], stats["timeouts"]) == (2, 1)
+    assert stats["max_wait_ms"] >= 50
+
+
+def test_is_file_sqlite():
+    """
+    Happy path: Test telling SQLite database files from other databases.
+    """
+    assert is_file_sqlite("sqlite:///data/hotel_bookings.db")
+    assert not is_file_sqlite("sqlite://")
+    assert not is_file_sqlite("mysql+pymysql://user:pw@host:3306/db")
+
+
+def test_sqlite_tuning_concurrent_writers(tmp_path):
+    """
+    Happy path: Stress test that concurrent writers and readers lose no bookings.
+    """
+    engine_string = f"sqlite:///{tmp_path / 'bookings.db'}"
+    create_db(engine_string)
+    manager = BookingManager(engine_string=engine_string, sqlite_tuning=True,
+                             busy_timeout=1.0)
+    n_writers, n_readers, n_bookings = 8, 4, 50
+    errors = []
+    stop = threading.Event()
+
+    def write(writer):
+        try:
+            for i in range(n_bookings):
+                manager.add_booking(writer % 2, 1, 1, 1, 1, 1, i, 1, 1, 0, 1)
+        except Exception as err:  # pylint: disable=broad-except
+            errors.append(err)
+        finally:
+            manager.close()
+
+    def read():
+        try:
+            while not stop.is_set():
+                manager.recent_bookings(20, hotel=1)
+        except Exception as err:  # pylint: disable=broad-except
+            errors.append(err)
+        finally:
+            manager.close()
+
+    readers = [threading.Thread(target=read) for _ in range(n_readers)]
+    writers = [threading.Thread(target=write, args=(i,)) for i in range(n_writers)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    with manager.engine.connect() as connection:
+        assert connection.execute(sqlalchemy.text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(
+            sqlalchemy.text("SELECT COUNT(*) FROM bookings")).scalar() == n_writers * n_bookings
+    assert manager.pool_stats()["writer"]["checkouts"] >= n_writers * n_bookings
+    manager.close()
+
+
+def test_booking_manager_without_engine():
+    """
+    Sad path: Test creating a booking manager without a database.
+    """
+    with pytest.raises(ValueError):
+        BookingManager()
+
+
+def test_normalize_statement():
+    """
+    Happy path: Test that literals, placeholders and whitespace are normalized.
+    """
+    statement = ("SELECT bookings.id FROM bookings\n  WHERE bookings.id < :id_1 "
+                 "AND hotel IN (?, ?) AND market_segment = 'Online TA' LIMIT 100")
+    assert normalize_statement(statement) == (
+        "SELECT bookings.id FROM bookings WHERE bookings.id < ? "
+        "AND hotel IN (?) AND market_segment = ? LIMIT ?")
+
+
+def test_query_stats_aggregates_statements(booking_manager, tmp_path):
+    """
+    Happy path: Test that statements are timed, grouped and logged when slow.
+    """
+    slow_query_log = str(tmp_path / 'slow.jsonl')
+    query_stats = QueryStats(slow_query_seconds=0, slow_query_log=slow_query_log)
+    query_stats.attach(booking_manager.engine)
+    _add_bookings(booking_manager, 3)
+    booking_manager.recent_bookings(10)
+
+    stats = query_stats.stats()
+    inserts = [s for s in stats['statements'] if s['statement'].startswith('INSERT')]
+    assert inserts[0]['count'] == 3
+    assert stats['slow_queries'] == stats['queries']
+    with open(slow_query_log, 'r') as log_file:
+        records = [json.loads(line) for line in log_file]
+    assert len(records) == stats['queries']
+    assert 'duration_ms' in records[0]
+
+
+def test_query_stats_not_blocked_by_slow_query_log(booking_manager, tmp_path):
+    """
+    Happy path: Test that statements are counted while the slow-query log is being written.
+    """
+    query_stats = QueryStats(slow_query_seconds=0,
+                             slow_query_log=str(tmp_path / 'slow.jsonl'))
+    query_stats.attach(booking_manager.engine)
+    with query_stats._log_lock:  # pylint: disable=protected-access
+        writer = threading.Thread(target=booking_manager.recent_bookings, args=(10,))
+        writer.start()
+        # The query thread now waits on the log file, the counters stay available
+        deadline = time.time() + 5
+        while query_stats.stats()['slow_queries'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert query_stats.stats()['queries'] >= 1
+    writer.join(5)
+    assert not writer.is_alive()
+
+
+def test_query_stats_flags_repeated_queries(booking_manager):
+    """
+    Happy path: Test that an identical query run twice in one request is flagged.
+    """
+    query_stats = QueryStats()
+    query_stats.attach(booking_manager.engine)
+    _add_bookings(booking_manager, 3)
+
+    query_stats.begin_request()
+    booking_manager.recent_bookings(10)
+    booking_manager.recent_bookings(10)
+    booking_manager.recent_bookings(10, before=2)
+    repeated = query_stats.end_request('/predict.html')
+
+    assert list(repeated.values()) == [2]
+    assert query_stats.stats()['repeated_queries'] == 1
+
+
+def test_query_stats_outside_request(booking_manager):
+    """
+    Sad path: Test that ending a request that was never begun reports nothing.
+    """
+    query_stats = QueryStats()
+    query_stats.attach(booking_manager.engine)
+    booking_manager.recent_bookings(10)
+    booking_manager.recent_bookings(10)
+    assert query_stats.end_request() == {}
+
+
+def test_add_bookings_from_file(booking_manager, tmp_path):
+    """
+    Happy path: Test bulk inserting a file and writing its rejected rows aside.
+    """
+    bookings = pd.DataFrame({"hotel": [0, 1, 1], "arrival_date_day_of_month": [1, 2, 40],
+                             "arrival_date_week_number": [1, 2, 3], "reservation_day": [1, 2, 3],
+                             "reservation_month": [1, 2, 3], "reservation_weekday": [1, 2, 3],
+                             "lead_time": [10, 20, 30], "stays_in_week_nights": [1, 2, 3],
+                             "stays_in_weekend_nights": [0, 1, 2],
+                             "total_of_special_requests": [0, 0, 1], "market_segment": [1, 2, 3]})
+    path = str(tmp_path / "bookings.csv")
+    bookings.to_csv(path, index=False)
+
+    stats = booking_manager.add_bookings(path, chunksize=2)
+
+    assert (stats["rows"], stats["inserted"], stats["rejected"]) == (3, 2, 1)
+    page, _, _ = booking_manager.recent_bookings(10)
+    assert [booking.lead_time for booking in page] == [20, 10]
+    rejected = pd.read_csv(path + ".rejected.csv")
+    assert rejected["reason"].tolist() == ["invalid arrival_date_day_of_month"]
+
+
+def test_add_bookings_from_parquet(booking_manager, tmp_path):
+    """
+    Happy path: Test bulk inserting a Parquet file.
+    """
+    pytest.importorskip("pyarrow")
+    bookings = pd.DataFrame({"hotel": ["City Hotel", "Resort Hotel", "City Hotel"],
+                             "arrival_date_day_of_month": [1, 2, 3],
+                             "arrival_date_week_number": [1, 2, 3], "reservation_day": [1, 2, 3],
+                             "reservation_month": [1, 2, 3], "reservation_weekday": [1, 2, 3],
+                             "lead_time": [10, 20, 30], "stays_in_week_nights": [1, 2, 3],
+                             "stays_in_weekend_nights": [0, 1, 2],
+                             "total_of_special_requests": [0, 0, 1], "market_segment": [1, 2, 3]})
+    path = str(tmp_path / "bookings.parquet")
+    bookings.to_parquet(path, index=False)
+
+    stats = booking_manager.add_bookings(path, chunksize=2)
+
+    assert (stats["rows"], stats["inserted"], stats["rejected"]) == (3, 3, 0)
+    page, _, _ = booking_manager.recent_bookings(10)
+    assert [booking.lead_time for booking in page] == [30, 20, 10]
+    assert [booking.hotel for booking in page] == [1, 0, 1]
@@ -0,0 +1,28 @@
+"""
+Unit tests for the app.py module.
+"""
+
+import pytest
+
+from app import create_app, get_services
+
+
+def test_create_app_defers_setup():
+    """
+    Happy path: Test that creating the app reads no configuration and opens no connections.
+    """
+    app = create_app(config_path="missing.yaml")
+    services = get_services(app)
+    assert not services.initialized
+    assert services.config is None
+    assert services.warm_up_thread is None
+
+
+def test_init_missing_config():
+    """
+    Sad path: Test that a missing configuration file is reported by init.
+    """
+    services = get_services(create_app(config_path="missing.yaml"))
+    with pytest.raises(FileNotFoundError):
+        services.init()
+    assert not services.initialized
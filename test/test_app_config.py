@@ -0,0 +1,100 @@
+"""
+Unit tests for the app_config.py module.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from src.app_config import AppConfig, ConfigManager, load_config, read_config
+
+CONFIG_PATH = 'config/config.yaml'
+
+
+def _replace(path, old, new):
+    """Edit a config file in place, making sure its signature changes."""
+    with open(path, 'r') as file:
+        text = file.read()
+    with open(path, 'w') as file:
+        file.write(text.replace(old, new))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Copy of the repository's configuration file."""
+    path = str(tmp_path / 'config.yaml')
+    shutil.copy(CONFIG_PATH, path)
+    return path
+
+
+def test_read_config():
+    """
+    Happy path: Test that the repository's configuration is parsed and validated.
+    """
+    config = read_config(CONFIG_PATH)
+    assert config.model_path == 'models/dt_model.pkl'
+    assert config.initial_features[0] == 'hotel'
+    assert config.max_rows_show == 100
+    assert config['train']['train']['test_size'] == 0.3
+
+
+def test_load_config_is_cached():
+    """
+    Happy path: Test that an unchanged configuration is parsed only once.
+    """
+    assert load_config(CONFIG_PATH) is load_config(CONFIG_PATH)
+
+
+def test_config_manager_reloads_on_change(config_path):
+    """
+    Happy path: Test that a changed file is picked up without a restart.
+    """
+    manager = ConfigManager(config_path, check_interval=0)
+    _replace(config_path, 'max_rows_show: 100', 'max_rows_show: 20')
+
+    assert manager.get().max_rows_show == 20
+    assert manager.reloads == 1
+    manager.get()
+    assert manager.reloads == 1
+
+
+def test_config_manager_reloads_on_request(config_path):
+    """
+    Happy path: Test that a requested reload happens before the next check is due.
+    """
+    manager = ConfigManager(config_path, check_interval=3600)
+    manager.request_reload()
+    manager.get()
+    assert manager.reloads == 1
+
+
+def test_config_manager_keeps_valid_config(config_path):
+    """
+    Sad path: Test that an invalid edit keeps the previous configuration in use.
+    """
+    manager = ConfigManager(config_path, check_interval=0)
+    _replace(config_path, 'max_rows_show: 100', 'max_rows_show: -1')
+
+    assert manager.get().max_rows_show == 100
+    assert manager.failed_reloads == 1
+
+
+def test_read_config_invalid_yaml(tmp_path):
+    """
+    Sad path: Test that a file that is not valid YAML is rejected.
+    """
+    path = tmp_path / 'config.yaml'
+    path.write_text('predict: [unclosed')
+    with pytest.raises(ValueError):
+        read_config(str(path))
+
+
+def test_app_config_missing_model_path():
+    """
+    Sad path: Test that a configuration without a model path is rejected.
+    """
+    with pytest.raises(ValueError):
+        AppConfig({'predict': {'booking_to_row': {'initial_features': ['hotel']}}})
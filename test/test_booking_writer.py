@@ -0,0 +1,194 @@
+"""
+Unit tests for the booking_writer.py module.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import pytest
+
+import sqlalchemy
+
+from src.add_bookings import Bookings, create_db
+from src.booking_writer import BookingWriter
+
+
+def _booking(i):
+    return dict(hotel=i % 2, arrival_date_day_of_month=1, arrival_date_week_number=1,
+                reservation_day=1, reservation_month=1, reservation_weekday=1,
+                lead_time=i, stays_in_week_nights=1, stays_in_weekend_nights=1,
+                total_of_special_requests=0, market_segment=1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on an empty SQLite bookings database."""
+    engine_string = f"sqlite:///{tmp_path / 'bookings.db'}"
+    create_db(engine_string)
+    return sqlalchemy.create_engine(engine_string)
+
+
+def _count(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(Bookings.__table__)).scalar()
+
+
+def test_booking_writer_flushes_in_batches(engine):
+    """
+    Happy path: Test that queued bookings are written in multi-row batches.
+    """
+    writer = BookingWriter(engine, flush_size=100, flush_interval=5)
+    for i in range(250):
+        assert writer.enqueue(_booking(i))
+    writer.close()
+
+    assert _count(engine) == 250
+    assert writer.stats()['written'] == 250
+    assert writer.stats()['flushes'] == 3
+
+
+def test_booking_writer_flushes_on_interval(engine):
+    """
+    Happy path: Test that a partial batch is written after the flush interval.
+    """
+    writer = BookingWriter(engine, flush_size=100, flush_interval=0.05)
+    writer.enqueue(_booking(0))
+    deadline = time.time() + 5
+    while writer.stats()['written'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert _count(engine) == 1
+    writer.close()
+
+
+def test_booking_writer_rejects_when_full(engine):
+    """
+    Sad path: Test that a full queue rejects bookings instead of blocking.
+    """
+    writer = BookingWriter(engine, max_queue_size=1, put_timeout=0)
+    # Keep the writer thread from draining the queue
+    writer._ensure_started = lambda: None  # pylint: disable=protected-access
+    assert writer.enqueue(_booking(0))
+    assert not writer.enqueue(_booking(1))
+    assert writer.stats()['rejected'] == 1
+
+
+def test_booking_writer_closed(engine):
+    """
+    Sad path: Test that a closed writer does not accept bookings.
+    """
+    writer = BookingWriter(engine)
+    writer.close()
+    assert not writer.enqueue(_booking(0))
+
+
+def test_booking_writer_retries_transient_errors(engine):
+    """
+    Happy path: Test that a batch hitting a locked database is retried and written.
+    """
+    attempts = []
+
+    @sqlalchemy.event.listens_for(engine, 'before_cursor_execute')
+    def _locked(conn, cursor, statement, parameters, context, executemany):
+        attempts.append(statement)
+        if len(attempts) <= 2:
+            raise sqlite3.OperationalError('database is locked')
+
+    writer = BookingWriter(engine, flush_interval=5, retry_backoff=0.001)
+    for i in range(10):
+        writer.enqueue(_booking(i))
+    writer.close()
+
+    assert _count(engine) == 10
+    assert writer.stats()['retries'] == 2
+    assert writer.stats()['failed'] == 0
+
+
+def test_booking_writer_dead_letters_bad_rows(engine, tmp_path):
+    """
+    Sad path: Test that one bad booking is spilled to the dead-letter file alone.
+    """
+    with engine.begin() as connection:
+        connection.execute(Bookings.__table__.insert(), [dict(_booking(0), id=5)])
+    dead_letter_path = tmp_path / 'failed_bookings.jsonl'
+
+    writer = BookingWriter(engine, flush_interval=5, retry_backoff=0.001,
+                           dead_letter_path=str(dead_letter_path))
+    # The booking with id 5 collides with the one already stored
+    for i in range(1, 11):
+        writer.enqueue(dict(_booking(i), id=i))
+    writer.close()
+
+    assert _count(engine) == 10
+    assert writer.stats()['written'] == 9
+    assert writer.stats()['retries'] == 0
+    assert writer.stats()['dead_lettered'] == 1
+    with open(dead_letter_path, 'r') as dead_letter_file:
+        records = [json.loads(line) for line in dead_letter_file]
+    assert [record['booking']['id'] for record in records] == [5]
+    assert 'UNIQUE' in records[0]['error']
+
+
+def test_booking_writer_survives_unexpected_errors(engine, tmp_path):
+    """
+    Sad path: Test that an error other than a database error only loses its booking.
+    """
+    dead_letter_path = tmp_path / 'failed_bookings.jsonl'
+    writer = BookingWriter(engine, flush_interval=5, dead_letter_path=str(dead_letter_path))
+    insert = writer._insert  # pylint: disable=protected-access
+
+    def _insert(rows, max_retries):
+        if any(row['lead_time'] == 3 for row in rows):
+            raise TypeError('bad column value')
+        insert(rows, max_retries)
+
+    writer._insert = _insert  # pylint: disable=protected-access
+    for i in range(10):
+        writer.enqueue(_booking(i))
+    writer.close()
+
+    assert _count(engine) == 9
+    assert writer.stats()['dead_lettered'] == 1
+    with open(dead_letter_path, 'r', encoding='utf-8') as dead_letter_file:
+        assert json.loads(dead_letter_file.readline())['booking']['lead_time'] == 3
+
+
+def test_booking_writer_restarts_dead_thread(engine):
+    """
+    Sad path: Test that bookings queued after the writer thread died are still written.
+    """
+    writer = BookingWriter(engine, flush_interval=5)
+    # Stand in a writer thread of this process that has already exited
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    writer._thread = dead  # pylint: disable=protected-access
+    writer._pid = os.getpid()  # pylint: disable=protected-access
+
+    assert writer.enqueue(_booking(0))
+    assert writer._thread.is_alive()  # pylint: disable=protected-access
+    writer.close()
+    assert _count(engine) == 1
+
+
+def test_booking_writer_no_enqueue_after_close(engine):
+    """
+    Sad path: Test that a booking racing close() is either written or refused.
+    """
+    writer = BookingWriter(engine, flush_interval=0.01)
+    accepted = []
+
+    def _enqueue():
+        for i in range(200):
+            accepted.append(writer.enqueue(_booking(i)))
+
+    thread = threading.Thread(target=_enqueue)
+    thread.start()
+    time.sleep(0.01)
+    writer.close()
+    thread.join()
+
+    assert _count(engine) == sum(accepted)
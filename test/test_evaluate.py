@@ -6,7 +6,7 @@ import pytest
 
 import pandas as pd
 from sklearn.metrics import accuracy_score, roc_auc_score, f1_score
-from src.evaluate import score_model, evaluate_model
+from src.evaluate import score_model, score_model_chunked, evaluate_model
 
 
 X_test = pd.DataFrame({'hotel': {0: 0,
@@ -618,6 +618,34 @@ def test_score_model_with_empty_dataframe():
     with pytest.raises(KeyError):
         score_model(df_empty, dtree, initial_features)
 
+def test_score_model_chunked(tmp_path):
+    """
+    Happy path: Tests that chunked scoring writes the same files as score_model.
+    """
+    x_test_path = str(tmp_path / 'X_test.csv')
+    X_test.to_csv(x_test_path, index=False)
+    ypred_proba_out, ypred_bin_out = score_model(x_test_path, dtree, initial_features)
+    ypred_proba_out.to_csv(tmp_path / 'y_pred_proba.csv', index=False)
+    ypred_bin_out.to_csv(tmp_path / 'y_pred.csv', index=False)
+
+    n_rows = score_model_chunked(x_test_path, dtree, str(tmp_path / 'y_pred_proba_chunked.csv'),
+                                 str(tmp_path / 'y_pred_chunked.csv'), initial_features,
+                                 chunksize=7)
+
+    assert n_rows == len(X_test)
+    for name in ('y_pred_proba', 'y_pred'):
+        with open(tmp_path / f'{name}.csv') as expected, \
+                open(tmp_path / f'{name}_chunked.csv') as streamed:
+            assert streamed.read() == expected.read()
+
+def test_score_model_chunked_missing_file(tmp_path):
+    """
+    Sad path: Tests the score_model_chunked function with a missing input file.
+    """
+    with pytest.raises(FileNotFoundError):
+        score_model_chunked(str(tmp_path / 'missing.csv'), dtree, str(tmp_path / 'a.csv'),
+                            str(tmp_path / 'b.csv'), initial_features)
+
 def test_evaluate_model():
     """
     Happy path: Tests the evaluate_model function.
@@ -0,0 +1,91 @@
+"""
+Unit tests for the ingest module.
+"""
+import pandas as pd
+import pytest
+
+from src.ingest import BOOKING_COLUMNS, read_booking_chunks, validate_bookings
+
+
+def _bookings(n_rows=4):
+    return pd.DataFrame({"hotel": ["City Hotel", "Resort Hotel", 1, 0][:n_rows],
+                         "arrival_date_day_of_month": [1, 15, 31, 2][:n_rows],
+                         "arrival_date_week_number": [1, 20, 53, 3][:n_rows],
+                         "day": [1, 2, 3, 4][:n_rows],
+                         "month": [1, 6, 12, 2][:n_rows],
+                         "weekday": [0, 3, 6, 1][:n_rows],
+                         "lead_time": [0, 10, 300, 5][:n_rows],
+                         "stays_in_week_nights": [1, 2, 3, 0][:n_rows],
+                         "stays_in_weekend_nights": [0, 1, 2, 0][:n_rows],
+                         "total_of_special_requests": [0, 1, 2, 0][:n_rows],
+                         "market_segment": [1, 2, 3, 4][:n_rows]})
+
+
+def test_validate_bookings():
+    """
+    Happy path: Test that valid bookings are converted to table columns.
+    """
+    valid, rejected = validate_bookings(_bookings())
+    assert list(valid.columns) == BOOKING_COLUMNS
+    assert valid["hotel"].tolist() == [1, 0, 1, 0]
+    assert valid["reservation_month"].tolist() == [1, 6, 12, 2]
+    assert rejected.empty
+
+
+def test_validate_bookings_rejects_rows():
+    """
+    Sad path: Test that out-of-range, fractional and missing values are rejected.
+    """
+    bookings = _bookings()
+    bookings["month"] = [13, 6, 12, 2]
+    bookings["lead_time"] = [0, 1.5, 300, None]
+    valid, rejected = validate_bookings(bookings)
+    assert len(valid) == 1
+    assert rejected["reason"].tolist() == ["invalid reservation_month",
+                                           "invalid lead_time", "invalid lead_time"]
+
+
+def test_validate_bookings_missing_column():
+    """
+    Sad path: Test that a file without a booking column is refused.
+    """
+    with pytest.raises(ValueError):
+        validate_bookings(_bookings().drop(columns="market_segment"))
+
+
+def test_read_booking_chunks(tmp_path):
+    """
+    Happy path: Test streaming CSV and JSON-lines files in chunks.
+    """
+    bookings = _bookings()
+    csv_path = tmp_path / "bookings.csv"
+    bookings.to_csv(csv_path, index=False)
+    jsonl_path = tmp_path / "bookings.jsonl"
+    bookings.to_json(jsonl_path, orient="records", lines=True)
+
+    for path in (csv_path, jsonl_path):
+        chunks = list(read_booking_chunks(str(path), chunksize=3))
+        assert [len(chunk) for chunk in chunks] == [3, 1]
+
+
+def test_read_booking_chunks_parquet(tmp_path):
+    """
+    Happy path: Test streaming a Parquet file in chunks.
+    """
+    pytest.importorskip("pyarrow")
+    # A Parquet column holds one type, unlike the mixed names and codes of _bookings
+    bookings = _bookings().assign(hotel=["City Hotel", "Resort Hotel", "City Hotel", "City Hotel"])
+    parquet_path = tmp_path / "bookings.parquet"
+    bookings.to_parquet(parquet_path, index=False)
+
+    chunks = list(read_booking_chunks(str(parquet_path), chunksize=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), bookings)
+
+
+def test_read_booking_chunks_unsupported(tmp_path):
+    """
+    Sad path: Test reading a file of an unsupported format.
+    """
+    with pytest.raises(ValueError):
+        list(read_booking_chunks(str(tmp_path / "bookings.xlsx")))
@@ -0,0 +1,120 @@
+"""
+Unit tests for the metrics.py module.
+"""
+
+import os
+
+import pytest
+
+from src.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Happy path: Test that observations land in cumulative buckets with sum and count.
+    """
+    metrics = MetricsRegistry()
+    latency = metrics.histogram('stage_duration_seconds', 'Stage latency', ('stage',),
+                                buckets=(0.01, 0.1))
+    latency.observe(0.005, 'predict')
+    latency.observe(0.05, 'predict')
+    latency.observe(1.0, 'predict')
+    with latency.time('render'):
+        pass
+
+    text = metrics.render()
+    assert '# TYPE stage_duration_seconds histogram' in text
+    assert 'stage_duration_seconds_bucket{stage="predict",le="0.01"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="predict",le="0.1"} 2' in text
+    assert 'stage_duration_seconds_bucket{stage="predict",le="+Inf"} 3' in text
+    assert 'stage_duration_seconds_sum{stage="predict"} 1.055' in text
+    assert 'stage_duration_seconds_count{stage="predict"} 3' in text
+    assert 'stage_duration_seconds_count{stage="render"} 1' in text
+
+
+def test_counter_renders_labels():
+    """
+    Happy path: Test that counters are rendered per label set.
+    """
+    metrics = MetricsRegistry()
+    requests = metrics.counter('http_requests_total', 'Requests', ('route', 'status'))
+    requests.inc('/predict', '302')
+    requests.inc('/predict', '302')
+    requests.inc('/', '200')
+
+    text = metrics.render()
+    assert 'http_requests_total{route="/predict",status="302"} 2' in text
+    assert 'http_requests_total{route="/",status="200"} 1' in text
+
+
+def test_metrics_directory_adds_up_processes(tmp_path):
+    """
+    Happy path: Test that the dumps of other processes are added to the report.
+    """
+    metrics = MetricsRegistry(directory=str(tmp_path))
+    requests = metrics.counter('http_requests_total', 'Requests', ('route',))
+    requests.inc('/predict', amount=3)
+    metrics.flush()
+    # Pretend the dump was written by another worker
+    os.rename(tmp_path / f'metrics_{os.getpid()}.json', tmp_path / 'metrics_1.json')
+    requests.reset()
+    requests.inc('/predict')
+
+    assert 'http_requests_total{route="/predict"} 4' in metrics.render()
+
+    metrics.clear_directory()
+    assert 'http_requests_total{route="/predict"} 1' in metrics.render()
+
+
+def test_metrics_worker_restart_is_counted_once(tmp_path):
+    """
+    Happy path: Test that a reaped worker's values move into the total and its
+    dump is removed, so neither its replacement nor a reused pid counts it twice.
+    """
+    metrics = MetricsRegistry(directory=str(tmp_path))
+    requests = metrics.counter('http_requests_total', 'Requests', ('route',))
+    latency = metrics.histogram('request_duration_seconds', 'Latency', buckets=(0.1,))
+    requests.inc('/predict', amount=3)
+    latency.observe(0.05)
+    metrics.flush()
+    # Pretend the dump was written by a worker that has exited since
+    os.rename(tmp_path / f'metrics_{os.getpid()}.json', tmp_path / 'metrics_1.json')
+    metrics.collect_exited(1)
+
+    assert not (tmp_path / 'metrics_1.json').exists()
+    assert (tmp_path / 'metrics_total.json').exists()
+
+    # Its replacement starts from zero, then reuses the pid and exits too
+    metrics.reset()
+    requests.inc('/predict', amount=2)
+    latency.observe(0.5)
+    metrics.flush()
+    os.rename(tmp_path / f'metrics_{os.getpid()}.json', tmp_path / 'metrics_1.json')
+    metrics.collect_exited(1)
+    metrics.reset()
+    # Reaping a worker that never dumped changes nothing
+    metrics.collect_exited(2)
+
+    text = metrics.render()
+    assert 'http_requests_total{route="/predict"} 5' in text
+    assert 'request_duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'request_duration_seconds_count 2' in text
+    assert os.listdir(tmp_path) == ['metrics_total.json']
+
+
+def test_histogram_unsorted_buckets():
+    """
+    Sad path: Test that unsorted bucket bounds are rejected.
+    """
+    with pytest.raises(ValueError):
+        Histogram('latency', 'Latency', buckets=(1.0, 0.1))
+
+
+def test_metrics_duplicate_name():
+    """
+    Sad path: Test that a metric name cannot be registered twice.
+    """
+    metrics = MetricsRegistry()
+    metrics.counter('http_requests_total', 'Requests')
+    with pytest.raises(ValueError):
+        metrics.counter('http_requests_total', 'Requests')
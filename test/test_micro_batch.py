@@ -0,0 +1,164 @@
+"""
+Unit tests for the micro_batch.py module.
+"""
+
+import concurrent.futures
+import threading
+import pytest
+
+import numpy as np
+
+from src.micro_batch import MicroBatcher
+from src.predict import booking_to_row, predict_row, predict_rows
+
+initial_features = ['hotel', 'arrival_date_day_of_month', 'arrival_date_week_number',
+                    'day', 'month', 'weekday', 'lead_time', 'stays_in_week_nights',
+                    'stays_in_weekend_nights', 'total_of_special_requests', 'market_segment']
+
+
+def _sum_rows(rows):
+    return rows.sum(axis=1).tolist()
+
+
+def test_micro_batcher_batches_concurrent_rows():
+    """
+    Happy path: Rows submitted together are scored in one call.
+    """
+    batch_sizes = []
+    release = threading.Event()
+
+    def _record(rows):
+        release.wait(1)
+        batch_sizes.append(len(rows))
+        return _sum_rows(rows)
+
+    batcher = MicroBatcher(_record, max_batch_size=8, max_wait_ms=200, adaptive=False)
+    futures = [batcher.submit(np.array([i, 1.0])) for i in range(8)]
+    release.set()
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert results == [i + 1.0 for i in range(8)]
+    assert sum(batch_sizes) == 8
+    assert batcher.stats()['batches'] == len(batch_sizes) < 8
+
+
+def test_micro_batcher_matches_predict_row():
+    """
+    Happy path: Batched predictions match direct single-row predictions.
+    """
+    batcher = MicroBatcher(lambda rows: predict_rows(rows, 'models/dt_model.pkl'),
+                           max_batch_size=16, max_wait_ms=5)
+    rng = np.random.default_rng(42)
+    rows = [booking_to_row(dict(zip(initial_features, values)), initial_features)
+            for values in rng.integers(0, 10, size=(50, len(initial_features)))]
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        batched = list(executor.map(
+            lambda row: predict_row(row, 'models/dt_model.pkl', batcher=batcher), rows))
+    batcher.close()
+
+    for row, (prediction_out, proba_out) in zip(rows, batched):
+        prediction_true, proba_true = predict_row(row, 'models/dt_model.pkl')
+        assert prediction_out == prediction_true
+        assert np.array_equal(proba_out, proba_true)
+    assert batcher.stats()['items'] == 50
+
+
+def test_micro_batcher_adapts_batch_limit():
+    """
+    Happy path: The batch limit grows while full batches are fast.
+    """
+    batcher = MicroBatcher(_sum_rows, max_batch_size=64, max_wait_ms=50)
+    start_limit = batcher.batch_limit
+    for _ in range(3):
+        batcher._adapt(batcher.batch_limit, 0.0)  # pylint: disable=protected-access
+    assert batcher.batch_limit == min(64, start_limit * 8)
+
+    batcher._adapt(1, 1.0)  # pylint: disable=protected-access
+    assert batcher.batch_limit == min(64, start_limit * 8) // 2
+
+
+def test_micro_batcher_propagates_errors():
+    """
+    Sad path: A failing model call fails every request of the batch.
+    """
+    def _fail(rows):
+        raise ValueError('bad batch')
+
+    batcher = MicroBatcher(_fail, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.predict(np.zeros(2), timeout=5)
+    batcher.close()
+
+
+def test_micro_batcher_bad_row_fails_alone():
+    """
+    Sad path: A row the model refuses fails only its own request, not the batch.
+    """
+    release = threading.Event()
+
+    def _finite_sum(rows):
+        release.wait(1)
+        if not np.isfinite(rows).all():
+            raise ValueError('non-finite row')
+        return _sum_rows(rows)
+
+    batcher = MicroBatcher(_finite_sum, max_batch_size=8, max_wait_ms=200, adaptive=False)
+    futures = [batcher.submit(np.array([1.0, 2.0])),
+               batcher.submit(np.array([np.nan, 1.0])),
+               batcher.submit(np.array([3.0, 4.0]))]
+    release.set()
+
+    assert futures[0].result(timeout=5) == 3.0
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 7.0
+    batcher.close()
+
+
+def test_micro_batcher_closed():
+    """
+    Sad path: A closed batcher does not accept rows.
+    """
+    batcher = MicroBatcher(_sum_rows)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.zeros(2))
+
+
+def test_micro_batcher_default_timeout():
+    """
+    Sad path: A stuck model call times out instead of hanging the request.
+    """
+    release = threading.Event()
+
+    def _stuck(rows):
+        release.wait(5)
+        return _sum_rows(rows)
+
+    batcher = MicroBatcher(_stuck, max_wait_ms=1, score_budget_ms=50)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        batcher.predict(np.zeros(2))
+    release.set()
+    batcher.close()
+
+
+def test_micro_batcher_close_fails_pending_rows():
+    """
+    Sad path: Closing a stuck batcher fails the rows still waiting.
+    """
+    release = threading.Event()
+
+    def _stuck(rows):
+        release.wait(5)
+        return _sum_rows(rows)
+
+    batcher = MicroBatcher(_stuck, max_batch_size=1, max_wait_ms=1, adaptive=False)
+    futures = [batcher.submit(np.zeros(2)) for _ in range(3)]
+    batcher.close(timeout=0.1)
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
@@ -0,0 +1,117 @@
+"""
+Unit tests for the model_artifact.py module.
+"""
+
+import pickle
+import pytest
+
+import numpy as np
+
+from src.model_artifact import export_model, load_model_artifact
+from src.model_registry import ModelRegistry
+from src.tree_evaluator import CompiledTree
+
+with open('models/dt_model.pkl', 'rb') as model_file:
+    model = pickle.load(model_file)
+
+rng = np.random.default_rng(42)
+X_test = np.column_stack([rng.integers(0, 2, 500), rng.integers(1, 32, 500),
+                          rng.integers(1, 54, 500), rng.integers(1, 32, 500),
+                          rng.integers(1, 13, 500), rng.integers(0, 7, 500),
+                          np.log(rng.integers(0, 700, 500) + 1), rng.integers(0, 10, 500),
+                          rng.integers(0, 5, 500), rng.integers(0, 5, 500),
+                          rng.integers(0, 8, 500)]).astype(float)
+
+
+def test_export_and_load_model_artifact(tmp_path):
+    """
+    Happy path: Test that a loaded artifact predicts exactly like the model.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    version = export_model(model, artifact_path)
+    tree, version_out = load_model_artifact(artifact_path)
+
+    assert version_out == version
+    assert tree.feature_names == list(model.feature_names_in_)
+    assert np.array_equal(tree.predict(X_test), model.predict(X_test))
+    assert np.array_equal(tree.predict_proba(X_test), model.predict_proba(X_test))
+
+
+def test_load_model_artifact_is_memory_mapped(tmp_path):
+    """
+    Happy path: Test that the node arrays are read-only views of the file.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    export_model(model, artifact_path)
+    tree, _ = load_model_artifact(artifact_path)
+
+    assert isinstance(tree.threshold.base, np.memmap)
+    assert not tree.threshold.flags.writeable
+
+
+def test_load_model_artifact_shares_every_array(tmp_path):
+    """
+    Happy path: Test that no node array is copied into private memory.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    export_model(model, artifact_path)
+    tree, _ = load_model_artifact(artifact_path)
+    buffer = tree.threshold.base
+
+    for name in ['children_left', 'children_right', 'feature', 'threshold', 'value',
+                 'node_proba', 'node_class_index']:
+        assert np.shares_memory(getattr(tree, name), buffer), name
+    # Walking a single row reads the file pages too
+    assert np.shares_memory(np.asarray(tree._threshold), buffer)
+    assert tree.predict_one(X_test[0])[0] == model.predict(X_test[:1])[0]
+
+
+def test_load_model_artifact_old_format(tmp_path):
+    """
+    Sad path: Test that an artifact of an earlier format must be re-exported.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    export_model(model, artifact_path)
+    with open(artifact_path, 'rb') as file:
+        data = file.read()
+    old_path = str(tmp_path / 'old_model.tree')
+    with open(old_path, 'wb') as file:
+        file.write(data.replace(b'"format": 2', b'"format": 1', 1))
+
+    with pytest.raises(ValueError, match='re-export'):
+        load_model_artifact(old_path)
+
+
+def test_registry_loads_model_artifact(tmp_path):
+    """
+    Happy path: Test that the registry memory-maps .tree artifacts.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    version = export_model(model, artifact_path)
+    entry = ModelRegistry().get(artifact_path)
+
+    assert isinstance(entry.model, CompiledTree)
+    assert entry.version == version
+
+
+def test_load_model_artifact_truncated(tmp_path):
+    """
+    Sad path: Test loading an artifact that was not fully written.
+    """
+    artifact_path = str(tmp_path / 'dt_model.tree')
+    export_model(model, artifact_path)
+    with open(artifact_path, 'rb') as file:
+        data = file.read()
+    with open(artifact_path, 'wb') as file:
+        file.write(data[:len(data) // 2])
+
+    with pytest.raises(ValueError):
+        load_model_artifact(artifact_path)
+
+
+def test_load_model_artifact_wrong_format():
+    """
+    Sad path: Test loading a pickle as an artifact.
+    """
+    with pytest.raises(ValueError):
+        load_model_artifact('models/dt_model.pkl')
@@ -0,0 +1,90 @@
+"""
+Unit tests for the model_registry.py module.
+"""
+
+import os
+import pickle
+import pytest
+
+from src.model_registry import ModelRegistry
+
+
+def _write_model(path, model):
+    with open(path, 'wb') as model_file:
+        pickle.dump(model, model_file)
+
+
+def test_registry_loads_once(tmp_path):
+    """
+    Happy path: Repeated lookups of an unchanged artifact load it only once.
+    """
+    model_path = str(tmp_path / 'model.pkl')
+    _write_model(model_path, {'weights': [1, 2, 3]})
+    registry = ModelRegistry()
+
+    first = registry.get(model_path)
+    second = registry.get(model_path)
+
+    assert first is second
+    assert first.model == {'weights': [1, 2, 3]}
+    assert registry.stats()['loads'] == 1
+    assert registry.stats()['models'][first.path]['last_load_seconds'] >= 0
+
+
+def test_registry_reloads_changed_artifact(tmp_path):
+    """
+    Happy path: A retrained artifact is picked up with a new version.
+    """
+    model_path = str(tmp_path / 'model.pkl')
+    _write_model(model_path, 'old model')
+    registry = ModelRegistry()
+    old_entry = registry.get(model_path)
+
+    _write_model(model_path, 'new model, retrained')
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    new_entry = registry.get(model_path)
+
+    assert new_entry.model == 'new model, retrained'
+    assert new_entry.version != old_entry.version
+    assert registry.stats()['loads'] == 2
+
+
+def test_registry_keeps_model_on_touch(tmp_path):
+    """
+    Happy path: Touching the artifact without changing it does not reload.
+    """
+    model_path = str(tmp_path / 'model.pkl')
+    _write_model(model_path, 'model')
+    registry = ModelRegistry()
+    old_entry = registry.get(model_path)
+
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.get(model_path).version == old_entry.version
+    assert registry.stats()['loads'] == 1
+
+
+def test_registry_keeps_previous_model_on_corrupt_artifact(tmp_path):
+    """
+    Sad path: A half-written artifact does not replace the loaded model.
+    """
+    model_path = str(tmp_path / 'model.pkl')
+    _write_model(model_path, 'model')
+    registry = ModelRegistry()
+    registry.get(model_path)
+
+    with open(model_path, 'wb') as model_file:
+        model_file.write(b'\x80\x04truncated')
+
+    assert registry.get_model(model_path) == 'model'
+    assert registry.stats()['failed_loads'] == 1
+
+
+def test_registry_missing_file():
+    """
+    Sad path: A missing artifact raises FileNotFoundError.
+    """
+    with pytest.raises(FileNotFoundError):
+        ModelRegistry().get('models/does_not_exist.pkl')
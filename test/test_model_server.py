@@ -0,0 +1,131 @@
+"""
+Unit tests for the model_server.py module and its client in predict.py.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from src.model_server import encode_request, recv_exact
+from src.predict import (ModelServerClient, current_model_version, load_compiled_tree,
+                         predict_batch, predict_row)
+from src.prediction_cache import PredictionCache
+
+MODEL_PATH = 'models/dt_model.pkl'
+FEATURES = ['hotel', 'arrival_date_day_of_month', 'arrival_date_week_number', 'day', 'month',
+            'weekday', 'lead_time', 'stays_in_week_nights', 'stays_in_weekend_nights',
+            'total_of_special_requests', 'market_segment']
+
+rng = np.random.default_rng(42)
+rows = rng.integers(0, 10, size=(50, 11)).astype(np.float32)
+
+
+@pytest.fixture
+def model_server(tmp_path):
+    """Model server with two scoring processes on a temporary socket."""
+    socket_path = str(tmp_path / 'model.sock')
+    master = subprocess.Popen([sys.executable, 'run.py', 'model_server',
+                               '--socket_path', socket_path, '--model_path', MODEL_PATH,
+                               '--workers', '2'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while not os.path.exists(socket_path):
+        assert time.time() < deadline and master.poll() is None
+        time.sleep(0.05)
+    yield master, socket_path
+    master.send_signal(signal.SIGTERM)
+    master.wait(timeout=10)
+
+
+def test_model_server_matches_local_scoring(model_server):
+    """
+    Happy path: Test that the model server returns the local predictions.
+    """
+    _, socket_path = model_server
+    client = ModelServerClient(socket_path, timeout=10)
+    classes, proba, version = client.score(rows)
+
+    expected_classes, expected_proba = load_compiled_tree(MODEL_PATH).predict_with_proba(rows)
+    np.testing.assert_array_equal(classes, expected_classes)
+    np.testing.assert_array_equal(proba, expected_proba)
+    assert version == client.version
+    assert client.predict_rows(rows[0])[0][1].shape == (1, 2)
+
+
+def test_model_server_reconnects_after_worker_replacement(model_server):
+    """
+    Happy path: Test that the client retries on a fresh connection when its
+    scoring process was replaced.
+    """
+    master, socket_path = model_server
+    client = ModelServerClient(socket_path, timeout=10)
+    client.score(rows[0])
+    master.send_signal(signal.SIGHUP)
+    time.sleep(1)
+
+    classes, _, _ = client.score(rows[:5])
+    assert len(classes) == 5
+    assert client.stats()['reconnects'] == 1
+
+
+def test_model_server_invalid_rows(model_server):
+    """
+    Sad path: Test that rows with the wrong number of features are rejected
+    without breaking the connection.
+    """
+    _, socket_path = model_server
+    client = ModelServerClient(socket_path, timeout=10)
+    with pytest.raises(ValueError):
+        client.score(np.zeros((2, 3)))
+    assert len(client.score(rows[:2])[0]) == 2
+
+
+def test_model_server_client_no_server(tmp_path):
+    """
+    Sad path: Test that scoring fails when no model server is listening.
+    """
+    client = ModelServerClient(str(tmp_path / 'missing.sock'))
+    with pytest.raises(OSError):
+        client.score(rows[0])
+    assert client.stats()['errors'] == 1
+
+
+def test_client_scoring_never_loads_the_model_locally(model_server):
+    """
+    Happy path: Test that with a client the server's version keys the cache and
+    the model file is never read in the web worker.
+    """
+    _, socket_path = model_server
+    client = ModelServerClient(socket_path, timeout=10)
+    cache = PredictionCache()
+    # The web worker has no model file at all
+    missing_path = 'models/missing.pkl'
+
+    prediction, proba = predict_row(rows[0], missing_path, cache=cache, client=client)
+    assert client.version is not None
+    assert current_model_version(missing_path, client) == client.version
+    assert predict_row(rows[0], missing_path, cache=cache, client=client) == (prediction, proba)
+    assert cache.stats()['hits'] == 1
+
+    records = [dict(zip(FEATURES, row.tolist())) for row in rows[:3]]
+    predictions, _ = predict_batch(records, missing_path, client=client,
+                                   initial_features=FEATURES)
+    assert len(predictions) == 3
+
+
+def test_recv_exact_closed_connection():
+    """
+    Sad path: Test that a message cut short by the peer raises ConnectionError.
+    """
+    left, right = socket.socketpair()
+    left.sendall(encode_request(rows[:1])[:5])
+    left.close()
+    with pytest.raises(ConnectionError):
+        recv_exact(right, 8)
+    right.close()
@@ -7,7 +7,10 @@ import pytest
 
 import pandas as pd
 import numpy as np
-from src.predict import predict
+from src.model_registry import registry
+from src.prediction_cache import PredictionCache
+from src.predict import (MissingFeaturesError, predict, predict_batch, booking_to_row,
+                         predict_row)
 
 X_test = pd.DataFrame({'hotel': {0: 0},
                        'arrival_date_day_of_month': {0: 2.772588722239781},
@@ -69,3 +72,122 @@ def test_predict_empty_df():
 
     with pytest.raises(KeyError):
         predict(x_test_wrong, 'models/dt_model.pkl')
+
+BATCH_RECORDS = [{'hotel': 0, 'arrival_date_day_of_month': 16, 'arrival_date_week_number': 38,
+                  'day': 16, 'month': 9, 'weekday': 2, 'lead_time': 193,
+                  'stays_in_week_nights': 3, 'stays_in_weekend_nights': 0,
+                  'total_of_special_requests': 0, 'market_segment': 5},
+                 {'hotel': 1, 'arrival_date_day_of_month': 3, 'arrival_date_week_number': 10,
+                  'day': 1, 'month': 2, 'weekday': 4, 'lead_time': 12,
+                  'stays_in_week_nights': 2, 'stays_in_weekend_nights': 1,
+                  'total_of_special_requests': 1, 'market_segment': 6},
+                 {'hotel': 1, 'arrival_date_day_of_month': 28, 'arrival_date_week_number': 48,
+                  'day': 27, 'month': 11, 'weekday': 0, 'lead_time': 0,
+                  'stays_in_week_nights': 1, 'stays_in_weekend_nights': 2,
+                  'total_of_special_requests': 3, 'market_segment': 3}]
+
+def test_predict_batch():
+    """
+    Happy path: Test that predict_batch matches predict row by row.
+    """
+    predictions_out, predict_proba_out = predict_batch(BATCH_RECORDS, 'models/dt_model.pkl')
+
+    assert predict_proba_out.shape == (len(BATCH_RECORDS), 2)
+    for i, record in enumerate(BATCH_RECORDS):
+        prediction_true, proba_true = predict(pd.DataFrame(record, index=[0]),
+                                              'models/dt_model.pkl')
+        assert predictions_out[i] == prediction_true
+        assert np.array_equal(predict_proba_out[i], proba_true[0])
+
+def test_predict_batch_missing_columns():
+    """
+    Sad path: Test the predict_batch function with a missing feature.
+    """
+    records = [{key: value for key, value in BATCH_RECORDS[0].items() if key != 'lead_time'}]
+
+    with pytest.raises(KeyError):
+        predict_batch(records, 'models/dt_model.pkl')
+
+def test_predict_batch_record_missing_key():
+    """
+    Sad path: Test that one booking lacking a feature is refused, not scored as NaN.
+    """
+    records = [dict(BATCH_RECORDS[0]), dict(BATCH_RECORDS[0])]
+    del records[1]['market_segment']
+
+    with pytest.raises(MissingFeaturesError) as excinfo:
+        predict_batch(records, 'models/dt_model.pkl')
+    assert excinfo.value.index == 1
+    assert excinfo.value.missing == ['market_segment']
+
+def test_predict_batch_empty():
+    """
+    Sad path: Test the predict_batch function without bookings.
+    """
+    with pytest.raises(ValueError):
+        predict_batch([], 'models/dt_model.pkl')
+
+def test_predict_row():
+    """
+    Happy path: Test that the feature row fast path matches predict.
+    """
+    initial_features = list(model.feature_names_in_)
+    for record in BATCH_RECORDS:
+        booking = {key: str(value) for key, value in record.items()}
+        row = booking_to_row(booking, initial_features)
+        prediction_out, proba_out = predict_row(row, 'models/dt_model.pkl')
+        prediction_true, proba_true = predict(pd.DataFrame(record, index=[0]),
+                                              'models/dt_model.pkl')
+
+        assert row.dtype == np.float32
+        assert prediction_out == prediction_true
+        assert np.array_equal(proba_out, proba_true)
+
+def test_predict_row_cache():
+    """
+    Happy path: Test that a repeated feature row is served from the cache.
+    """
+    cache = PredictionCache(max_size=10)
+    row = booking_to_row(BATCH_RECORDS[0], list(model.feature_names_in_))
+    first = predict_row(row, 'models/dt_model.pkl', cache=cache)
+    second = predict_row(row.copy(), 'models/dt_model.pkl', cache=cache)
+
+    assert second is first
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_predict_row_entry():
+    """
+    Happy path: Test that a given registry entry scores without looking the model up again.
+    """
+    row = booking_to_row(BATCH_RECORDS[0], list(model.feature_names_in_))
+    entry = registry.get('models/dt_model.pkl')
+    prediction_out, proba_out = predict_row(row, 'models/missing.pkl', entry=entry)
+    prediction_true, proba_true = predict_row(row, 'models/dt_model.pkl')
+
+    assert prediction_out == prediction_true
+    assert np.array_equal(proba_out, proba_true)
+
+def test_booking_to_row_missing_feature():
+    """
+    Sad path: Test the booking_to_row function with a missing feature.
+    """
+    with pytest.raises(KeyError):
+        booking_to_row({'hotel': 1}, list(model.feature_names_in_))
+
+def test_booking_to_row_invalid_value():
+    """
+    Sad path: Test the booking_to_row function with a non-numeric value.
+    """
+    booking = dict(BATCH_RECORDS[0], lead_time='soon')
+    with pytest.raises(ValueError):
+        booking_to_row(booking, list(model.feature_names_in_))
+
+def test_booking_to_row_non_finite_value():
+    """
+    Sad path: Test that NaN and infinite values are refused before scoring.
+    """
+    for value in ['nan', 'inf', '1e39']:
+        booking = dict(BATCH_RECORDS[0], market_segment=value)
+        with pytest.raises(ValueError):
+            booking_to_row(booking, list(model.feature_names_in_))
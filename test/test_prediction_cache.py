@@ -0,0 +1,68 @@
+"""
+Unit tests for the prediction_cache.py module.
+"""
+
+import time
+import pytest
+
+from src.prediction_cache import PredictionCache
+
+
+def test_prediction_cache_hit_and_miss():
+    """
+    Happy path: A stored prediction is returned and counted as a hit.
+    """
+    cache = PredictionCache(max_size=10)
+    assert cache.get((1.0, 2.0), 'v1') is None
+    cache.put((1.0, 2.0), 'v1', 'cancelled')
+
+    assert cache.get((1.0, 2.0), 'v1') == 'cancelled'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    """
+    Happy path: The least recently used prediction is evicted first.
+    """
+    cache = PredictionCache(max_size=2)
+    cache.put((1,), 'v1', 'a')
+    cache.put((2,), 'v1', 'b')
+    cache.get((1,), 'v1')
+    cache.put((3,), 'v1', 'c')
+
+    assert cache.get((2,), 'v1') is None
+    assert cache.get((1,), 'v1') == 'a'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_prediction_cache_flushes_on_new_version():
+    """
+    Happy path: Looking up a new model version drops every cached prediction.
+    """
+    cache = PredictionCache(max_size=10)
+    cache.put((1,), 'v1', 'a')
+
+    assert cache.get((1,), 'v2') is None
+    cache.put((2,), 'v2', 'b')
+    assert cache.stats()['flushes'] == 1
+    assert cache.stats()['size'] == 1
+
+
+def test_prediction_cache_ttl():
+    """
+    Happy path: Expired predictions are not returned.
+    """
+    cache = PredictionCache(max_size=10, ttl_seconds=0.01)
+    cache.put((1,), 'v1', 'a')
+    time.sleep(0.02)
+
+    assert cache.get((1,), 'v1') is None
+
+
+def test_prediction_cache_invalid_size():
+    """
+    Sad path: A cache must be able to hold at least one prediction.
+    """
+    with pytest.raises(ValueError):
+        PredictionCache(max_size=0)
@@ -0,0 +1,70 @@
+"""
+Import-time budget tests for the run.py command line interface.
+"""
+
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that only the pipeline, S3 and web subcommands may import
+HEAVY_MODULES = {"pandas", "numpy", "sklearn", "boto3", "botocore", "flask",
+                 "flask_sqlalchemy", "yaml"}
+
+# Seconds run.py may spend importing modules before parsing its arguments
+HELP_IMPORT_BUDGET = 0.25
+
+
+def _import_time(*args):
+    """
+    Runs run.py under ``-X importtime``.
+
+    Returns:
+        modules (set): The top-level packages of every module imported.
+        total (float): Seconds spent importing, summed over the imports
+            made by run.py itself so nested ones are not counted twice.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "run.py", *args],
+                            cwd=REPO_ROOT, capture_output=True, text=True,
+                            timeout=60, check=True)
+    modules = set()
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip().split(".")[0])
+        # Nested imports are indented below the one that triggered them
+        if not name[1:].startswith(" "):
+            total += int(cumulative) / 1e6
+    return modules, total
+
+
+def test_help_import_budget():
+    """
+    Happy path: Test that parsing the arguments stays within the import budget.
+    """
+    modules, total = _import_time("--help")
+    assert not modules & (HEAVY_MODULES | {"sqlalchemy"})
+    assert total < HELP_IMPORT_BUDGET
+
+
+def test_create_db_imports(tmp_path):
+    """
+    Happy path: Test that create_db only imports what the database needs.
+    """
+    modules, _ = _import_time("create_db", "--engine_string",
+                              f"sqlite:///{tmp_path / 'bookings.db'}")
+    assert "sqlalchemy" in modules
+    assert not modules & HEAVY_MODULES
+
+
+def test_ingest_imports(tmp_path):
+    """
+    Happy path: Test that ingesting a booking only imports what the database needs.
+    """
+    engine_string = f"sqlite:///{tmp_path / 'bookings.db'}"
+    _import_time("create_db", "--engine_string", engine_string)
+    modules, _ = _import_time("ingest", "--engine_string", engine_string)
+    assert not modules & HEAVY_MODULES
@@ -0,0 +1,95 @@
+"""
+Unit tests for the serve.py module.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from src.serve import PooledWSGIServer, PreforkServer
+
+
+def _pid_app(environ, start_response):
+    """WSGI app answering with the pid of the process serving it."""
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port, timeout=5):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=timeout) as resp:
+                return resp.status, resp.read().decode()
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def test_pooled_server_recycles_after_max_requests():
+    """
+    Happy path: Test that the worker server stops after serving max_requests.
+    """
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    server = PooledWSGIServer(_pid_app, listener.fileno(), threads=2, max_requests=3)
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+
+    responses = [_get(port) for _ in range(3)]
+    thread.join(timeout=5)
+    listener.close()
+
+    assert not thread.is_alive()
+    assert responses == [(200, str(os.getpid()))] * 3
+    assert server.handled == 3
+
+
+def test_prefork_server_serves_and_recycles_workers():
+    """
+    Happy path: Test that forked workers serve requests, are replaced after
+    max_requests and stop cleanly on SIGTERM.
+    """
+    port = _free_port()
+    script = ("import os\n"
+              "from src.serve import PreforkServer\n"
+              "def app(environ, start_response):\n"
+              "    start_response('200 OK', [])\n"
+              "    return [str(os.getpid()).encode()]\n"
+              f"PreforkServer(app, host='127.0.0.1', port={port}, workers=2, threads=1,\n"
+              "              max_requests=2, graceful_timeout=5).run()\n")
+    master = subprocess.Popen([sys.executable, "-c", script])
+    try:
+        pids = {_get(port)[1] for _ in range(10)}
+    finally:
+        master.send_signal(signal.SIGTERM)
+        exit_code = master.wait(timeout=10)
+
+    assert str(master.pid) not in pids
+    # Two workers serving at most two requests each cannot answer ten requests
+    assert len(pids) > 2
+    assert exit_code == 0
+
+
+def test_prefork_server_invalid_workers():
+    """
+    Sad path: Test that a server without workers is rejected.
+    """
+    with pytest.raises(ValueError):
+        PreforkServer(_pid_app, workers=0)
@@ -0,0 +1,88 @@
+"""
+Unit tests for the shadow.py module.
+"""
+
+import json
+import pickle
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from src.predict import predict_row
+from src.shadow import ShadowScorer
+
+rng = np.random.default_rng(42)
+rows = rng.integers(0, 10, size=(20, 11)).astype(np.float32)
+
+
+def test_shadow_scorer_same_model(tmp_path):
+    """
+    Happy path: Shadow scoring the primary model itself never disagrees.
+    """
+    log_path = str(tmp_path / 'shadow.jsonl')
+    scorer = ShadowScorer('models/dt_model.pkl', log_path)
+    for row in rows:
+        _, proba = predict_row(row, 'models/dt_model.pkl')
+        assert scorer.submit(row, proba, 'primary', 'models/dt_model.pkl')
+    scorer.close()
+
+    with open(log_path, 'r') as log_file:
+        records = [json.loads(line) for line in log_file]
+    assert len(records) == len(rows)
+    assert all(record['agree'] for record in records)
+    assert scorer.stats()['disagreements'] == 0
+    assert 'latency_delta_ms' in records[0]
+    # Timed as bare model calls in the shadow thread, not the request's scoring time
+    assert all(record['primary_ms'] < 1000 for record in records)
+
+
+def test_shadow_scorer_logs_disagreements(tmp_path):
+    """
+    Happy path: A candidate that always predicts the other class disagrees.
+    """
+    candidate_path = str(tmp_path / 'candidate.pkl')
+    candidate = DecisionTreeClassifier().fit([[-1] * 11, [0] * 11], [0, 1])
+    with open(candidate_path, 'wb') as model_file:
+        pickle.dump(candidate, model_file)
+
+    scorer = ShadowScorer(candidate_path, str(tmp_path / 'shadow.jsonl'))
+    scorer.submit(rows[0], np.array([[1.0, 0.0]]), 'primary', 'models/dt_model.pkl')
+    scorer.close()
+
+    assert scorer.stats()['disagreements'] == 1
+
+
+def test_shadow_scorer_drops_when_full(tmp_path):
+    """
+    Sad path: Rows beyond max_pending are dropped instead of queued.
+    """
+    scorer = ShadowScorer('models/dt_model.pkl', str(tmp_path / 'shadow.jsonl'),
+                          max_pending=0)
+    assert not scorer.submit(rows[0], np.array([[1.0, 0.0]]), 'primary', 'models/dt_model.pkl')
+    scorer.close()
+    assert scorer.stats()['dropped'] == 1
+
+
+def test_shadow_scorer_missing_candidate(tmp_path):
+    """
+    Sad path: A missing candidate model is counted as an error, not raised.
+    """
+    scorer = ShadowScorer('models/missing.pkl', str(tmp_path / 'shadow.jsonl'))
+    scorer.submit(rows[0], np.array([[1.0, 0.0]]), 'primary', 'models/dt_model.pkl')
+    scorer.close()
+    assert scorer.stats()['errors'] == 1
+
+
+def test_shadow_scorer_submit_not_blocked_by_log_write(tmp_path):
+    """
+    Happy path: Requests can queue rows while the log file is being written.
+    """
+    scorer = ShadowScorer('models/dt_model.pkl', str(tmp_path / 'shadow.jsonl'))
+    with scorer._file_lock:  # pylint: disable=protected-access
+        scorer.submit(rows[0], np.array([[1.0, 0.0]]), 'primary', 'models/dt_model.pkl')
+        # The worker now waits on the file, the counters stay available
+        assert scorer._lock.acquire(timeout=1)  # pylint: disable=protected-access
+        scorer._lock.release()  # pylint: disable=protected-access
+        assert scorer.submit(rows[1], np.array([[1.0, 0.0]]), 'primary', 'models/dt_model.pkl')
+    scorer.close()
+    assert scorer.stats()['scored'] == 2
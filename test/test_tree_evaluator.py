@@ -0,0 +1,107 @@
+"""
+Unit tests for the tree_evaluator.py module.
+"""
+
+import pickle
+import pytest
+
+import pandas as pd
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+from src.tree_evaluator import CompiledTree
+
+with open('models/dt_model.pkl', 'rb') as model_file:
+    model = pickle.load(model_file)
+
+initial_features = list(model.feature_names_in_)
+
+# Random bookings in the ranges seen by the web app
+rng = np.random.default_rng(42)
+X_test = pd.DataFrame({'hotel': rng.integers(0, 2, 2000),
+                       'arrival_date_day_of_month': rng.integers(1, 32, 2000),
+                       'arrival_date_week_number': rng.integers(1, 54, 2000),
+                       'day': rng.integers(1, 32, 2000),
+                       'month': rng.integers(1, 13, 2000),
+                       'weekday': rng.integers(0, 7, 2000),
+                       'lead_time': np.log(rng.integers(0, 700, 2000) + 1),
+                       'stays_in_week_nights': rng.integers(0, 10, 2000),
+                       'stays_in_weekend_nights': rng.integers(0, 5, 2000),
+                       'total_of_special_requests': rng.integers(0, 5, 2000),
+                       'market_segment': rng.integers(0, 8, 2000)})[initial_features]
+
+# Rows sitting exactly on the split thresholds exercise the <= comparison
+internal = model.tree_.children_left != -1
+X_edge = np.tile(X_test.to_numpy(dtype=float)[:1], (internal.sum(), 1))
+X_edge[np.arange(internal.sum()), model.tree_.feature[internal]] = model.tree_.threshold[internal]
+X_edge = pd.DataFrame(X_edge, columns=initial_features)
+
+compiled = CompiledTree.from_model(model)
+
+
+def test_compiled_tree_parity():
+    """
+    Happy path: Test that the compiled tree matches sklearn bit-for-bit.
+    """
+    for x_in in (X_test, X_edge):
+        prediction_out, proba_out = compiled.predict_with_proba(x_in)
+
+        assert np.array_equal(prediction_out, model.predict(x_in))
+        assert np.array_equal(proba_out, model.predict_proba(x_in))
+        assert np.array_equal(compiled.apply(x_in), model.apply(x_in))
+
+
+def test_compiled_tree_predict_one():
+    """
+    Happy path: Test that the single-row path matches the batch path.
+    """
+    prediction_true, proba_true = compiled.predict_with_proba(X_edge)
+    for i, row in enumerate(X_edge.to_numpy()[:200]):
+        prediction_out, proba_out = compiled.predict_one(row)
+        assert prediction_out == prediction_true[i]
+        assert np.array_equal(proba_out, proba_true[i])
+
+
+def test_compiled_tree_multiclass():
+    """
+    Happy path: Test a multiclass tree fitted on a plain array.
+    """
+    x_train = rng.normal(size=(300, 4))
+    y_train = rng.integers(0, 3, 300)
+    dtree = DecisionTreeClassifier(max_depth=6, random_state=42).fit(x_train, y_train)
+    dtree_compiled = CompiledTree.from_model(dtree)
+
+    assert np.array_equal(dtree_compiled.predict(x_train), dtree.predict(x_train))
+    assert np.array_equal(dtree_compiled.predict_proba(x_train), dtree.predict_proba(x_train))
+
+
+def test_compiled_tree_wrong_model():
+    """
+    Sad path: Test compiling an object that is not a fitted tree.
+    """
+    with pytest.raises(TypeError):
+        CompiledTree.from_model('Not a model object')
+
+
+def test_compiled_tree_wrong_shape():
+    """
+    Sad path: Test predicting rows with the wrong number of features.
+    """
+    with pytest.raises(ValueError):
+        compiled.predict(np.zeros((2, 3)))
+
+
+def test_compiled_tree_non_finite_input():
+    """
+    Sad path: Test that NaN and infinite features are refused like sklearn does.
+    """
+    row = X_test.to_numpy(dtype=float)[0]
+    for bad_value in (np.nan, np.inf, 1e300):
+        bad_row = row.copy()
+        bad_row[0] = bad_value
+        with pytest.raises(ValueError):
+            model.predict(pd.DataFrame([bad_row], columns=initial_features))
+        with pytest.raises(ValueError):
+            compiled.predict(bad_row.reshape(1, -1))
+        with pytest.raises(ValueError):
+            compiled.predict_one(bad_row)